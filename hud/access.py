@@ -0,0 +1,69 @@
+"""
+Resolução de acesso por campanha.
+
+Quem é mestre sai de graça (`campaign.master_id`); quem é jogador custa uma
+consulta `EXISTS` na tabela de jogadores, feita no máximo uma vez por
+requisição e só quando alguém pergunta. O resultado fica guardado no próprio
+`request`, então página, `?mode=player` e endpoints JSON reaproveitam a mesma
+resposta.
+"""
+
+from __future__ import annotations
+
+from functools import cached_property
+
+from django.http import HttpRequest
+
+from .models import Campaign
+
+_CACHE_ATTR = "_hud_campaign_access"
+
+
+class CampaignAccess:
+    """O que o usuário da requisição é dentro de uma campanha."""
+
+    def __init__(self, campaign: Campaign, user, preview: bool = False) -> None:  # noqa: ANN001
+        self.campaign = campaign
+        self.user = user
+        # `?mode=player`: o mestre olha a campanha com os olhos do jogador.
+        self.preview = preview
+
+    @property
+    def owns(self) -> bool:
+        """Mestre de verdade, ignorando o `?mode=player`."""
+        return self.user.is_authenticated and self.campaign.master_id == self.user.pk
+
+    @property
+    def is_master(self) -> bool:
+        return self.owns and not self.preview
+
+    @cached_property
+    def is_player(self) -> bool:
+        if not self.user.is_authenticated:
+            return False
+        return self.campaign.players.filter(pk=self.user.pk).exists()
+
+    @property
+    def allowed(self) -> bool:
+        return self.is_master or self.is_player
+
+    @property
+    def role(self) -> str | None:
+        if self.is_master:
+            return "master"
+        if self.is_player:
+            return "player"
+        return None
+
+
+def campaign_access(request: HttpRequest, campaign: Campaign) -> CampaignAccess:
+    """Acesso do `request.user` à campanha, memorizado na requisição."""
+    cache = getattr(request, _CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(request, _CACHE_ATTR, cache)
+    access = cache.get(campaign.pk)
+    if access is None:
+        preview = request.GET.get("mode") == "player"
+        access = cache[campaign.pk] = CampaignAccess(campaign, request.user, preview=preview)
+    return access
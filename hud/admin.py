@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Campaign, Character, CharacterAbility, CharacterSkill, InventorySlot, Item, UserProfile, CharacterBar
+from .models import Campaign, Character, CharacterAbility, CharacterSkill, InventorySlot, Item, Job, UserProfile, CharacterBar
 
 
 @admin.register(Campaign)
@@ -87,3 +87,11 @@ class CharacterBarAdmin(admin.ModelAdmin):
     list_filter = ("character",)
     ordering = ("character", "order", "name")
     search_fields = ("character__name", "name")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("task", "status", "attempts", "max_attempts", "run_at", "finished_at", "locked_by")
+    list_filter = ("status", "task")
+    ordering = ("-run_at",)
+    readonly_fields = ("task", "payload", "created_at", "finished_at", "locked_by", "locked_at", "last_error")
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class HudConfig(AppConfig):
+    name = "hud"
+
+    def ready(self) -> None:
+        # Receivers que vivem fora de models.py.
+        from . import conditional, context_processors, fragments, live, search, summaries, tasks, thumbnails  # noqa: F401
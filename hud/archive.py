@@ -0,0 +1,390 @@
+"""
+Exportação e importação de uma campanha inteira num arquivo `.zip`.
+
+O arquivo tem três partes:
+
+- `manifest.json`: formato, versão, data e a própria campanha (nome,
+  descrição, banner, usuário do mestre);
+- `data.jsonl`: uma linha JSON por registro, agrupadas por tipo na ordem de
+  `KINDS` — pai sempre antes do filho. Cada linha é
+  `{"type": "character", "id": 12, "data": {...}}`, com as chaves
+  estrangeiras apontando para os `id` antigos do próprio arquivo e usuários
+  referidos pelo `username`;
+- `media/<nome no storage>`: cada arquivo de imagem que algum registro usa.
+
+**Exportar** é um gerador (`iter_archive`): o zip é escrito num buffer que o
+gerador esvazia a cada pedaço, os querysets são lidos com `.values()` e
+`.iterator()` em blocos, e as imagens são copiadas aos pedaços. A memória não
+cresce com a campanha — só o conjunto de nomes de imagem usados. O mesmo
+gerador alimenta o comando `export_campaign` e o download do mestre.
+
+**Importar** (`import_archive`) lê o `data.jsonl` linha a linha e grava com
+`bulk_create` em lotes, sem `save()` nem signals por objeto. Cada lote devolve
+os ids novos, guardados num mapa id antigo → id novo por tipo, que os filhos
+usam para apontar para os pais. Imagens são copiadas para o storage na
+primeira vez em que um registro as cita (o storage pode trocar o nome para
+não sobrescrever). Tudo numa transação; se algo falha, as imagens já
+copiadas são apagadas.
+
+Usuários não viajam no arquivo. O mestre da campanha importada é quem
+importa; jogadores e donos de personagem são casados pelo `username` no banco
+de destino, e quem não existir lá fica de fora (personagem sem dono).
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import posixpath
+import zipfile
+from pathlib import PurePosixPath
+from typing import IO, Any, Iterator
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from . import jobs, roster, summaries, thumbnails
+from .models import (
+    NPC,
+    Campaign,
+    Character,
+    CharacterAbility,
+    CharacterAttribute,
+    CharacterBar,
+    CharacterSkill,
+    InventorySlot,
+    Item,
+    NPCAbility,
+    NPCAttribute,
+    NPCBar,
+    NPCInventorySlot,
+    NPCSkill,
+)
+
+User = get_user_model()
+
+FORMAT = "rpg-panel-campaign"
+VERSION = 1
+MEDIA_PREFIX = "media/"
+# Linhas por consulta na exportação e objetos por INSERT na importação.
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+# O gerador entrega pedaços de pelo menos isso (o último pode ser menor).
+STREAM_CHUNK = 64 * 1024
+
+
+class ArchiveError(ValueError):
+    """Arquivo que não dá para importar; a mensagem vai para quem importou."""
+
+
+class Kind:
+    """Um tipo de registro: modelo, campos copiados como estão e referências.
+
+    `refs` mapeia o campo de chave estrangeira para o tipo do pai (`"user"`
+    para usuários, exportados pelo username). `owner` é o caminho até a
+    campanha, usado para filtrar na exportação.
+    """
+
+    def __init__(self, name: str, model, fields: tuple[str, ...], refs: dict[str, str], owner: str) -> None:  # noqa: ANN001
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.refs = refs
+        self.owner = owner
+        self.files = tuple(
+            field for field in fields if model._meta.get_field(field).get_internal_type() in ("FileField", "ImageField")
+        )
+
+
+STATS = ("hp_max", "hp_current", "sp_max", "sp_current", "inventory_capacity", "visible")
+
+KINDS = (
+    Kind("player", Campaign.players.through, (), {"user": "user"}, "campaign"),
+    Kind("item", Item, ("name", "image", "description"), {}, "campaign"),
+    Kind("character", Character, ("name", "image", *STATS), {"assigned_to": "user"}, "campaign"),
+    Kind("character_bar", CharacterBar, ("name", "current", "max_value", "color", "order"), {"character": "character"}, "character__campaign"),
+    Kind("character_skill", CharacterSkill, ("name", "value", "order"), {"character": "character"}, "character__campaign"),
+    Kind("character_ability", CharacterAbility, ("name", "order"), {"character": "character"}, "character__campaign"),
+    Kind("character_attribute", CharacterAttribute, ("name", "value", "order"), {"character": "character"}, "character__campaign"),
+    Kind("character_slot", InventorySlot, ("position",), {"character": "character", "item": "item"}, "character__campaign"),
+    Kind("npc", NPC, ("name", "image", *STATS), {"assigned_to_character": "character"}, "campaign"),
+    Kind("npc_bar", NPCBar, ("name", "current", "max_value", "color", "order"), {"npc": "npc"}, "npc__campaign"),
+    Kind("npc_skill", NPCSkill, ("name", "value", "order"), {"npc": "npc"}, "npc__campaign"),
+    Kind("npc_ability", NPCAbility, ("name", "order"), {"npc": "npc"}, "npc__campaign"),
+    Kind("npc_attribute", NPCAttribute, ("name", "value", "order"), {"npc": "npc"}, "npc__campaign"),
+    Kind("npc_slot", NPCInventorySlot, ("position",), {"npc": "npc", "item": "item"}, "npc__campaign"),
+)
+KINDS_BY_NAME = {kind.name: kind for kind in KINDS}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+# --- Exportação ---
+
+
+class _Sink(io.RawIOBase):
+    """Destino sem `seek` do zip: acumula o que foi escrito até o gerador levar."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # noqa: ANN001
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        self.size = 0
+        return data
+
+
+def _records(kind: Kind, campaign: Campaign) -> Iterator[dict[str, Any]]:
+    columns = {"id": "id", **{field: field for field in kind.fields}}
+    for field, target in kind.refs.items():
+        columns[field] = f"{field}__username" if target == "user" else f"{field}_id"
+    rows = (
+        kind.model.objects.filter(**{kind.owner: campaign})
+        .order_by("pk")
+        .values_list(*columns.values())
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    names = list(columns)
+    for row in rows:
+        record = dict(zip(names, row))
+        yield {"type": kind.name, "id": record.pop("id"), "data": record}
+
+
+def iter_archive(campaign: Campaign) -> Iterator[bytes]:
+    """O `.zip` da campanha, em pedaços, sem montar nada inteiro na memória."""
+    sink = _Sink()
+    media: set[str] = set()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        manifest = {
+            "format": FORMAT,
+            "version": VERSION,
+            "exported_at": timezone.now().isoformat(),
+            "campaign": {
+                "name": campaign.name,
+                "description": campaign.description,
+                "banner": campaign.banner.name or "",
+                "master": campaign.master.username,
+            },
+        }
+        if campaign.banner:
+            media.add(campaign.banner.name)
+        archive.writestr("manifest.json", _dumps(manifest))
+        yield sink.drain()
+
+        with archive.open("data.jsonl", "w", force_zip64=True) as data:
+            for kind in KINDS:
+                for record in _records(kind, campaign):
+                    media.update(record["data"][field] for field in kind.files if record["data"][field])
+                    data.write(_dumps(record).encode() + b"\n")
+                    if sink.size >= STREAM_CHUNK:
+                        yield sink.drain()
+
+        for name in sorted(media):
+            if not default_storage.exists(name):
+                continue
+            with default_storage.open(name, "rb") as source, archive.open(
+                MEDIA_PREFIX + name, "w", force_zip64=True
+            ) as target:
+                for chunk in File(source).chunks(STREAM_CHUNK):
+                    target.write(chunk)
+                    if sink.size >= STREAM_CHUNK:
+                        yield sink.drain()
+    yield sink.drain()
+
+
+def write_archive(campaign: Campaign, target: IO[bytes]) -> int:
+    """Grava o `.zip` em `target` e devolve quantos bytes escreveu."""
+    written = 0
+    for chunk in iter_archive(campaign):
+        target.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def archive_filename(campaign: Campaign) -> str:
+    return f"campanha-{campaign.pk}.zip"
+
+
+# --- Importação ---
+
+
+class _Importer:
+    def __init__(self, archive: zipfile.ZipFile, master, batch_size: int) -> None:  # noqa: ANN001
+        self.archive = archive
+        self.master = master
+        self.batch_size = batch_size
+        self.ids: dict[str, dict[int, int]] = {kind.name: {} for kind in KINDS}
+        self.media: dict[str, str] = {}
+        self.thumbnails: dict[str, tuple[str, set[str]]] = {}
+        self.counts: dict[str, int] = {}
+        self.campaign: Campaign | None = None
+
+    def media_name(self, name: str, model) -> str:  # noqa: ANN001
+        """Copia a imagem do arquivo para o storage (uma vez) e devolve o nome final."""
+        if not name:
+            return ""
+        if name not in self.media:
+            member = MEDIA_PREFIX + name
+            path = PurePosixPath(name)
+            if path.is_absolute() or ".." in path.parts:
+                raise ArchiveError(f"Nome de imagem inválido no arquivo: {name}")
+            try:
+                info = self.archive.getinfo(member)
+            except KeyError:
+                # A exportação pula imagem que já faltava no storage de origem.
+                return ""
+            with self.archive.open(info) as source:
+                self.media[name] = default_storage.save(name, File(source, name=posixpath.basename(name)))
+        # `bulk_create` não passa pelos receivers de miniatura: são agendadas no fim.
+        _, sizes = self.thumbnails.setdefault(self.media[name], (model._meta.label_lower, set()))
+        sizes.update(thumbnails.FIELDS[model][1])
+        return self.media[name]
+
+    def enqueue_thumbnails(self) -> None:
+        for name, (model, sizes) in self.thumbnails.items():
+            jobs.enqueue("generate_thumbnails", model=model, name=name, sizes=sorted(sizes))
+
+    def cleanup(self) -> None:
+        for name in self.media.values():
+            # O storage com hash devolve o arquivo que já existia quando o
+            # conteúdo é igual; esse continua sendo de quem já o usava.
+            if not any(model.objects.filter(**{field: name}).exists() for model, (field, _) in thumbnails.FIELDS.items()):
+                default_storage.delete(name)
+
+    def create_campaign(self, manifest: dict[str, Any], name: str | None) -> Campaign:
+        data = manifest.get("campaign") or {}
+        self.campaign = Campaign.objects.create(
+            name=name or data.get("name") or "Campanha importada",
+            description=data.get("description", ""),
+            banner=self.media_name(data.get("banner", ""), Campaign),
+            master=self.master,
+        )
+        return self.campaign
+
+    def flush(self, kind: Kind, records: list[dict[str, Any]]) -> None:
+        if kind.model in (InventorySlot, NPCInventorySlot):
+            # Arquivo de antes do inventário esparso traz as posições vazias,
+            # que hoje não têm linha.
+            records = [record for record in records if record["data"].get("item") is not None]
+        if not records:
+            return
+        usernames = {
+            record["data"].get(field)
+            for record in records
+            for field, target in kind.refs.items()
+            if target == "user"
+        } - {None}
+        users = dict(User.objects.filter(username__in=usernames).values_list("username", "pk")) if usernames else {}
+
+        if kind.name == "player":
+            roster.add_members(self.campaign, {users[r["data"]["user"]] for r in records if r["data"]["user"] in users} - {self.master.pk})
+            self.counts[kind.name] = self.counts.get(kind.name, 0) + len(records)
+            return
+
+        objects = []
+        for record in records:
+            data = record["data"]
+            values = {field: data.get(field) for field in kind.fields}
+            for field in kind.files:
+                values[field] = self.media_name(values[field] or "", kind.model)
+            for field, target in kind.refs.items():
+                old = data.get(field)
+                if target == "user":
+                    values[f"{field}_id"] = users.get(old)
+                elif old is None:
+                    values[f"{field}_id"] = None
+                else:
+                    try:
+                        values[f"{field}_id"] = self.ids[target][old]
+                    except KeyError:
+                        raise ArchiveError(f"{kind.name} {record['id']} aponta para {target} {old}, que não existe.") from None
+            if "campaign" in (f.name for f in kind.model._meta.concrete_fields):
+                values["campaign_id"] = self.campaign.pk
+            if "created_by" in (f.name for f in kind.model._meta.concrete_fields):
+                values["created_by_id"] = self.master.pk
+            objects.append(kind.model(**values))
+
+        created = kind.model.objects.bulk_create(objects, batch_size=self.batch_size)
+        mapping = self.ids[kind.name]
+        for record, obj in zip(records, created):
+            mapping[record["id"]] = obj.pk
+        self.counts[kind.name] = self.counts.get(kind.name, 0) + len(created)
+
+
+def _read_manifest(archive: zipfile.ZipFile) -> dict[str, Any]:
+    try:
+        manifest = json.loads(archive.read("manifest.json"))
+    except KeyError:
+        raise ArchiveError("Arquivo sem manifest.json.") from None
+    except ValueError as exc:
+        raise ArchiveError(f"manifest.json inválido: {exc}") from None
+    if manifest.get("format") != FORMAT:
+        raise ArchiveError("Não é um arquivo de campanha do painel.")
+    if manifest.get("version") != VERSION:
+        raise ArchiveError(f"Versão {manifest.get('version')} não suportada (esperada {VERSION}).")
+    return manifest
+
+
+def _lines(archive: zipfile.ZipFile) -> Iterator[dict[str, Any]]:
+    try:
+        data = archive.open("data.jsonl")
+    except KeyError:
+        raise ArchiveError("Arquivo sem data.jsonl.") from None
+    with data:
+        for number, line in enumerate(io.TextIOWrapper(data, encoding="utf-8"), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                kind = KINDS_BY_NAME[record["type"]]
+            except (ValueError, KeyError, TypeError):
+                raise ArchiveError(f"data.jsonl, linha {number}: registro inválido.") from None
+            yield kind, record
+
+
+def import_archive(
+    source: str | IO[bytes], master, name: str | None = None, batch_size: int = BATCH_SIZE  # noqa: ANN001
+) -> tuple[Campaign, dict[str, int]]:
+    """Cria uma campanha nova a partir do arquivo; devolve ela e quantos registros de cada tipo."""
+    try:
+        archive = zipfile.ZipFile(source)
+    except (zipfile.BadZipFile, OSError) as exc:
+        raise ArchiveError(f"Não é um .zip legível: {exc}") from None
+
+    with archive:
+        manifest = _read_manifest(archive)
+        importer = _Importer(archive, master, batch_size)
+        try:
+            with transaction.atomic():
+                campaign = importer.create_campaign(manifest, name)
+                current: Kind | None = None
+                pending: list[dict[str, Any]] = []
+                for kind, record in _lines(archive):
+                    if kind is not current or len(pending) >= batch_size:
+                        if current is not None:
+                            importer.flush(current, pending)
+                        current, pending = kind, []
+                    pending.append(record)
+                if current is not None:
+                    importer.flush(current, pending)
+                summaries.refresh([campaign.pk])
+                importer.enqueue_thumbnails()
+        except BaseException:
+            importer.cleanup()
+            raise
+    return campaign, importer.counts
@@ -0,0 +1,441 @@
+"""
+Benchmark dos endpoints quentes do painel.
+
+Semeia campanhas sintéticas de tamanho configurável e mede cada endpoint de
+duas formas:
+
+- **client**: pelo `django.test.Client`, em série, na mesma thread. Dá a
+  latência da view sem rede e o número de consultas SQL por request;
+- **http**: por HTTP de verdade, contra um servidor WSGI com threads subido em
+  processo, com N clientes concorrentes. Dá latência sob disputa (locks do
+  SQLite, pool do Postgres) e vazão.
+
+O resultado é um dicionário serializável em JSON (`run()`), para guardar por
+commit e comparar com `compare()`. Quem cuida de banco isolado, opções e
+saída é o comando `manage.py benchmark`.
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    NPC,
+    Campaign,
+    Character,
+    CharacterBar,
+    InventorySlot,
+    Item,
+    NPCBar,
+    NPCInventorySlot,
+    UserProfile,
+)
+from .profiling import percentile
+
+User = get_user_model()
+
+# Tamanho padrão de cada campanha semeada.
+DEFAULT_SIZES = {
+    "campaigns": 2,
+    "players": 8,  # jogadores por campanha
+    "characters": 10,
+    "npcs": 10,
+    "items": 40,
+    "bars": 3,  # barras por personagem/NPC
+    "slots": 16,  # capacidade de inventário
+}
+
+TARGETS = (
+    "campaign_detail",
+    "character_detail",
+    "npc_detail",
+    "search_players",
+    "assign_slot",
+    "modify_bar",
+    "modify_npc_bar",
+    "modify_stats",
+)
+
+SEARCH_QUERIES = ("b", "bench", "bench p", "p1", "p2 bench")
+PERCENTILES = (50, 95, 99)
+
+
+# --- Banco descartável ---
+
+
+@contextmanager
+def isolated_database() -> Iterator[None]:
+    """Banco de teste novo, migrado e apagado no fim; os dados reais não são tocados.
+
+    No SQLite o banco de teste vira arquivo (e não memória), para a fase HTTP
+    ter uma conexão por thread com o mesmo WAL e os mesmos PRAGMAs de produção.
+    """
+    tmpdir = None
+    if connection.vendor == "sqlite":
+        tmpdir = tempfile.mkdtemp(prefix="hud-benchmark-")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(Path(tmpdir) / "bench.sqlite3")
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# --- Dados sintéticos ---
+
+
+def seed(sizes: dict[str, int] | None = None, prefix: str = "bench") -> list[dict[str, Any]]:
+    """Cria as campanhas e devolve, por campanha, os ids que os alvos usam."""
+    sizes = {**DEFAULT_SIZES, **(sizes or {})}
+    seeded = []
+    for c in range(sizes["campaigns"]):
+        master = User.objects.create(username=f"{prefix}-m{c}")
+        UserProfile.objects.filter(user=master).update(role=UserProfile.ROLE_MASTER)
+        players = [User.objects.create(username=f"{prefix}-p{c}-{n}") for n in range(sizes["players"])]
+
+        campaign = Campaign.objects.create(name=f"Campanha {prefix} {c}", master=master)
+        campaign.players.add(*players)
+
+        items = Item.objects.bulk_create(
+            Item(campaign=campaign, name=f"Item {n}", created_by=master) for n in range(sizes["items"])
+        )
+        characters = Character.objects.bulk_create(
+            Character(
+                campaign=campaign,
+                name=f"Personagem {n}",
+                created_by=master,
+                assigned_to=players[n % len(players)] if players else None,
+                inventory_capacity=sizes["slots"],
+            )
+            for n in range(sizes["characters"])
+        )
+        npcs = NPC.objects.bulk_create(
+            NPC(
+                campaign=campaign,
+                name=f"NPC {n}",
+                created_by=master,
+                visible=n % 2 == 0,
+                inventory_capacity=sizes["slots"],
+            )
+            for n in range(sizes["npcs"])
+        )
+
+        # Metade das posições ocupadas; as vazias não têm linha.
+        def item_at(n: int, position: int) -> Item | None:
+            return items[(n + position) % len(items)] if items and position % 2 else None
+
+        InventorySlot.objects.bulk_create(
+            InventorySlot(campaign=campaign, character=character, position=pos, item=item_at(n, pos))
+            for n, character in enumerate(characters)
+            for pos in range(1, sizes["slots"] + 1)
+            if item_at(n, pos)
+        )
+        NPCInventorySlot.objects.bulk_create(
+            NPCInventorySlot(campaign=campaign, npc=npc, position=pos, item=item_at(n, pos))
+            for n, npc in enumerate(npcs)
+            for pos in range(1, sizes["slots"] + 1)
+            if item_at(n, pos)
+        )
+        bars = CharacterBar.objects.bulk_create(
+            CharacterBar(campaign=campaign, character=character, name=f"Barra {b}", current=50, order=b)
+            for character in characters
+            for b in range(sizes["bars"])
+        )
+        npc_bars = NPCBar.objects.bulk_create(
+            NPCBar(campaign=campaign, npc=npc, name=f"Barra {b}", current=50, order=b) for npc in npcs for b in range(sizes["bars"])
+        )
+
+        seeded.append(
+            {
+                "campaign": campaign.pk,
+                "master": master.pk,
+                "items": [item.pk for item in items],
+                "characters": [character.pk for character in characters],
+                "npcs": [npc.pk for npc in npcs],
+                "slots": [
+                    (character.pk, pos) for character in characters for pos in range(1, sizes["slots"] + 1)
+                ],
+                "bars": [(bar.character_id, bar.pk) for bar in bars],
+                "npc_bars": [(bar.npc_id, bar.pk) for bar in npc_bars],
+            }
+        )
+    return seeded
+
+
+# --- Requests de cada alvo ---
+
+
+def _pick(values: list, i: int):
+    return values[i % len(values)] if values else None
+
+
+def build_request(target: str, data: dict[str, Any], i: int) -> tuple[str, str, bytes, str]:
+    """A i-ésima request de `target` sobre uma campanha semeada: (método, caminho, corpo, content-type)."""
+    form = "application/x-www-form-urlencoded"
+    if target == "campaign_detail":
+        return "GET", reverse("campaign_detail", args=[data["campaign"]]), b"", ""
+    if target == "character_detail":
+        return "GET", reverse("character_detail", args=[_pick(data["characters"], i)]), b"", ""
+    if target == "npc_detail":
+        return "GET", reverse("npc_detail", args=[_pick(data["npcs"], i)]), b"", ""
+    if target == "search_players":
+        query = urlencode({"q": _pick(list(SEARCH_QUERIES), i)})
+        return "GET", f"{reverse('search_players', args=[data['campaign']])}?{query}", b"", ""
+    if target == "assign_slot":
+        character_id, position = _pick(data["slots"], i)
+        # Alterna entre pôr um item e esvaziar o slot.
+        body = {"item_id": _pick(data["items"], i)} if i % 2 == 0 else {}
+        return "POST", reverse("assign_slot", args=[character_id, position]), urlencode(body).encode(), form
+    if target == "modify_bar":
+        action = "increase" if i % 2 == 0 else "decrease"
+        _, bar_id = _pick(data["bars"], i)
+        return "POST", reverse("modify_bar", args=[bar_id]), urlencode({"action": action}).encode(), form
+    if target == "modify_npc_bar":
+        npc_id, bar_id = _pick(data["npc_bars"], i)
+        action = "increase" if i % 2 == 0 else "decrease"
+        return "POST", reverse("modify_npc_bar", args=[npc_id, bar_id]), urlencode({"action": action}).encode(), form
+    if target == "modify_stats":
+        # Golpe típico de mesa: HP e SP do personagem e uma barra dele, num lote.
+        character_id, bar_id = _pick(data["bars"], i)
+        mutations = [
+            {"owner": "character", "id": character_id, "stat": "hp", "delta": -1 if i % 2 else 1},
+            {"owner": "character", "id": character_id, "stat": "sp", "delta": 1 if i % 2 else -1},
+            {"owner": "character", "id": character_id, "stat": "bar", "bar": bar_id, "delta": -3 if i % 2 else 3},
+        ]
+        body = json.dumps({"mutations": mutations}).encode()
+        return "POST", reverse("modify_stats"), body, "application/json"
+    raise ValueError(f"Alvo desconhecido: {target!r}")
+
+
+# --- Estatística ---
+
+
+def summarize(latencies: list[float], errors: int) -> dict[str, Any]:
+    """Latências em segundos -> resumo em milissegundos."""
+    summary = {"requests": len(latencies), "errors": errors}
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 3)
+    summary["mean_ms"] = round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0
+    summary["max_ms"] = round(max(latencies, default=0.0) * 1000, 3)
+    return summary
+
+
+# --- Fase client ---
+
+
+class QueryCounter:
+    """`execute_wrapper` que só conta as consultas que passam pela conexão."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):  # noqa: ANN001
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_client(
+    seeded: list[dict[str, Any]], targets: tuple[str, ...] = TARGETS, iterations: int = 50, warmup: int = 3
+) -> dict[str, Any]:
+    """Cada alvo `iterations` vezes pelo test client, logado como mestre da campanha."""
+    clients = {}
+    for data in seeded:
+        client = Client()
+        client.force_login(User.objects.get(pk=data["master"]))
+        clients[data["campaign"]] = client
+
+    results = {}
+    for target in targets:
+        latencies, queries, errors = [], [], 0
+        for i in range(-warmup, iterations):
+            data = seeded[i % len(seeded)]
+            method, path, body, content_type = build_request(target, data, i)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = clients[data["campaign"]].generic(method, path, body, content_type)
+                elapsed = time.perf_counter() - start
+            if i < 0:
+                continue
+            latencies.append(elapsed)
+            queries.append(counter.count)
+            errors += response.status_code >= 400
+        summary = summarize(latencies, errors)
+        summary["queries_per_request"] = round(sum(queries) / len(queries), 2) if queries else 0.0
+        summary["max_queries"] = max(queries, default=0)
+        results[target] = summary
+    return results
+
+
+# --- Fase HTTP ---
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):  # noqa: A002, ANN001
+        pass
+
+
+@contextmanager
+def live_server() -> Iterator[str]:
+    """Servidor WSGI com threads numa porta livre; cada request abre e fecha a sua conexão."""
+    server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietRequestHandler, allow_reuse_address=False)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def _session_headers(user_id: int) -> dict[str, str]:
+    """Cookies de sessão e CSRF prontos, como um navegador logado mandaria."""
+    client = Client()
+    client.force_login(User.objects.get(pk=user_id))
+    csrf_request = HttpRequest()
+    token = get_token(csrf_request)
+    cookies = {
+        settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value,
+        settings.CSRF_COOKIE_NAME: csrf_request.META["CSRF_COOKIE"],
+    }
+    return {
+        "Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items()),
+        "X-CSRFToken": token,
+        "X-Requested-With": "XMLHttpRequest",
+    }
+
+
+def run_http(
+    seeded: list[dict[str, Any]],
+    targets: tuple[str, ...] = TARGETS,
+    requests: int = 200,
+    concurrency: int = 8,
+    timeout: float = 30.0,
+) -> dict[str, Any]:
+    """Cada alvo `requests` vezes por HTTP, com `concurrency` clientes ao mesmo tempo."""
+    headers = {data["campaign"]: _session_headers(data["master"]) for data in seeded}
+    # Monta as requests antes: `reverse()` e consultas fora do cronômetro.
+    planned = {
+        target: [(seeded[i % len(seeded)]["campaign"], build_request(target, seeded[i % len(seeded)], i)) for i in range(requests)]
+        for target in targets
+    }
+
+    results = {}
+    with live_server() as base_url:
+
+        def send(job) -> tuple[float, bool]:  # noqa: ANN001
+            campaign_id, (method, path, body, content_type) = job
+            request = urllib.request.Request(
+                base_url + path, data=body or None, method=method, headers=headers[campaign_id]
+            )
+            if content_type:
+                request.add_header("Content-Type", content_type)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                    ok = response.status < 400
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - start, ok
+
+        for target in targets:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                start = time.perf_counter()
+                outcomes = list(pool.map(send, planned[target]))
+                wall = time.perf_counter() - start
+            summary = summarize([elapsed for elapsed, _ in outcomes], sum(not ok for _, ok in outcomes))
+            summary["concurrency"] = concurrency
+            summary["throughput_rps"] = round(len(outcomes) / wall, 2) if wall else 0.0
+            results[target] = summary
+    return results
+
+
+# --- Relatório ---
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run(
+    sizes: dict[str, int] | None = None,
+    targets: tuple[str, ...] = TARGETS,
+    iterations: int = 50,
+    warmup: int = 3,
+    http_requests: int = 200,
+    concurrency: int = 8,
+) -> dict[str, Any]:
+    """Semeia, mede as duas fases e devolve o relatório completo (`http_requests=0` pula o HTTP)."""
+    sizes = {**DEFAULT_SIZES, **(sizes or {})}
+    seeded = seed(sizes)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "sizes": sizes,
+            "iterations": iterations,
+            "http_requests": http_requests,
+            "concurrency": concurrency,
+        },
+        "client": run_client(seeded, targets, iterations, warmup),
+    }
+    if http_requests:
+        report["http"] = run_http(seeded, targets, http_requests, concurrency)
+    return report
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> list[dict[str, Any]]:
+    """Diferença por fase e alvo nas métricas principais (positivo = piorou, exceto vazão)."""
+    rows = []
+    for phase in ("client", "http"):
+        for target, now in current.get(phase, {}).items():
+            before = baseline.get(phase, {}).get(target)
+            if not before:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "queries_per_request", "throughput_rps"):
+                if metric in now and metric in before:
+                    old, new = before[metric], now[metric]
+                    change = round((new - old) / old * 100, 1) if old else None
+                    rows.append(
+                        {"phase": phase, "target": target, "metric": metric, "before": old, "after": new, "change_pct": change}
+                    )
+    return rows
@@ -0,0 +1,170 @@
+"""
+GET condicional (ETag / Last-Modified) das páginas de campanha, personagem e NPC.
+
+Os navegadores dos jogadores recarregam essas páginas a sessão inteira. Em vez
+de renderizar tudo de novo, a view compara a versão da página com o
+`If-None-Match` e responde `304 Not Modified` quando nada mudou.
+
+A versão sai dos `updated_at` que a view já tem em mãos, sem consulta extra:
+
+- página de campanha: `campaign.updated_at`;
+- página de personagem/NPC: o maior entre o `updated_at` dele e o da campanha.
+
+Para isso bastar, os receivers abaixo propagam as mudanças para cima:
+
+- barra, slot, perícia, habilidade ou atributo → `updated_at` do dono;
+- personagem, NPC, item, entrada/saída de jogador ou perfil de um membro →
+  `updated_at` da campanha (que aparece em todas as páginas dela);
+- miniatura que o worker acabou de gerar (`thumbnail_ready`) → as mesmas
+  páginas da imagem, que até ali apontavam para o original.
+
+O ETag ainda leva o usuário e o papel dele na página, a URL completa (`?mode=player`, `player_q`) e o
+cookie de CSRF — a página embute o token, e sessão nova tem que baixar página
+nova. Página com mensagem flash pendente nunca responde 304 nem leva ETag: a
+mensagem só aparece uma vez e não pode ficar presa no cache do navegador.
+`Cache-Control: private, no-cache` obriga o navegador a revalidar sempre e
+impede proxies de guardar a página de um usuário.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import thumbnails
+from .models import NPC, SHEET_SENDERS, Campaign, Character, Item, UserProfile, receiver_for
+
+User = get_user_model()
+
+
+class PageVersion:
+    """Versão de uma página para um usuário; decide o 304 e carimba a resposta.
+
+    `csrf=False` para respostas sem formulário (JSON), que não devem criar cookie de CSRF.
+    """
+
+    def __init__(
+        self, request: HttpRequest, *timestamps: datetime | None, role: str = "", csrf: bool = True
+    ) -> None:
+        self.request = request
+        self.last_modified = max(ts for ts in timestamps if ts is not None)
+        # Só GET/HEAD sem flash pendente entram no jogo do cache.
+        self.cacheable = request.method in ("GET", "HEAD") and not len(messages.get_messages(request))
+        raw = "|".join(
+            (
+                str(request.user.pk),
+                role,
+                request.get_full_path(),
+                self._csrf_secret(request) if csrf else "",
+                self.last_modified.isoformat(),
+            )
+        )
+        self.etag = quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+    @staticmethod
+    def _csrf_secret(request: HttpRequest) -> str:
+        # O segredo que a resposta vai gravar no cookie (o primeiro GET cria um);
+        # assim o ETag da primeira resposta bate com o da revalidação.
+        get_token(request)
+        return request.META.get("CSRF_COOKIE", "")
+
+    def not_modified(self) -> HttpResponse | None:
+        """O 304 pronto, se o navegador já tem esta versão; senão None."""
+        if not self.cacheable:
+            return None
+        response = get_conditional_response(
+            self.request, etag=self.etag, last_modified=int(self.last_modified.timestamp())
+        )
+        return self.stamp(response) if response is not None else None
+
+    def stamp(self, response: HttpResponse) -> HttpResponse:
+        if self.cacheable and response.status_code in (200, 304):
+            response.headers["ETag"] = self.etag
+            response.headers["Last-Modified"] = http_date(self.last_modified.timestamp())
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+# --- Propagação de updated_at ---
+
+
+def touch(model, pks) -> None:  # noqa: ANN001
+    """`updated_at = agora` sem `save()`: não dispara signals nem mexe em outras colunas."""
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+@receiver_for([post_save, post_delete], SHEET_SENDERS)
+def touch_owner(sender, instance, **kwargs):  # noqa: ANN001
+    if instance.character_id is not None:
+        touch(Character, [instance.character_id])
+    else:
+        touch(NPC, [instance.npc_id])
+
+
+@receiver([post_save, post_delete], sender=Character)
+@receiver([post_save, post_delete], sender=NPC)
+@receiver([post_save, post_delete], sender=Item)
+def touch_campaign(sender, instance, **kwargs):  # noqa: ANN001
+    touch(Campaign, [instance.campaign_id])
+
+
+@receiver(m2m_changed, sender=Campaign.players.through)
+def touch_campaign_on_membership(sender, instance, action, reverse, pk_set, **kwargs):  # noqa: ANN001
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            touch(Campaign, [instance.pk])
+        return
+    # Pelo lado do usuário (user.campaigns_as_player.add/remove/clear).
+    if action == "pre_clear":
+        # O post_clear não diz quais campanhas eram.
+        instance._conditional_cleared = list(instance.campaigns_as_player.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        touch(Campaign, pk_set)
+    elif action == "post_clear":
+        touch(Campaign, getattr(instance, "_conditional_cleared", []))
+
+
+def _campaigns_of(user_id: int) -> set[int]:
+    return set(Campaign.objects.filter(master_id=user_id).values_list("pk", flat=True)) | set(
+        Campaign.players.through.objects.filter(user_id=user_id).values_list("campaign_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=UserProfile)
+def touch_campaigns_on_profile(sender, instance, created, **kwargs):  # noqa: ANN001
+    # Avatar e nome aparecem nos cards e na lista de jogadores.
+    if not created:
+        touch(Campaign, _campaigns_of(instance.user_id))
+
+
+@receiver(post_save, sender=User)
+def touch_campaigns_on_username(sender, instance, created, update_fields=None, **kwargs):  # noqa: ANN001
+    if created or (update_fields is not None and "username" not in update_fields):
+        return
+    touch(Campaign, _campaigns_of(instance.pk))
+
+
+@receiver(thumbnails.thumbnail_ready)
+def touch_pages_on_thumbnail(sender, name, **kwargs):  # noqa: ANN001
+    field, _ = thumbnails.FIELDS[sender]
+    rows = sender.objects.filter(**{field: name})
+    if sender is Campaign:
+        touch(Campaign, rows.values_list("pk", flat=True))
+    elif sender is UserProfile:
+        touch(Campaign, {pk for user_id in rows.values_list("user_id", flat=True) for pk in _campaigns_of(user_id)})
+    else:
+        if sender is not Item:
+            touch(sender, rows.values_list("pk", flat=True))
+        touch(Campaign, rows.values_list("campaign_id", flat=True))
@@ -1,14 +1,55 @@
 from __future__ import annotations
 
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
 from .models import UserProfile
 
+# Teto de quanto tempo um processo pode servir um perfil velho quando a
+# alteração foi feita em outro processo e o cache não é compartilhado (locmem).
+PROFILE_CACHE_SECONDS = 300
+
+
+def profile_cache_key(user_id: int) -> str:
+    return f"hud:profile:{user_id}"
+
+
+def request_profile(request) -> UserProfile:
+    """Perfil do usuário logado: uma vez por request, do cache quando possível."""
+    if not hasattr(request, "_hud_profile"):
+        key = profile_cache_key(request.user.pk)
+        profile = cache.get(key)
+        if profile is None:
+            profile, _ = UserProfile.objects.get_or_create(
+                user=request.user,
+                defaults={"role": UserProfile.ROLE_MASTER if request.user.is_staff else UserProfile.ROLE_PLAYER},
+            )
+            cache.set(key, profile, PROFILE_CACHE_SECONDS)
+        request._hud_profile = profile
+    return request._hud_profile
+
 
 def user_role(request):
     if not request.user.is_authenticated:
         return {"is_master_user": False, "user_profile": None}
 
-    profile, _ = UserProfile.objects.get_or_create(
-        user=request.user,
-        defaults={"role": UserProfile.ROLE_MASTER if request.user.is_staff else UserProfile.ROLE_PLAYER},
-    )
-    return {"is_master_user": profile.is_master, "user_profile": profile}
+    # Preguiçoso: redirect, página de erro e resposta que nem olha o perfil
+    # não pagam consulta nenhuma.
+    return {
+        "is_master_user": SimpleLazyObject(lambda: request_profile(request).is_master),
+        "user_profile": SimpleLazyObject(lambda: request_profile(request)),
+    }
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_cache(sender, instance, **kwargs):  # noqa: ANN001
+    # Apaga já (o próprio request vê o perfil novo) e de novo após o commit,
+    # para um request concorrente não regravar a versão antiga no meio-tempo.
+    # Cobre o ProfileEditForm, a escolha de papel e o admin.
+    key = profile_cache_key(instance.user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
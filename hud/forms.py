@@ -69,8 +69,7 @@ class CharacterForm(forms.ModelForm):
         # Make assigned_to required
         self.fields["assigned_to"].required = True
         # Customize queryset to use username as display label
-        if self.fields["assigned_to"].queryset.exists():
-            self.fields["assigned_to"].label_from_instance = lambda obj: obj.username
+        self.fields["assigned_to"].label_from_instance = lambda obj: obj.username
 
     def clean(self):  # noqa: WPS615
         cleaned = super().clean()
@@ -0,0 +1,187 @@
+"""
+Cache versionado dos fragmentos de template que quase nunca mudam entre cliques.
+
+Os cards de personagem, NPC, item e jogador em `campaign_detail.html` e a barra
+de navegação de `character_detail.html` são guardados com o `{% cache %}` do
+próprio Django. A chave de cada fragmento leva a **versão** de tudo que ele
+mostra, e a versão de um objeto é um token aleatório guardado no cache:
+
+- a view busca as versões de todos os objetos da página num `get_many` só e
+  as pendura em cada instância (`obj.fragment_version`);
+- o template usa essa versão (e o papel de quem olha) como `vary_on`;
+- os receivers abaixo apagam o token quando o objeto é salvo ou apagado (ou
+  quando a miniatura da imagem dele fica pronta, hud/thumbnails.py). O
+  próximo request sorteia um token novo, a chave muda e o fragmento velho
+  nunca mais é lido — expira sozinho.
+
+Token sumido (expirado, despejado, cache reiniciado) vira token novo, nunca
+volta a um antigo; no pior caso o fragmento é renderizado de novo.
+
+Nada com `{% csrf_token %}` ou com o usuário específico da request entra no
+fragmento: formulários e links "meu personagem" ficam de fora do `{% cache %}`.
+
+Funciona com qualquer backend de cache do Django. Com `locmem` e vários
+workers cada processo tem o seu cache, e o apagar de um não chega nos outros;
+por isso os templates guardam os fragmentos por só FRAGMENT_CACHE_SECONDS.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import uuid
+from typing import Iterable
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import thumbnails
+from .models import BAR_SENDERS, NPC, Character, Item, UserProfile, receiver_for
+
+User = get_user_model()
+
+# O mesmo valor vai literal no `{% cache 300 ... %}` dos templates.
+FRAGMENT_CACHE_SECONDS = 300
+# O token dura mais que qualquer fragmento que dependa dele.
+VERSION_CACHE_SECONDS = 24 * 60 * 60
+
+Dependency = tuple[str, int]
+
+
+def version_key(kind: str, pk: int) -> str:
+    return f"hud:fragver:{kind}:{pk}"
+
+
+def versions(dependencies: Iterable[Dependency]) -> dict[Dependency, str]:
+    """Versão atual de cada dependência, com uma ida ao cache para as que existem."""
+    keys = {dep: version_key(*dep) for dep in set(dependencies)}
+    found = cache.get_many(keys.values())
+    result = {}
+    for dep, key in keys.items():
+        token = found.get(key)
+        if token is None:
+            token = uuid.uuid4().hex[:12]
+            # Dois requests sorteando ao mesmo tempo: fica o primeiro.
+            if not cache.add(key, token, VERSION_CACHE_SECONDS):
+                token = cache.get(key, token)
+        result[dep] = token
+    return result
+
+
+def bump(kind: str, pk: int | None) -> None:
+    if pk is None:
+        return
+    key = version_key(kind, pk)
+    # Já, para o próprio request, e de novo depois do commit, para um request
+    # concorrente não sortear um token sobre a versão antiga nesse meio-tempo.
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+# --- O que cada fragmento mostra ---
+
+
+def character_dependencies(character: Character) -> list[Dependency]:
+    # Card: nome, imagem, visibilidade e o avatar/usuário do dono.
+    deps = [("character", character.pk)]
+    if character.assigned_to_id:
+        deps.append(("profile", character.assigned_to_id))
+    return deps
+
+
+def npc_dependencies(npc: NPC) -> list[Dependency]:
+    deps = [("npc", npc.pk)]
+    if npc.assigned_to_character_id:
+        deps.append(("character", npc.assigned_to_character_id))
+    return deps
+
+
+def item_dependencies(item: Item) -> list[Dependency]:
+    return [("item", item.pk)]
+
+
+def player_dependencies(user) -> list[Dependency]:  # noqa: ANN001
+    return [("profile", user.pk)]
+
+
+def stamp(
+    characters: Iterable[Character] = (),
+    npcs: Iterable[NPC] = (),
+    items: Iterable[Item] = (),
+    players: Iterable = (),
+) -> None:
+    """Pendura `fragment_version` em cada objeto, com um `get_many` para a página toda."""
+    entries: list[tuple[Model, list[Dependency]]] = []
+    entries += [(obj, character_dependencies(obj)) for obj in characters]
+    entries += [(obj, npc_dependencies(obj)) for obj in npcs]
+    entries += [(obj, item_dependencies(obj)) for obj in items]
+    entries += [(obj, player_dependencies(obj)) for obj in players]
+
+    current = versions(dep for _, deps in entries for dep in deps)
+    for obj, deps in entries:
+        obj.fragment_version = ".".join(current[dep] for dep in deps)
+
+
+def combined_version(objects: Iterable[Model]) -> str:
+    """Uma versão só para um fragmento que lista vários objetos já carimbados.
+
+    Entra a lista de ids junto: objeto que entra ou sai da lista também muda a chave.
+    """
+    parts = [f"{type(obj).__name__}:{obj.pk}:{obj.fragment_version}" for obj in objects]
+    return hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+# --- Invalidação ---
+
+
+@receiver(post_save, sender=Character)
+@receiver(post_delete, sender=Character)
+def bump_character(sender, instance, **kwargs):  # noqa: ANN001
+    bump("character", instance.pk)
+
+
+@receiver(post_save, sender=NPC)
+@receiver(post_delete, sender=NPC)
+def bump_npc(sender, instance, **kwargs):  # noqa: ANN001
+    bump("npc", instance.pk)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def bump_item(sender, instance, **kwargs):  # noqa: ANN001
+    bump("item", instance.pk)
+
+
+@receiver_for([post_save, post_delete], BAR_SENDERS)
+def bump_bar_owner(sender, instance, **kwargs):  # noqa: ANN001
+    bump(instance.owner_kind, instance.character_id or instance.npc_id)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_profile(sender, instance, **kwargs):  # noqa: ANN001
+    bump("profile", instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def bump_user(sender, instance, update_fields=None, **kwargs):  # noqa: ANN001
+    # O card mostra o username; o login grava só `last_login`.
+    if update_fields is not None and "username" not in update_fields:
+        return
+    bump("profile", instance.pk)
+
+
+@receiver(thumbnails.thumbnail_ready)
+def bump_on_thumbnail(sender, name, **kwargs):  # noqa: ANN001
+    # O card renderizado antes do derivado existir aponta para o original.
+    field, _ = thumbnails.FIELDS[sender]
+    rows = sender.objects.filter(**{field: name})
+    if sender is UserProfile:
+        for user_id in rows.values_list("user_id", flat=True):
+            bump("profile", user_id)
+    elif kind := {Character: "character", NPC: "npc", Item: "item"}.get(sender):
+        for pk in rows.values_list("pk", flat=True):
+            bump(kind, pk)
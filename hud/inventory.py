@@ -0,0 +1,207 @@
+"""
+Operações de inventário em lote.
+
+O drag-and-drop reorganiza um inventário em rajadas: várias trocas e
+atribuições em poucos segundos. Em vez de um POST por slot, o front junta as
+operações e manda tudo de uma vez; aqui elas são validadas contra a campanha,
+aplicadas em memória na ordem recebida e gravadas numa transação só.
+
+Um slot é endereçado por dono e posição, não por id:
+`{"owner": "character" | "npc", "id": <pk do dono>, "position": <1..capacidade>}`.
+Posição vazia não tem linha no banco (ver `InventorySlot`), então ela nem
+teria id.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import live, thumbnails
+from .models import NPC, Campaign, Character, EmptySlot, InventorySlot, Item, NPCInventorySlot
+
+# Uma rajada de drag-and-drop cabe folgada aqui; mais que isso é abuso.
+MAX_OPERATIONS = 200
+
+SLOT_MODELS = {
+    "character": (Character, InventorySlot, "character_id"),
+    "npc": (NPC, NPCInventorySlot, "npc_id"),
+}
+
+
+SlotKey = tuple[str, int, int]
+
+
+class InventoryError(ValueError):
+    """Lote inválido: nada dele é aplicado."""
+
+
+def _slot_key(ref: Any) -> SlotKey:
+    if not isinstance(ref, dict):
+        raise InventoryError("Slot inválido.")
+    owner = ref.get("owner")
+    if owner not in SLOT_MODELS:
+        raise InventoryError("Dono de slot inválido.")
+    try:
+        return owner, int(ref["id"]), int(ref["position"])
+    except (KeyError, TypeError, ValueError):
+        raise InventoryError("Slot inválido.") from None
+
+
+def _parse(operations: Any) -> list[tuple[str, list[SlotKey], int | None]]:
+    if not isinstance(operations, list) or not operations:
+        raise InventoryError("Nenhuma operação enviada.")
+    if len(operations) > MAX_OPERATIONS:
+        raise InventoryError(f"No máximo {MAX_OPERATIONS} operações por lote.")
+
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise InventoryError("Operação inválida.")
+        kind = operation.get("op")
+        if kind == "assign":
+            try:
+                item_id = int(operation["item_id"])
+            except (KeyError, TypeError, ValueError):
+                raise InventoryError("Item inválido.") from None
+            parsed.append((kind, [_slot_key(operation.get("slot"))], item_id))
+        elif kind == "clear":
+            parsed.append((kind, [_slot_key(operation.get("slot"))], None))
+        elif kind == "move":
+            parsed.append((kind, [_slot_key(operation.get("from")), _slot_key(operation.get("to"))], None))
+        elif kind == "swap":
+            parsed.append((kind, [_slot_key(operation.get("a")), _slot_key(operation.get("b"))], None))
+        else:
+            raise InventoryError("Operação desconhecida.")
+    return parsed
+
+
+def _load_slots(campaign: Campaign, keys: set[SlotKey]) -> dict[SlotKey, Any]:
+    """As posições pedidas, com a linha gravada ou um `EmptySlot` se estão vazias."""
+    slots: dict[SlotKey, Any] = {}
+    for owner, (owner_model, slot_model, owner_field) in SLOT_MODELS.items():
+        wanted = {(owner_id, position) for kind, owner_id, position in keys if kind == owner}
+        if not wanted:
+            continue
+        # Dono de outra campanha simplesmente não aparece e cai no erro abaixo.
+        capacities = dict(
+            owner_model.objects.filter(pk__in={owner_id for owner_id, _ in wanted}, campaign=campaign)
+            .values_list("pk", "inventory_capacity")
+        )
+        for owner_id, position in wanted:
+            if 1 <= position <= capacities.get(owner_id, 0):
+                slots[(owner, owner_id, position)] = EmptySlot(position)
+        rows = (
+            slot_model.objects.select_for_update()
+            .filter(**{f"{owner_field}__in": capacities.keys(), "position__in": {position for _, position in wanted}})
+        )
+        for slot in rows:
+            key = (owner, getattr(slot, owner_field), slot.position)
+            if key in slots:
+                slots[key] = slot
+    if keys - slots.keys():
+        raise InventoryError("Slot inexistente nesta campanha.")
+    return slots
+
+
+def slot_state(key: SlotKey, slot: Any, items: dict[int, Item]) -> dict[str, Any]:
+    owner, owner_id, position = key
+    item = items.get(slot.item_id) if slot.item_id else None
+    return {
+        "owner": owner,
+        "ownerId": owner_id,
+        "position": position,
+        "id": slot.pk,
+        "itemId": slot.item_id,
+        "itemName": item.name if item else "Vazio",
+        "itemImage": thumbnails.thumbnail_url(item.image, "card") if item else "",
+    }
+
+
+def apply_operations(campaign: Campaign, operations: Any) -> list[dict[str, Any]]:
+    """Aplica o lote inteiro ou nada e devolve o estado final dos slots tocados.
+
+    A permissão é do chamador: quem chega aqui já é o mestre da campanha.
+    """
+    parsed = _parse(operations)
+    keys = {key for _, refs, _ in parsed for key in refs}
+    item_ids = {item_id for kind, _, item_id in parsed if kind == "assign"}
+
+    with transaction.atomic():
+        slots = _load_slots(campaign, keys)
+        items = {item.pk: item for item in Item.objects.filter(pk__in=item_ids, campaign=campaign)}
+        if item_ids - items.keys():
+            raise InventoryError("Item inexistente nesta campanha.")
+
+        # Estado em memória: posição -> item, aplicado na ordem do lote.
+        state = {key: slot.item_id for key, slot in slots.items()}
+        for kind, refs, item_id in parsed:
+            if kind == "assign":
+                state[refs[0]] = item_id
+            elif kind == "clear":
+                state[refs[0]] = None
+            elif kind == "move":
+                source, target = refs
+                if source != target:
+                    state[target], state[source] = state[source], None
+            else:
+                a, b = refs
+                state[a], state[b] = state[b], state[a]
+
+        # Só posição ocupada tem linha: vazia que ganhou item é criada, ocupada
+        # que trocou de item é atualizada e a que esvaziou é apagada.
+        created: dict[str, list[Any]] = {owner: [] for owner in SLOT_MODELS}
+        updated: dict[str, list[Any]] = {owner: [] for owner in SLOT_MODELS}
+        emptied: dict[str, list[Any]] = {owner: [] for owner in SLOT_MODELS}
+        for key, slot in slots.items():
+            owner, owner_id, position = key
+            item_id = state[key]
+            if slot.item_id == item_id:
+                continue
+            if item_id is None:
+                emptied[owner].append(slot)
+                slots[key] = EmptySlot(position)
+            elif slot.pk is None:
+                slot_model, owner_field = SLOT_MODELS[owner][1:]
+                slots[key] = slot_model(
+                    **{owner_field: owner_id}, campaign_id=campaign.pk, position=position, item_id=item_id
+                )
+                created[owner].append(slots[key])
+            else:
+                slot.item_id = item_id
+                updated[owner].append(slot)
+
+        changed: dict[str, list[Any]] = {owner: created[owner] + updated[owner] for owner in SLOT_MODELS}
+        for owner, (owner_model, slot_model, owner_field) in SLOT_MODELS.items():
+            if emptied[owner]:
+                # delete() de queryset dispara os receivers de cada linha: a
+                # versão da página e o evento ao vivo do slot vazio saem deles.
+                slot_model.objects.filter(pk__in=[slot.pk for slot in emptied[owner]]).delete()
+            if created[owner]:
+                slot_model.objects.bulk_create(created[owner])
+            if updated[owner]:
+                slot_model.objects.bulk_update(updated[owner], ["item"])
+            if changed[owner]:
+                # bulk_create/bulk_update não disparam signals: a versão da
+                # página do dono (hud/conditional.py) é atualizada aqui.
+                owner_model.objects.filter(pk__in={getattr(slot, owner_field) for slot in changed[owner]}).update(
+                    updated_at=timezone.now()
+                )
+
+    # Itens que já estavam nos slots (não vieram no lote) para montar a resposta.
+    extra = {slot.item_id for slot in slots.values() if slot.item_id and slot.item_id not in items}
+    if extra:
+        items.update((item.pk, item) for item in Item.objects.filter(pk__in=extra))
+
+    # Nem publicam ao vivo: um evento por slot que ganhou ou trocou de item.
+    for owner, rows in changed.items():
+        if rows:
+            owner_model, _, owner_field = SLOT_MODELS[owner]
+            owners = owner_model.objects.in_bulk({getattr(slot, owner_field) for slot in rows})
+            for slot in rows:
+                live.publish(
+                    campaign.pk, live.slot_event(owner, slot, owners[getattr(slot, owner_field)], items.get(slot.item_id))
+                )
+    return [slot_state(key, slot, items) for key, slot in sorted(slots.items())]
@@ -0,0 +1,264 @@
+"""
+Fila de tarefas em segundo plano, guardada no próprio banco.
+
+O que não precisa acontecer dentro do request — mandar o e-mail de reset,
+gerar miniaturas, limpar tokens vencidos — vira uma linha de `Job` e sai do
+caminho: o request só faz um INSERT. `manage.py run_worker` executa a fila
+num pool de threads. Não há broker: SQLite ou PostgreSQL, o mesmo banco do
+painel.
+
+- `@task("nome")` registra a função; `enqueue("nome", **payload)` agenda. O
+  payload vai como JSON, então só ids, nomes e textos — nunca instâncias.
+- O INSERT entra na transação de quem agenda: se ela desfaz, a tarefa some
+  junto, e o worker nunca vê uma tarefa sobre dados que não foram gravados.
+- `claim()` pega tarefas com um `UPDATE ... WHERE status = 'queued'` por
+  linha: dois workers disputando a mesma só um ganha, sem `SELECT ... FOR
+  UPDATE` (que o SQLite não tem).
+- Tarefa que levanta exceção volta para a fila com espera exponencial
+  (`backoff * 2 ** (tentativa - 1)`, até `MAX_BACKOFF`); esgotadas as
+  tentativas, fica `failed` com o erro em `last_error`.
+- Tarefa presa em `running` há mais de `STALE_AFTER` (worker morto no meio)
+  volta para a fila. Por isso tarefas precisam ser idempotentes.
+- `PERIODIC` lista as tarefas que o worker agenda sozinho de tempos em tempos.
+
+Nos testes não há worker: `run_pending()` executa na thread atual tudo o que
+já venceu.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable
+
+from django.db import close_old_connections
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF = timedelta(hours=1)
+STALE_AFTER = timedelta(minutes=10)
+
+# Tarefa agendada pelo próprio worker -> intervalo entre execuções.
+PERIODIC: dict[str, timedelta] = {}
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable[..., Any]
+    max_attempts: int
+    backoff: timedelta
+
+
+TASKS: dict[str, Task] = {}
+
+
+def task(name: str, max_attempts: int = 5, backoff: timedelta = timedelta(seconds=10), every: timedelta | None = None):
+    """Registra a função como tarefa `name`; com `every`, o worker também a agenda sozinho."""
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        TASKS[name] = Task(name, func, max_attempts, backoff)
+        if every is not None:
+            PERIODIC[name] = every
+        return func
+
+    return decorator
+
+
+def enqueue(name: str, /, *, delay: timedelta | None = None, **payload: Any) -> Job:
+    """Agenda a tarefa `name` com `payload` (serializável em JSON)."""
+    spec = TASKS.get(name)
+    if spec is None:
+        raise LookupError(f"Tarefa desconhecida: {name!r}")
+    return Job.objects.create(
+        task=name,
+        payload=payload,
+        max_attempts=spec.max_attempts,
+        run_at=timezone.now() + (delay or timedelta(0)),
+    )
+
+
+def backoff_for(spec: Task, attempt: int) -> timedelta:
+    """Espera antes da próxima tentativa, dobrando a cada falha."""
+    return min(spec.backoff * 2 ** max(attempt - 1, 0), MAX_BACKOFF)
+
+
+# --- Execução ---
+
+
+def claim(worker_id: str, limit: int) -> list[Job]:
+    """Marca até `limit` tarefas vencidas como `running` para este worker e as devolve."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status=Job.STATUS_QUEUED, run_at__lte=now)
+        .order_by("run_at", "pk")
+        .values_list("pk", flat=True)[: limit * 2]
+    )
+    claimed = []
+    for pk in candidates:
+        if len(claimed) >= limit:
+            break
+        won = Job.objects.filter(pk=pk, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING, locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1
+        )
+        if won:
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by("run_at", "pk"))
+
+
+def run_job(job: Job) -> bool:
+    """Executa uma tarefa já reivindicada e grava o resultado. True se deu certo."""
+    spec = TASKS.get(job.task)
+    if spec is None:
+        # Nome que ninguém registra não melhora tentando de novo.
+        _finish(job, Job.STATUS_FAILED, f"Tarefa desconhecida: {job.task!r}")
+        logger.error("Tarefa desconhecida %s (#%s)", job.task, job.pk)
+        return False
+    try:
+        spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            _finish(job, Job.STATUS_FAILED, error)
+            logger.error("Tarefa %s (#%s) falhou de vez na tentativa %s", job.task, job.pk, job.attempts, exc_info=True)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_QUEUED,
+                run_at=timezone.now() + backoff_for(spec, job.attempts),
+                locked_by="",
+                locked_at=None,
+                last_error=error,
+            )
+            logger.warning("Tarefa %s (#%s) falhou na tentativa %s; vai de novo", job.task, job.pk, job.attempts, exc_info=True)
+        return False
+    _finish(job, Job.STATUS_DONE, "")
+    return True
+
+
+def _finish(job: Job, status: str, error: str) -> None:
+    Job.objects.filter(pk=job.pk).update(
+        status=status, finished_at=timezone.now(), locked_by="", locked_at=None, last_error=error
+    )
+
+
+def requeue_stale(stale_after: timedelta = STALE_AFTER) -> int:
+    """Devolve à fila as tarefas presas em `running` (o worker delas morreu)."""
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=timezone.now() - stale_after).update(
+        status=Job.STATUS_QUEUED, locked_by="", locked_at=None
+    )
+
+
+def schedule_periodic() -> list[str]:
+    """Agenda cada tarefa de `PERIODIC` que não tem execução pendente; devolve as agendadas.
+
+    A próxima vem um intervalo depois da última concluída, para reiniciar o
+    worker não disparar tudo de novo.
+    """
+    pending = set(
+        Job.objects.filter(task__in=PERIODIC, status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]).values_list(
+            "task", flat=True
+        )
+    )
+    last_runs = dict(
+        Job.objects.filter(task__in=PERIODIC, status=Job.STATUS_DONE)
+        .order_by()
+        .values("task")
+        .annotate(last=Max("finished_at"))
+        .values_list("task", "last")
+    )
+    now = timezone.now()
+    scheduled = []
+    for name, every in PERIODIC.items():
+        if name in pending:
+            continue
+        last = last_runs.get(name)
+        enqueue(name, delay=max(last + every - now, timedelta(0)) if last else None)
+        scheduled.append(name)
+    return scheduled
+
+
+def run_pending(worker_id: str = "inline") -> int:
+    """Executa na thread atual, em ordem, tudo o que já venceu; devolve quantas rodaram.
+
+    Tarefa que falha volta para a fila com `run_at` no futuro, então não roda
+    de novo nesta chamada.
+    """
+    count = 0
+    while jobs := claim(worker_id, 10):
+        for job in jobs:
+            run_job(job)
+            count += 1
+    return count
+
+
+class Worker:
+    """Laço do `run_worker`: reivindica tarefas e as executa num pool de threads.
+
+    A thread principal só consulta a fila; cada tarefa roda numa thread do
+    pool, com a conexão dela. `stop` (um `threading.Event`) encerra o laço
+    depois que as tarefas em andamento terminam.
+    """
+
+    def __init__(self, concurrency: int = 4, poll_interval: float = 1.0, stale_after: timedelta = STALE_AFTER) -> None:
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop = threading.Event()
+        self._next_periodic = 0.0
+
+    def run(self, burst: bool = False) -> int:
+        """Roda até `stop`; com `burst`, sai quando a fila vencida esvazia. Devolve quantas rodaram."""
+        count = 0
+        running: set[Future] = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="hud-job") as pool:
+            while not self.stop.is_set():
+                close_old_connections()
+                self._housekeeping(burst)
+                jobs = claim(self.id, self.concurrency - len(running))
+                running.update(pool.submit(self._run_in_thread, job) for job in jobs)
+                count += len(jobs)
+                if burst and not jobs and not running:
+                    break
+                if running:
+                    # Com vaga livre e fila cheia, volta logo; senão espera alguém terminar.
+                    running = set(
+                        wait(running, timeout=0 if jobs else self.poll_interval, return_when=FIRST_COMPLETED).not_done
+                    )
+                elif not jobs:
+                    self.stop.wait(self.poll_interval)
+            wait(running)
+        close_old_connections()
+        return count
+
+    def _housekeeping(self, burst: bool) -> None:
+        now = time.monotonic()
+        if now < self._next_periodic:
+            return
+        # Uma vez por minuto basta: os intervalos de PERIODIC são de horas.
+        self._next_periodic = now + 60
+        requeued = requeue_stale(self.stale_after)
+        if requeued:
+            logger.warning("%s tarefa(s) presa(s) voltaram para a fila", requeued)
+        if not burst:
+            schedule_periodic()
+
+    def _run_in_thread(self, job: Job) -> bool:
+        close_old_connections()
+        try:
+            return run_job(job)
+        finally:
+            close_old_connections()
@@ -0,0 +1,384 @@
+"""
+Eventos ao vivo por campanha (Server-Sent Events).
+
+Quando uma barra, a vida/SP ou a visibilidade de um personagem/NPC muda, os
+receivers abaixo publicam um delta pequeno no `broker` depois do commit. O
+endpoint `campaign_events` entrega esses deltas a quem está com a campanha
+aberta, e `hud/static/hud/live.js` remenda o DOM no lugar — ninguém precisa
+dar F5 para ver a vida do colega cair.
+
+O stream é assíncrono e só funciona servido por ASGI (`rpg_panel.asgi`). Os
+mesmos eventos alimentam a sessão de mesa por WebSocket (hud/table.py). Os
+dois conferem o acesso de novo a cada `ACCESS_CHECK_SECONDS`: quem saiu da
+campanha para de receber, e os personagens do jogador são relidos.
+
+O broker padrão é em processo: cada processo entrega os eventos das escritas
+que ele mesmo fez. Com mais de um worker, `LIVE_BROKER_URL=redis://...` troca
+para o `RedisBroker`, que publica no Redis e repassa o que chega de lá aos
+assinantes locais.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import thumbnails
+from .access import CampaignAccess
+from .models import BAR_SENDERS, NPC, SLOT_SENDERS, Character, EmptySlot, Item, SheetBar, SheetSlot, receiver_for
+
+logger = logging.getLogger(__name__)
+
+# Sem evento nenhum, manda um comentário de tempos em tempos para proxies e
+# balanceadores não derrubarem a conexão parada.
+HEARTBEAT_SECONDS = 15
+# Cliente lento demais perde os eventos mais velhos em vez de inchar a memória.
+QUEUE_SIZE = 256
+# Conexão aberta confere o acesso de novo de tempos em tempos: jogador
+# removido da campanha (ou que saiu dela) para de receber em até isso.
+ACCESS_CHECK_SECONDS = 15
+
+
+class Subscription:
+    """Fila de um cliente conectado, alimentada de qualquer thread."""
+
+    def __init__(self, campaign_id: int) -> None:
+        self.campaign_id = campaign_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(QUEUE_SIZE)
+
+    def push(self, event: dict[str, Any]) -> None:
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: dict[str, Any]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict[str, Any]:
+        return await self.queue.get()
+
+
+class Broker:
+    """Pub/sub em processo, uma lista de assinantes por campanha."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, campaign_id: int) -> Subscription:
+        subscription = Subscription(campaign_id)
+        with self._lock:
+            self._subscribers[campaign_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.campaign_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.campaign_id]
+
+    def publish(self, campaign_id: int, event: dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(campaign_id, ()))
+        for subscription in subscribers:
+            subscription.push(event)
+
+
+class RedisBroker(Broker):
+    """Broker para vários processos: publica no Redis e escuta tudo de lá.
+
+    Uma thread por processo assina `<prefixo>*` e entrega cada mensagem aos
+    assinantes locais, inclusive as que o próprio processo publicou.
+    """
+
+    CHANNEL_PREFIX = "rpg_panel:campaign:"
+    RECONNECT_SECONDS = 1
+
+    def __init__(self, url: str) -> None:
+        import redis  # só quem usa este backend precisa do pacote
+
+        super().__init__()
+        self._client = redis.Redis.from_url(url)
+        self._listener: threading.Thread | None = None
+
+    def subscribe(self, campaign_id: int) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="live-redis", daemon=True)
+                self._listener.start()
+        return super().subscribe(campaign_id)
+
+    def publish(self, campaign_id: int, event: dict[str, Any]) -> None:
+        self._client.publish(f"{self.CHANNEL_PREFIX}{campaign_id}", json.dumps(event, separators=(",", ":")))
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                for message in pubsub.listen():
+                    channel = message["channel"].decode()
+                    campaign_id = int(channel[len(self.CHANNEL_PREFIX):])
+                    super().publish(campaign_id, json.loads(message["data"]))
+            except Exception:  # noqa: BLE001 - a thread não pode morrer
+                logger.warning("Conexão com o Redis do ao vivo caiu; reconectando", exc_info=True)
+                time.sleep(self.RECONNECT_SECONDS)
+
+
+def make_broker(url: str) -> Broker:
+    """`memory://` (padrão) ou `redis://host:6379/0`."""
+    url = url.strip() or "memory://"
+    if url.startswith("memory://"):
+        return Broker()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBroker(url)
+    raise ValueError(f"LIVE_BROKER_URL com esquema não suportado: {url!r}")
+
+
+broker = make_broker(getattr(settings, "LIVE_BROKER_URL", ""))
+
+
+def publish(campaign_id: int | None, event: dict[str, Any]) -> None:
+    """Publica depois do commit: cliente nenhum vê estado que foi desfeito."""
+    if campaign_id is None:
+        return
+    transaction.on_commit(lambda: broker.publish(campaign_id, event))
+
+
+# ---------------------------------------------------------------------------
+# Formato dos eventos
+#
+# Todo evento leva `hidden`: quando o personagem/NPC está escondido, jogador
+# recebe só `{"type", "id", "visible": false}` — o suficiente para sumir com o
+# card — e o mestre recebe o delta inteiro. Evento de NPC (e das barras e
+# slots dele) leva `linked_to`, o personagem a que ele está vinculado, e o de
+# personagem leva `player_id`: jogador só vê NPC vinculado a um personagem
+# dele, como no `character_detail` (veja `Viewer`). As três chaves são de
+# roteamento e não chegam ao cliente.
+# ---------------------------------------------------------------------------
+
+ROUTING_KEYS = ("hidden", "linked_to", "player_id")
+
+
+def character_event(character: Character) -> dict[str, Any]:
+    return {
+        "type": "character",
+        "id": character.pk,
+        "visible": character.visible,
+        "hp_current": character.hp_current,
+        "hp_max": character.hp_max,
+        "sp_current": character.sp_current,
+        "sp_max": character.sp_max,
+        "hidden": not character.visible,
+        "player_id": character.assigned_to_id,
+    }
+
+
+def npc_event(npc: NPC) -> dict[str, Any]:
+    return {
+        "type": "npc",
+        "id": npc.pk,
+        "visible": npc.visible,
+        "character_id": npc.assigned_to_character_id,
+        "hp_current": npc.hp_current,
+        "hp_max": npc.hp_max,
+        "sp_current": npc.sp_current,
+        "sp_max": npc.sp_max,
+        "hidden": not npc.visible,
+        "linked_to": npc.assigned_to_character_id,
+    }
+
+
+def _linked(owner: Character | NPC) -> dict[str, Any]:
+    return {"linked_to": owner.assigned_to_character_id} if isinstance(owner, NPC) else {}
+
+
+def bar_event(bar: SheetBar, owner: Character | NPC, deleted: bool = False) -> dict[str, Any]:
+    event: dict[str, Any] = {
+        "type": "bar_deleted" if deleted else "bar",
+        "owner": "npc" if isinstance(owner, NPC) else "character",
+        "owner_id": owner.pk,
+        "id": bar.pk,
+        "hidden": not owner.visible,
+        **_linked(owner),
+    }
+    if not deleted:
+        event.update(name=bar.name, current=bar.current, max_value=bar.max_value, color=bar.color)
+    return event
+
+
+def slot_event(
+    owner_kind: str, slot: SheetSlot | EmptySlot, owner: Character | NPC, item: Item | None
+) -> dict[str, Any]:
+    return {
+        "type": "slot",
+        "owner": owner_kind,
+        "owner_id": owner.pk,
+        "id": slot.pk,
+        "position": slot.position,
+        "item_id": item.pk if item else None,
+        "item_name": item.name if item else "Vazio",
+        "item_image": thumbnails.thumbnail_url(item.image, "card") if item else "",
+        "hidden": not owner.visible,
+        **_linked(owner),
+    }
+
+
+class Viewer:
+    """Quem está do outro lado de um stream (SSE ou mesa) e o que ele pode ver.
+
+    O mestre vê tudo. O jogador vê personagem e NPC visíveis, e NPC só se
+    estiver vinculado a um dos personagens dele (`characters`). O conjunto
+    acompanha os eventos de personagem: personagem que passa a ser dele (ou
+    deixa de ser) vale já no próximo evento, sem reconectar.
+    """
+
+    def __init__(self, is_master: bool, user_id: int | None = None, characters: Iterable[int] = ()) -> None:
+        self.is_master = is_master
+        self.user_id = user_id
+        self.characters = set(characters)
+
+    @classmethod
+    def load(cls, access: CampaignAccess) -> Viewer:
+        """O `Viewer` de um acesso já liberado; jogador custa uma consulta."""
+        if access.is_master:
+            return cls(True, access.user.pk)
+        characters = Character.objects.filter(campaign=access.campaign, assigned_to=access.user)
+        return cls(False, access.user.pk, characters.values_list("pk", flat=True))
+
+    @classmethod
+    def recheck(cls, access: CampaignAccess) -> Viewer | None:
+        """O `Viewer` relido de uma conexão aberta; None se ela perdeu o acesso."""
+        access = CampaignAccess(access.campaign, access.user, preview=access.preview)
+        return cls.load(access) if access.allowed else None
+
+    def track(self, event: dict[str, Any]) -> None:
+        if event["type"] != "character":
+            return
+        if event.get("player_id") == self.user_id:
+            self.characters.add(event["id"])
+        else:
+            self.characters.discard(event["id"])
+
+
+def for_viewer(event: dict[str, Any], viewer: Viewer) -> dict[str, Any] | None:
+    """O que um cliente pode ver do evento, ou `None` se nada."""
+    viewer.track(event)
+    payload = {key: value for key, value in event.items() if key not in ROUTING_KEYS}
+    if viewer.is_master:
+        return payload
+    foreign_npc = "linked_to" in event and event["linked_to"] not in viewer.characters
+    if not foreign_npc and not event.get("hidden"):
+        return payload
+    if event["type"] in ("character", "npc"):
+        return {"type": event["type"], "id": event["id"], "visible": False}
+    return None
+
+
+def database(func: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    """`sync_to_async` que larga conexões velhas, como o fim de um request faria."""
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=True)
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(access: CampaignAccess, viewer: Viewer) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    subscription = broker.subscribe(access.campaign.pk)
+    check_at = loop.time() + ACCESS_CHECK_SECONDS
+    try:
+        # Reconecta em 3s se a conexão cair.
+        yield "retry: 3000\n\n"
+        while True:
+            if loop.time() >= check_at:
+                fresh = await database(Viewer.recheck)(access)
+                if fresh is None:
+                    # Perdeu o acesso: o stream acaba e a reconexão leva 403.
+                    return
+                viewer.characters = fresh.characters
+                check_at = loop.time() + ACCESS_CHECK_SECONDS
+            try:
+                timeout = min(HEARTBEAT_SECONDS, check_at - loop.time())
+                event = await asyncio.wait_for(subscription.get(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            payload = for_viewer(event, viewer)
+            if payload is not None:
+                yield format_sse(payload)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# ---------------------------------------------------------------------------
+# Receivers
+# ---------------------------------------------------------------------------
+
+
+def _surviving_owner(instance: SheetBar | SheetSlot) -> Character | NPC | None:
+    """O dono ainda no banco; None quando a linha saiu junto com ele."""
+    if instance.character_id is not None:
+        return Character.objects.filter(pk=instance.character_id).first()
+    return NPC.objects.filter(pk=instance.npc_id).first()
+
+
+@receiver(post_save, sender=Character)
+def publish_character(sender, instance: Character, **kwargs):  # noqa: ANN001
+    publish(instance.campaign_id, character_event(instance))
+
+
+@receiver(post_save, sender=NPC)
+def publish_npc(sender, instance: NPC, **kwargs):  # noqa: ANN001
+    publish(instance.campaign_id, npc_event(instance))
+
+
+@receiver_for(post_save, BAR_SENDERS)
+def publish_bar(sender, instance: SheetBar, **kwargs):  # noqa: ANN001
+    owner = instance.owner
+    publish(owner.campaign_id, bar_event(instance, owner))
+
+
+@receiver_for(post_delete, BAR_SENDERS)
+def publish_bar_deleted(sender, instance: SheetBar, **kwargs):  # noqa: ANN001
+    owner = _surviving_owner(instance)
+    if owner is not None:
+        publish(owner.campaign_id, bar_event(instance, owner, deleted=True))
+
+
+@receiver_for(post_save, SLOT_SENDERS)
+def publish_slot(sender, instance: SheetSlot, **kwargs):  # noqa: ANN001
+    owner = instance.owner
+    publish(owner.campaign_id, slot_event(instance.owner_kind, instance, owner, instance.item))
+
+
+@receiver_for(post_delete, SLOT_SENDERS)
+def publish_slot_emptied(sender, instance: SheetSlot, **kwargs):  # noqa: ANN001
+    # Slot sem item não tem linha: apagar a linha é esvaziar a posição.
+    owner = _surviving_owner(instance)
+    if owner is not None:
+        publish(owner.campaign_id, slot_event(instance.owner_kind, EmptySlot(instance.position), owner, None))
+
@@ -0,0 +1,57 @@
+"""Gera as miniaturas WebP que faltam para as imagens já enviadas."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from hud import jobs, thumbnails
+
+
+class Command(BaseCommand):
+    help = "Gera as miniaturas WebP das imagens já existentes em media/."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regera as miniaturas mesmo que já existam.",
+        )
+        parser.add_argument(
+            "--enqueue",
+            action="store_true",
+            help="Agenda uma tarefa por imagem para o worker em vez de gerar aqui.",
+        )
+
+    def handle(self, *args, force: bool = False, enqueue: bool = False, **options):
+        created = failed = queued = 0
+        for model, (field, sizes) in thumbnails.FIELDS.items():
+            storage = model._meta.get_field(field).storage
+            names = (
+                model.objects.exclude(**{f"{field}__isnull": True})
+                .exclude(**{field: ""})
+                .values_list(field, flat=True)
+                .distinct()
+            )
+            for name in names.iterator():
+                missing = [
+                    size for size in sizes if force or not storage.exists(thumbnails.thumbnail_name(name, size))
+                ]
+                if not missing:
+                    continue
+                if enqueue:
+                    jobs.enqueue("generate_thumbnails", model=model._meta.label_lower, name=name, sizes=missing)
+                    queued += 1
+                    continue
+                done = [size for size in missing if thumbnails.generate(storage, name, size, force=force)]
+                created += len(done)
+                failed += len(missing) - len(done)
+                if done:
+                    # Páginas e cards que mostravam o original trocam de versão.
+                    thumbnails.thumbnail_ready.send(sender=model, name=name)
+
+        if enqueue:
+            self.stdout.write(self.style.SUCCESS(f"{queued} imagem(ns) agendada(s) para o worker."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"{created} miniatura(s) gerada(s)."))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} imagem(ns) ilegível(is) ou ausente(s) ficaram sem miniatura."))
@@ -0,0 +1,91 @@
+"""Mede latência, consultas por request e vazão dos endpoints quentes num banco descartável."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from hud import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Semeia campanhas sintéticas num banco de teste e mede os endpoints quentes "
+        "pelo test client e por HTTP concorrente. Resultado em JSON."
+    )
+
+    def add_arguments(self, parser):
+        sizes = parser.add_argument_group("tamanho dos dados semeados")
+        for name, default in benchmark.DEFAULT_SIZES.items():
+            sizes.add_argument(f"--{name}", type=int, default=default, help=f"Padrão: {default}.")
+        parser.add_argument(
+            "--targets",
+            default=",".join(benchmark.TARGETS),
+            help="Alvos separados por vírgula. Padrão: todos.",
+        )
+        parser.add_argument("--iterations", type=int, default=50, help="Requests por alvo no test client.")
+        parser.add_argument("--warmup", type=int, default=3, help="Requests descartadas antes de medir.")
+        parser.add_argument(
+            "--http-requests", type=int, default=200, help="Requests por alvo na fase HTTP (0 pula a fase)."
+        )
+        parser.add_argument("--concurrency", type=int, default=8, help="Clientes HTTP simultâneos.")
+        parser.add_argument("--output", help="Grava o JSON neste arquivo em vez de imprimir.")
+        parser.add_argument("--compare", help="JSON de uma rodada anterior para comparar.")
+
+    def handle(self, *args, **options):
+        targets = tuple(t.strip() for t in options["targets"].split(",") if t.strip())
+        unknown = set(targets) - set(benchmark.TARGETS)
+        if unknown:
+            raise CommandError(f"Alvo(s) desconhecido(s): {', '.join(sorted(unknown))}")
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = json.loads(Path(options["compare"]).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Não consegui ler {options['compare']}: {exc}") from exc
+
+        sizes = {name: options[name] for name in benchmark.DEFAULT_SIZES}
+        self.stderr.write("Criando o banco de benchmark...")
+        with benchmark.isolated_database(), override_settings(ALLOWED_HOSTS=["testserver", "127.0.0.1"]):
+            report = benchmark.run(
+                sizes,
+                targets,
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                http_requests=options["http_requests"],
+                concurrency=options["concurrency"],
+            )
+
+        if baseline is not None:
+            report["comparison"] = benchmark.compare(report, baseline)
+
+        payload = json.dumps(report, indent=2, ensure_ascii=False)
+        if not options["output"]:
+            self.stdout.write(payload)
+            return
+        Path(options["output"]).write_text(payload + "\n")
+        self.print_summary(report)
+        self.stdout.write(self.style.SUCCESS(f"Resultado gravado em {options['output']}."))
+
+    def print_summary(self, report):
+        for phase in ("client", "http"):
+            for target, row in report.get(phase, {}).items():
+                extra = (
+                    f"{row['queries_per_request']:>6} q/req"
+                    if phase == "client"
+                    else f"{row['throughput_rps']:>8} req/s"
+                )
+                self.stdout.write(
+                    f"{phase:<6} {target:<18} p50 {row['p50_ms']:>8} ms  p95 {row['p95_ms']:>8} ms  "
+                    f"p99 {row['p99_ms']:>8} ms  {extra}  erros {row['errors']}"
+                )
+        for row in report.get("comparison", []):
+            if row["change_pct"] is None:
+                continue
+            self.stdout.write(
+                f"{row['phase']:<6} {row['target']:<18} {row['metric']:<20} "
+                f"{row['before']} -> {row['after']} ({row['change_pct']:+}%)"
+            )
@@ -0,0 +1,60 @@
+"""Planos de execução e latência das consultas quentes, sem e com os índices compostos."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hud import benchmark, query_plans
+
+
+class Command(BaseCommand):
+    help = (
+        "Semeia um banco descartável grande e compara EXPLAIN e latência das consultas "
+        "quentes antes e depois da migração dos índices. Resultado em JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=query_plans.DEFAULT_ROWS, help=f"Linhas semeadas. Padrão: {query_plans.DEFAULT_ROWS}."
+        )
+        parser.add_argument(
+            "--queries",
+            default=",".join(query_plans.QUERIES),
+            help="Consultas separadas por vírgula. Padrão: todas.",
+        )
+        parser.add_argument("--iterations", type=int, default=200, help="Execuções medidas por consulta.")
+        parser.add_argument("--output", help="Grava o JSON neste arquivo em vez de imprimir.")
+
+    def handle(self, *args, **options):
+        queries = tuple(q.strip() for q in options["queries"].split(",") if q.strip())
+        unknown = set(queries) - set(query_plans.QUERIES)
+        if unknown:
+            raise CommandError(f"Consulta(s) desconhecida(s): {', '.join(sorted(unknown))}")
+        if options["rows"] < 1 or options["iterations"] < 1:
+            raise CommandError("--rows e --iterations precisam ser positivos.")
+
+        self.stderr.write(f"Criando o banco e semeando ~{options['rows']} linhas...")
+        with benchmark.isolated_database():
+            report = query_plans.run(options["rows"], queries, options["iterations"])
+
+        payload = json.dumps(report, indent=2, ensure_ascii=False)
+        if not options["output"]:
+            self.stdout.write(payload)
+            return
+        Path(options["output"]).write_text(payload + "\n")
+        self.print_summary(report)
+        self.stdout.write(self.style.SUCCESS(f"Resultado gravado em {options['output']}."))
+
+    def print_summary(self, report):
+        for name, row in report["queries"].items():
+            change = row["p50_change_pct"]
+            self.stdout.write(
+                f"{name:<20} p50 {row['before']['p50_ms']:>8} ms -> {row['after']['p50_ms']:>8} ms"
+                + (f" ({change:+}%)" if change is not None else "")
+            )
+            for phase in ("before", "after"):
+                for line in row[phase]["plan"]:
+                    self.stdout.write(f"    {phase:<6} {line}")
@@ -0,0 +1,26 @@
+"""Exporta uma campanha inteira para um .zip (ver hud/archive.py)."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hud import archive
+from hud.models import Campaign
+
+
+class Command(BaseCommand):
+    help = "Grava a campanha (fichas, itens, NPCs, jogadores e imagens) num .zip importável."
+
+    def add_arguments(self, parser):
+        parser.add_argument("campaign", type=int, help="Id da campanha.")
+        parser.add_argument("--output", help="Arquivo de saída. Padrão: campanha-<id>.zip.")
+
+    def handle(self, *args, campaign: int, output: str | None = None, **options):
+        try:
+            obj = Campaign.objects.select_related("master").get(pk=campaign)
+        except Campaign.DoesNotExist:
+            raise CommandError(f"Campanha {campaign} não existe.") from None
+        path = output or archive.archive_filename(obj)
+        with open(path, "wb") as target:
+            size = archive.write_archive(obj, target)
+        self.stdout.write(self.style.SUCCESS(f"'{obj.name}' exportada em {path} ({size} bytes)."))
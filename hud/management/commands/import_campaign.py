@@ -0,0 +1,35 @@
+"""Importa um .zip de export_campaign como campanha nova (ver hud/archive.py)."""
+
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from hud import archive
+
+
+class Command(BaseCommand):
+    help = "Cria uma campanha nova a partir de um .zip gerado por export_campaign."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo .zip.")
+        parser.add_argument("--master", required=True, help="Usuário que será o mestre da campanha importada.")
+        parser.add_argument("--name", help="Nome da campanha nova. Padrão: o do arquivo.")
+        parser.add_argument(
+            "--batch-size", type=int, default=archive.BATCH_SIZE, help=f"Registros por INSERT. Padrão: {archive.BATCH_SIZE}."
+        )
+
+    def handle(self, *args, path: str, master: str, name: str | None = None, batch_size: int, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=master)
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{master}' não existe.") from None
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser positivo.")
+        try:
+            campaign, counts = archive.import_archive(path, user, name=name, batch_size=batch_size)
+        except archive.ArchiveError as exc:
+            raise CommandError(str(exc)) from exc
+        summary = ", ".join(f"{kind}: {total}" for kind, total in counts.items()) or "nenhum registro"
+        self.stdout.write(self.style.SUCCESS(f"Campanha '{campaign.name}' (id {campaign.pk}) importada — {summary}."))
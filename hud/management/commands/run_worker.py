@@ -0,0 +1,51 @@
+"""Executa a fila de tarefas em segundo plano (hud/jobs.py)."""
+
+from __future__ import annotations
+
+import signal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hud import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa as tarefas em segundo plano (e-mail de reset, miniaturas, limpezas) "
+        "num pool de threads, com novas tentativas e espera exponencial."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Tarefas ao mesmo tempo. Padrão: 4.")
+        parser.add_argument(
+            "--poll-interval", type=float, default=1.0, help="Segundos entre consultas à fila vazia. Padrão: 1."
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=int(jobs.STALE_AFTER.total_seconds()),
+            help="Segundos até uma tarefa em andamento ser dada como abandonada e voltar à fila.",
+        )
+        parser.add_argument(
+            "--burst", action="store_true", help="Sai quando não houver mais tarefa vencida (cron, deploy)."
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["poll_interval"] <= 0 or options["stale_after"] < 1:
+            raise CommandError("--concurrency, --poll-interval e --stale-after precisam ser positivos.")
+        worker = jobs.Worker(
+            concurrency=options["concurrency"],
+            poll_interval=options["poll_interval"],
+            stale_after=timedelta(seconds=options["stale_after"]),
+        )
+
+        def shutdown(signum, frame):  # noqa: ANN001
+            self.stderr.write("Encerrando depois das tarefas em andamento...")
+            worker.stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stderr.write(f"Worker {worker.id} com {worker.concurrency} thread(s). Tarefas: {', '.join(sorted(jobs.TASKS))}.")
+        count = worker.run(burst=options["burst"])
+        self.stdout.write(self.style.SUCCESS(f"{count} tarefa(s) executada(s)."))
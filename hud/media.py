@@ -0,0 +1,206 @@
+"""
+Uploads com nome pelo conteúdo e servidos com cache longo.
+
+Retratos, banners e itens aparecem em toda página da campanha. Servidos sem
+cabeçalho de cache, o navegador baixa de novo (ou no mínimo pergunta) a cada
+visita. Aqui:
+
+- `HashedMediaStorage` grava cada upload como `<nome>.<hash>.<ext>`, com os
+  12 primeiros hex do SHA-256 do conteúdo. Conteúdo novo é nome novo, então a
+  URL nunca muda de conteúdo e pode ser cacheada para sempre. O mesmo arquivo
+  enviado duas vezes vira um arquivo só. As miniaturas (`thumbs/...`) ficam
+  fora do hash: o nome delas já deriva do original.
+- `serve()` entrega os arquivos de `MEDIA_ROOT` com ETag, Last-Modified,
+  `Cache-Control: public, max-age=31536000, immutable` para nomes com hash
+  (e as miniaturas deles) e revalidação para o resto (uploads antigos), e
+  `Range` de um intervalo só (`206`/`416`). O corpo vai por `FileResponse`,
+  que usa o `wsgi.file_wrapper` do servidor (sendfile no gunicorn); com
+  `MEDIA_ACCEL_REDIRECT` definido, a resposta sai vazia com
+  `X-Accel-Redirect` e o nginx manda o arquivo.
+
+Imagens já são comprimidas (JPEG, PNG, WebP): gzip não ganha nada nelas, então
+não há variante pré-comprimida.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from pathlib import Path
+from typing import Iterator
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .thumbnails import PREFIX as THUMBS_PREFIX
+
+HASH_LENGTH = 12
+# `foto.3f2a9c1b7d4e.png`, e a miniatura dele
+# `thumbs/mini-96q80v1/foto.3f2a9c1b7d4e.png.webp` (hud/thumbnails.py): o
+# diretório muda com tudo o que muda a imagem gerada, então ela é imutável também.
+HASHED = re.compile(rf"\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})\.[A-Za-z0-9]+(?:\.webp)?$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+CHUNK_SIZE = 64 * 1024
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """`FileSystemStorage` que põe o hash do conteúdo no nome de cada upload."""
+
+    def save(self, name, content, max_length=None):  # noqa: ANN001, ANN201
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            return super().save(name, content, max_length)
+        name = self.generate_filename(name)
+        if name.startswith(THUMBS_PREFIX + "/"):
+            return super().save(name, content, max_length)
+        name = self.hashed_name(name, content, max_length)
+        if self.exists(name):
+            # Mesmo conteúdo, mesmo nome: o arquivo já está lá.
+            return name
+        return super().save(name, content, max_length)
+
+    @staticmethod
+    def hashed_name(name: str, content, max_length: int | None = None) -> str:  # noqa: ANN001
+        digest = hashlib.sha256()
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        directory, filename = posixpath.split(name)
+        stem, ext = posixpath.splitext(filename)
+        # Reenvio de um arquivo que já tinha hash (importação de campanha) não acumula dois.
+        stem = re.sub(rf"\.[0-9a-f]{{{HASH_LENGTH}}}$", "", stem)
+        suffix = f".{digest.hexdigest()[:HASH_LENGTH]}{ext}"
+        if max_length is not None:
+            # Corta o nome, nunca o hash: o `get_available_name` cortaria do fim.
+            room = max_length - len(posixpath.join(directory, suffix))
+            stem = stem[: max(room, 1)]
+        return posixpath.join(directory, stem + suffix)
+
+
+def is_immutable(name: str) -> bool:
+    return HASHED.search(name) is not None
+
+
+def _etag(name: str, stat: os.stat_result) -> str:
+    match = HASHED.search(name)
+    if match and not name.startswith(THUMBS_PREFIX + "/"):
+        return quote_etag(match["hash"])
+    return quote_etag(f"{int(stat.st_mtime):x}-{stat.st_size:x}")
+
+
+class _Unsatisfiable(Exception):
+    pass
+
+
+def _byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """`Range: bytes=a-b` → (início, fim inclusivo). None para servir o arquivo inteiro.
+
+    Vários intervalos ou cabeçalho malformado são ignorados (a RFC permite);
+    intervalo fora do arquivo levanta `_Unsatisfiable`.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # `bytes=-500`: os últimos 500.
+            suffix = int(last)
+            if suffix == 0:
+                raise _Unsatisfiable
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise _Unsatisfiable
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request: HttpRequest, etag: str, mtime: int) -> bool:
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    if value.startswith(('"', 'W/"')):
+        return value == etag
+    date = parse_http_date_safe(value)
+    return date is not None and date >= mtime
+
+
+def _read(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with path.open("rb") as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve(request: HttpRequest, name: str) -> HttpResponse:
+    """Entrega `MEDIA_ROOT/name` com cache, validação condicional e Range."""
+    try:
+        path = Path(safe_join(settings.MEDIA_ROOT, name))
+        stat = path.stat()
+    except (SuspiciousFileOperation, ValueError, OSError):
+        raise Http404("Arquivo não encontrado") from None
+    if not path.is_file():
+        raise Http404("Arquivo não encontrado")
+
+    etag = _etag(name, stat)
+    mtime = int(stat.st_mtime)
+    size = stat.st_size
+
+    response = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if response is None:
+        content_type, _ = mimetypes.guess_type(path.name)
+        content_type = content_type or "application/octet-stream"
+        accel = getattr(settings, "MEDIA_ACCEL_REDIRECT", "")
+        byte_range = None
+        if request.headers.get("Range") and _if_range_matches(request, etag, mtime):
+            try:
+                byte_range = _byte_range(request.headers["Range"], size)
+            except _Unsatisfiable:
+                response = HttpResponse(status=416)
+                response.headers["Content-Range"] = f"bytes */{size}"
+                return response
+
+        if accel:
+            # O nginx lê o arquivo, responde o Range e calcula o tamanho.
+            response = HttpResponse(content_type=content_type)
+            response.headers["X-Accel-Redirect"] = accel.rstrip("/") + "/" + name
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(_read(path, start, end - start + 1), status=206, content_type=content_type)
+            response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response.headers["Content-Length"] = str(end - start + 1)
+        else:
+            response = FileResponse(path.open("rb"), content_type=content_type)
+        response.headers["Accept-Ranges"] = "bytes"
+
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(mtime)
+    if is_immutable(name):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def reconcile_slots(apps, schema_editor):
+    """Acerta os slots uma última vez: a partir daqui só o save() mexe neles.
+
+    Até esta migração, abrir a ficha chamava `ensure_slots()` e corrigia
+    qualquer inventário torto. Agora a página é leitura pura, então dado
+    antigo que nunca passou por ela precisa sair daqui já consistente.
+    """
+    for owner_model, slot_model, owner_field in (
+        ('Character', 'InventorySlot', 'character'),
+        ('NPC', 'NPCInventorySlot', 'npc'),
+    ):
+        Owner = apps.get_model('hud', owner_model)
+        Slot = apps.get_model('hud', slot_model)
+        for owner_id, capacity in Owner.objects.values_list('id', 'inventory_capacity').iterator():
+            existing = set(
+                Slot.objects.filter(**{f'{owner_field}_id': owner_id}).values_list('position', flat=True)
+            )
+            Slot.objects.bulk_create(
+                [
+                    Slot(**{f'{owner_field}_id': owner_id, 'position': pos})
+                    for pos in range(1, capacity + 1)
+                    if pos not in existing
+                ],
+                ignore_conflicts=True,
+            )
+            Slot.objects.filter(**{f'{owner_field}_id': owner_id, 'position__gt': capacity}).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hud', '0012_merge_20260805_1221'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconcile_slots, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:26
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import OperationalError, migrations, models
+
+FTS_TABLE = 'hud_playersearch_fts'
+
+FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        document,
+        content='hud_playersearchentry',
+        content_rowid='user_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER hud_playersearch_ai AFTER INSERT ON hud_playersearchentry BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.user_id, new.document);
+    END""",
+    f"""CREATE TRIGGER hud_playersearch_ad AFTER DELETE ON hud_playersearchentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.user_id, old.document);
+    END""",
+    f"""CREATE TRIGGER hud_playersearch_au AFTER UPDATE ON hud_playersearchentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.user_id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.user_id, new.document);
+    END""",
+]
+
+
+def create_fts(apps, schema_editor):
+    """Tabela FTS5 espelhando os documentos; sem FTS5 a busca usa trigramas."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(FTS_SQL[0])
+        except OperationalError:
+            # SQLite compilado sem FTS5.
+            return
+        for statement in FTS_SQL[1:]:
+            cursor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for trigger in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS hud_playersearch_{trigger}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+# Cópias de hud/search.py como estavam nesta migração: migração não importa
+# código do app, que pode mudar depois.
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    folded = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    return ' '.join(_NON_WORD.sub(' ', folded).split())
+
+
+def prefix_trigrams(word):
+    padded = f'  {word}'
+    return [padded[i:i + 3] for i in range(len(word))]
+
+
+def document_for(username, nickname='', display_name=''):
+    return ' ' + normalize(' '.join(filter(None, (username, nickname, display_name))))
+
+
+def index_existing_users(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Entry = apps.get_model('hud', 'PlayerSearchEntry')
+    Trigram = apps.get_model('hud', 'PlayerSearchTrigram')
+    rows = User.objects.values_list('pk', 'username', 'profile__nickname', 'profile__display_name')
+    for user_id, *texts in rows.iterator():
+        document = document_for(*texts)
+        Entry.objects.create(user_id=user_id, document=document)
+        grams = {gram for word in document.split() for gram in prefix_trigrams(word)}
+        Trigram.objects.bulk_create([Trigram(user_id=user_id, gram=gram) for gram in grams])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('hud', '0013_reconcile_inventory_slots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerSearchEntry',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('document', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlayerSearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('gram', 'user'), name='unique_search_gram_per_user')],
+            },
+        ),
+        migrations.RunPython(create_fts, reverse_code=drop_fts),
+        migrations.RunPython(index_existing_users, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def summarize_existing_campaigns(apps, schema_editor):
+    Campaign = apps.get_model('hud', 'Campaign')
+    CampaignSummary = apps.get_model('hud', 'CampaignSummary')
+    campaigns = Campaign.objects.annotate(
+        n_players=Count('players', distinct=True),
+        n_characters=Count('characters', distinct=True),
+        n_npcs=Count('npcs', distinct=True),
+        n_items=Count('items', distinct=True),
+    )
+    CampaignSummary.objects.bulk_create(
+        CampaignSummary(
+            campaign_id=campaign.pk,
+            player_count=campaign.n_players,
+            character_count=campaign.n_characters,
+            npc_count=campaign.n_npcs,
+            item_count=campaign.n_items,
+            last_activity_at=campaign.updated_at,
+        )
+        for campaign in campaigns.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hud', '0014_player_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignSummary',
+            fields=[
+                ('campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='hud.campaign')),
+                ('player_count', models.PositiveIntegerField(default=0)),
+                ('character_count', models.PositiveIntegerField(default=0)),
+                ('npc_count', models.PositiveIntegerField(default=0)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(summarize_existing_campaigns, reverse_code=migrations.RunPython.noop),
+    ]
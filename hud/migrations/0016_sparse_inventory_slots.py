@@ -0,0 +1,55 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+SLOT_MODELS = (
+    ('Character', 'InventorySlot', 'character'),
+    ('NPC', 'NPCInventorySlot', 'npc'),
+)
+
+
+def drop_empty_slots(apps, schema_editor):
+    """Posição vazia deixa de ter linha: só as ocupadas ficam gravadas."""
+    for _, slot_model, _ in SLOT_MODELS:
+        apps.get_model('hud', slot_model).objects.filter(item__isnull=True).delete()
+
+
+def restore_empty_slots(apps, schema_editor):
+    """Volta à grade cheia: uma linha por posição até a capacidade."""
+    for owner_model, slot_model, owner_field in SLOT_MODELS:
+        Owner = apps.get_model('hud', owner_model)
+        Slot = apps.get_model('hud', slot_model)
+        for owner_id, capacity in Owner.objects.values_list('id', 'inventory_capacity').iterator():
+            existing = set(
+                Slot.objects.filter(**{f'{owner_field}_id': owner_id}).values_list('position', flat=True)
+            )
+            Slot.objects.bulk_create(
+                [
+                    Slot(**{f'{owner_field}_id': owner_id, 'position': pos})
+                    for pos in range(1, capacity + 1)
+                    if pos not in existing
+                ],
+                ignore_conflicts=True,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hud', '0015_campaign_summary'),
+    ]
+
+    operations = [
+        # Ida: apaga as vazias antes do NOT NULL. Volta: o campo já aceita NULL
+        # de novo quando a grade cheia é recriada.
+        migrations.RunPython(drop_empty_slots, reverse_code=restore_empty_slots),
+        migrations.AlterField(
+            model_name='inventoryslot',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='hud.item'),
+        ),
+        migrations.AlterField(
+            model_name='npcinventoryslot',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='npc_slots', to='hud.item'),
+        ),
+    ]
@@ -0,0 +1,156 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# (nome antigo do personagem, nome antigo do NPC, tabela nova)
+SECTIONS = (
+    ('CharacterSkill', 'NPCSkill', 'SheetSkill'),
+    ('CharacterAbility', 'NPCAbility', 'SheetAbility'),
+    ('CharacterBar', 'NPCBar', 'SheetBar'),
+    ('CharacterAttribute', 'NPCAttribute', 'SheetAttribute'),
+    ('InventorySlot', 'NPCInventorySlot', 'SheetSlot'),
+)
+RELATED_NAMES = {
+    'SheetSkill': 'skills',
+    'SheetAbility': 'abilities',
+    'SheetBar': 'bars',
+    'SheetAttribute': 'attributes',
+    'SheetSlot': 'slots',
+}
+# Colunas copiadas de cada tabela de NPC, além do dono.
+COLUMNS = {
+    'SheetSkill': ('name', 'value', 'order'),
+    'SheetAbility': ('name', 'order'),
+    'SheetBar': ('name', 'current', 'max_value', 'color', 'order'),
+    'SheetAttribute': ('name', 'value', 'order'),
+    'SheetSlot': ('position', 'item_id'),
+}
+
+
+def merge_npc_rows(apps, schema_editor):
+    """As linhas de NPC entram na tabela única; todas ganham a campanha do dono.
+
+    As linhas de personagem já estão lá (a tabela foi renomeada) e mantêm os
+    ids. As de NPC ganham ids novos.
+    """
+    Character = apps.get_model('hud', 'Character')
+    NPC = apps.get_model('hud', 'NPC')
+    character_campaigns = dict(Character.objects.values_list('id', 'campaign_id'))
+    npc_campaigns = dict(NPC.objects.values_list('id', 'campaign_id'))
+    for _, npc_model, table in SECTIONS:
+        Sheet = apps.get_model('hud', table)
+        Old = apps.get_model('hud', npc_model)
+        Sheet.objects.bulk_create(
+            (
+                Sheet(npc_id=row.npc_id, campaign_id=npc_campaigns.get(row.npc_id), **{
+                    column: getattr(row, column) for column in COLUMNS[table]
+                })
+                for row in Old.objects.iterator()
+            ),
+            batch_size=500,
+        )
+        by_campaign: dict = {}
+        for pk, character_id in Sheet.objects.filter(character__isnull=False).values_list('id', 'character_id'):
+            by_campaign.setdefault(character_campaigns.get(character_id), []).append(pk)
+        for campaign_id, pks in by_campaign.items():
+            if campaign_id is not None:
+                for start in range(0, len(pks), 500):
+                    Sheet.objects.filter(pk__in=pks[start:start + 500]).update(campaign_id=campaign_id)
+
+
+def split_npc_rows(apps, schema_editor):
+    """Volta: as linhas de NPC saem da tabela única para a tabela própria."""
+    for _, npc_model, table in SECTIONS:
+        Sheet = apps.get_model('hud', table)
+        Old = apps.get_model('hud', npc_model)
+        rows = Sheet.objects.filter(npc__isnull=False)
+        Old.objects.bulk_create(
+            (
+                Old(npc_id=row.npc_id, **{column: getattr(row, column) for column in COLUMNS[table]})
+                for row in rows.iterator()
+            ),
+            batch_size=500,
+        )
+        rows.delete()
+
+
+def _owner_fields(table):
+    # Sem índice de uma coluna: `(campaign, dono)` abaixo, `(dono, order, name)`
+    # da 0018 e os únicos `(dono, position)` dos slots já começam por elas.
+    related_name = RELATED_NAMES[table]
+    return [
+        migrations.AlterField(
+            model_name=table.lower(),
+            name='character',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name=related_name, to='hud.character', db_index=False),
+        ),
+        migrations.AddField(
+            model_name=table.lower(),
+            name='npc',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name=related_name, to='hud.npc', db_index=False),
+        ),
+        migrations.AddField(
+            model_name=table.lower(),
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='hud.campaign', db_index=False),
+        ),
+    ]
+
+
+def _constraints(table):
+    name = table.lower()
+    return [
+        migrations.AddIndex(
+            model_name=name,
+            index=models.Index(fields=['campaign', 'character'], name=f'{name}_campaign_char'),
+        ),
+        migrations.AddIndex(
+            model_name=name,
+            index=models.Index(fields=['campaign', 'npc'], name=f'{name}_campaign_npc'),
+        ),
+        migrations.AddConstraint(
+            model_name=name,
+            constraint=models.CheckConstraint(
+                condition=models.Q(('character__isnull', False), ('npc__isnull', True))
+                | models.Q(('character__isnull', True), ('npc__isnull', False)),
+                name=f'{name}_one_owner',
+            ),
+        ),
+    ]
+
+
+def _proxies(character_model, npc_model, table):
+    return [
+        migrations.CreateModel(
+            name=model,
+            fields=[],
+            options={'proxy': True, 'indexes': [], 'constraints': []},
+            bases=(f'hud.{table.lower()}',),
+        )
+        for model in (character_model, npc_model)
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hud', '0016_sparse_inventory_slots'),
+    ]
+
+    operations = [
+        # A tabela do personagem vira a tabela única (ids preservados) e ganha
+        # as colunas `npc` e `campaign`.
+        *[
+            operation
+            for character_model, _, table in SECTIONS
+            for operation in (migrations.RenameModel(character_model, table), *_owner_fields(table))
+        ],
+        migrations.AlterUniqueTogether(
+            name='sheetslot',
+            unique_together={('character', 'position'), ('npc', 'position')},
+        ),
+        migrations.RunPython(merge_npc_rows, reverse_code=split_npc_rows),
+        *[migrations.DeleteModel(npc_model) for _, npc_model, _ in SECTIONS],
+        *[operation for table in RELATED_NAMES for operation in _constraints(table)],
+        # Os nomes antigos continuam como proxies (hud/models.py).
+        *[operation for section in SECTIONS for operation in _proxies(*section)],
+    ]
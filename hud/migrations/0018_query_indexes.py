@@ -0,0 +1,61 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hud', '0017_unified_sheet_tables'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(condition=models.Q(('visible', True)), fields=['campaign', 'name'], name='character_visible_by_name'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['campaign', 'assigned_to'], name='character_campaign_player'),
+        ),
+        migrations.AddIndex(
+            model_name='npc',
+            index=models.Index(fields=['campaign', 'assigned_to_character', 'name'], name='npc_campaign_linked'),
+        ),
+        migrations.AddIndex(
+            model_name='passwordresettoken',
+            index=models.Index(fields=['expires_at'], name='reset_token_expiry'),
+        ),
+        migrations.AddIndex(
+            model_name='sheetability',
+            index=models.Index(fields=['character', 'order', 'name'], name='sheetability_char_order'),
+        ),
+        migrations.AddIndex(
+            model_name='sheetability',
+            index=models.Index(fields=['npc', 'order', 'name'], name='sheetability_npc_order'),
+        ),
+        migrations.AddIndex(
+            model_name='sheetattribute',
+            index=models.Index(fields=['character', 'order', 'name'], name='sheetattribute_char_order'),
+        ),
+        migrations.AddIndex(
+            model_name='sheetattribute',
+            index=models.Index(fields=['npc', 'order', 'name'], name='sheetattribute_npc_order'),
+        ),
+        migrations.AddIndex(
+            model_name='sheetbar',
+            index=models.Index(fields=['character', 'order', 'name'], name='sheetbar_char_order'),
+        ),
+        migrations.AddIndex(
+            model_name='sheetbar',
+            index=models.Index(fields=['npc', 'order', 'name'], name='sheetbar_npc_order'),
+        ),
+        migrations.AddIndex(
+            model_name='sheetskill',
+            index=models.Index(fields=['character', 'order', 'name'], name='sheetskill_char_order'),
+        ),
+        migrations.AddIndex(
+            model_name='sheetskill',
+            index=models.Index(fields=['npc', 'order', 'name'], name='sheetskill_npc_order'),
+        ),
+    ]
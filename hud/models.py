@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+from typing import Iterable
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 
 INVENTORY_ROWS = 4
@@ -36,6 +39,25 @@ class Campaign(models.Model):
         return self.name
 
 
+class CampaignSummary(models.Model):
+    """Contagens da campanha para os dashboards, mantidas por `hud/summaries.py`.
+
+    Uma linha por campanha, lida junto com ela (`select_related("summary")`).
+    """
+
+    campaign = models.OneToOneField(
+        Campaign,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="summary",
+    )
+    player_count = models.PositiveIntegerField(default=0)
+    character_count = models.PositiveIntegerField(default=0)
+    npc_count = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+
+
 class UserProfile(models.Model):
     ROLE_MASTER = "MASTER"
     ROLE_PLAYER = "PLAYER"
@@ -66,6 +88,38 @@ class UserProfile(models.Model):
         return self.role == self.ROLE_PLAYER
 
 
+class PlayerSearchEntry(models.Model):
+    """Texto normalizado (sem acento, minúsculo) de usuário, apelido e nome.
+
+    Mantido por `hud/search.py`; no SQLite com FTS5 alimenta também a tabela
+    virtual `hud_playersearch_fts` por triggers.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_entry",
+    )
+    document = models.TextField(blank=True)
+
+
+class PlayerSearchTrigram(models.Model):
+    """Trigramas de prefixo do documento de busca, para bancos sem FTS5."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="search_trigrams",
+    )
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["gram", "user"], name="unique_search_gram_per_user"),
+        ]
+
+
 class NPC(models.Model):
     campaign = models.ForeignKey(
         Campaign,
@@ -99,6 +153,11 @@ class NPC(models.Model):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # NPCs vinculados a um personagem, já em ordem de nome (a ficha do
+            # jogador); a saída da campanha usa o prefixo.
+            models.Index(fields=["campaign", "assigned_to_character", "name"], name="npc_campaign_linked"),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - simple display
         return self.name
@@ -107,21 +166,35 @@ class NPC(models.Model):
         self.hp_current = min(self.hp_current, self.hp_max)
         self.sp_current = min(self.sp_current, self.sp_max)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):  # noqa: ANN001, ANN206
+        instance = super().from_db(db, field_names, values)
+        # Capacidade como está no banco: o save() só mexe nos slots se ela mudar.
+        instance._saved_capacity = instance.__dict__.get("inventory_capacity")
+        # Campanha como está no banco: quem troca de campanha é recontado nas duas.
+        instance._saved_campaign_id = instance.__dict__.get("campaign_id")
+        return instance
+
     def save(self, *args, **kwargs):  # type: ignore[override]
         self.clamp_stats()
-        return super().save(*args, **kwargs)
+        # Quem acabou de nascer não tem slot gravado nem ficha a mover.
+        capacity_changed = not self._state.adding and self.inventory_capacity != getattr(self, "_saved_capacity", None)
+        campaign_changed = not self._state.adding and self.campaign_id != getattr(self, "_saved_campaign_id", self.campaign_id)
+        result = super().save(*args, **kwargs)
+        if capacity_changed:
+            self.ensure_slots()
+        if campaign_changed:
+            move_sheet(self)
+        self._saved_capacity = self.inventory_capacity
+        return result
 
     def ensure_slots(self) -> None:
-        existing = set(self.slots.values_list("position", flat=True))
-        # Cria slots faltantes
-        missing = [pos for pos in range(1, self.inventory_capacity + 1) if pos not in existing]
-        NPCInventorySlot.objects.bulk_create(
-            [NPCInventorySlot(npc=self, position=pos) for pos in missing],
-            ignore_conflicts=True,
-        )
-        # Remove slots excedentes (quando capacidade diminui)
+        # Só as posições ocupadas têm linha; o que sobrou além da capacidade sai.
         self.slots.filter(position__gt=self.inventory_capacity).delete()
 
+    def inventory(self) -> list[SheetSlot | EmptySlot]:
+        return slot_layout(self.inventory_capacity, self.slots.select_related("item"))
+
 
 class Character(models.Model):
     campaign = models.ForeignKey(
@@ -156,6 +229,14 @@ class Character(models.Model):
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # Lista do jogador: só os visíveis, já em ordem de nome. Parcial porque
+            # o Django escreve `visible=True` como `WHERE "visible"`, que não casa
+            # com uma coluna de índice, mas casa com o WHERE do índice.
+            models.Index(fields=["campaign", "name"], condition=models.Q(visible=True), name="character_visible_by_name"),
+            # Personagens de um jogador na campanha (`leave_campaign`, remoção pelo mestre).
+            models.Index(fields=["campaign", "assigned_to"], name="character_campaign_player"),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - simple display
         return self.name
@@ -164,221 +245,381 @@ class Character(models.Model):
         self.hp_current = min(self.hp_current, self.hp_max)
         self.sp_current = min(self.sp_current, self.sp_max)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):  # noqa: ANN001, ANN206
+        instance = super().from_db(db, field_names, values)
+        # Capacidade como está no banco: o save() só mexe nos slots se ela mudar.
+        instance._saved_capacity = instance.__dict__.get("inventory_capacity")
+        # Campanha como está no banco: quem troca de campanha é recontado nas duas.
+        instance._saved_campaign_id = instance.__dict__.get("campaign_id")
+        return instance
+
     def save(self, *args, **kwargs):  # type: ignore[override]
         self.clamp_stats()
-        return super().save(*args, **kwargs)
+        # Quem acabou de nascer não tem slot gravado nem ficha a mover.
+        capacity_changed = not self._state.adding and self.inventory_capacity != getattr(self, "_saved_capacity", None)
+        campaign_changed = not self._state.adding and self.campaign_id != getattr(self, "_saved_campaign_id", self.campaign_id)
+        result = super().save(*args, **kwargs)
+        if capacity_changed:
+            self.ensure_slots()
+        if campaign_changed:
+            move_sheet(self)
+        self._saved_capacity = self.inventory_capacity
+        return result
 
     def ensure_slots(self) -> None:
-        existing = set(self.slots.values_list("position", flat=True))
-        # Cria slots faltantes
-        missing = [pos for pos in range(1, self.inventory_capacity + 1) if pos not in existing]
-        InventorySlot.objects.bulk_create(
-            [InventorySlot(character=self, position=pos) for pos in missing],
-            ignore_conflicts=True,
-        )
-        # Remove slots excedentes (quando capacidade diminui)
+        # Só as posições ocupadas têm linha; o que sobrou além da capacidade sai.
         self.slots.filter(position__gt=self.inventory_capacity).delete()
 
+    def inventory(self) -> list[SheetSlot | EmptySlot]:
+        return slot_layout(self.inventory_capacity, self.slots.select_related("item"))
 
-class CharacterSkill(models.Model):
-    character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name="skills")
-    name = models.CharField(max_length=80)
-    value = models.CharField(max_length=40, blank=True)
-    order = models.PositiveIntegerField(default=0)
+
+class Item(models.Model):
+    campaign = models.ForeignKey(
+        Campaign,
+        on_delete=models.CASCADE,
+        related_name="items",
+        null=True,
+        blank=True,
+    )
+    name = models.CharField(max_length=120)
+    image = models.ImageField(upload_to="items/", null=True, blank=True)
+    description = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="items",
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ["order", "name"]
+        ordering = ["name"]
 
     def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.character.name}: {self.name}"
+        return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):  # noqa: ANN001, ANN206
+        instance = super().from_db(db, field_names, values)
+        # Campanha como está no banco (ver hud/summaries.py).
+        instance._saved_campaign_id = instance.__dict__.get("campaign_id")
+        return instance
 
-class CharacterAbility(models.Model):
-    character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name="abilities")
-    name = models.CharField(max_length=80)
-    order = models.PositiveIntegerField(default=0)
 
-    class Meta:
-        ordering = ["order", "name"]
+class SlotGeometry:
+    """Rótulo e lugar na grade, calculados da posição (1..capacidade)."""
 
-    def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.character.name}: {self.name}"
+    position: int
 
+    @property
+    def label(self) -> str:
+        return f"Slot {self.position}"
 
-class CharacterBar(models.Model):
-    character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name="bars")
-    name = models.CharField(max_length=80)
-    current = models.IntegerField(default=0)
-    max_value = models.IntegerField(default=100)
-    color = models.CharField(max_length=20, default="#ff4444")
-    order = models.PositiveIntegerField(default=0)
+    @property
+    def row(self) -> int:
+        return (self.position - 1) // INVENTORY_COLUMNS
 
-    class Meta:
-        ordering = ["order", "name"]
+    @property
+    def col(self) -> int:
+        return (self.position - 1) % INVENTORY_COLUMNS
 
-    def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.character.name}: {self.name}"
 
+class EmptySlot(SlotGeometry):
+    """Posição livre do inventário: não tem linha no banco."""
+
+    pk = None
+    id = None
+    item = None
+    item_id = None
+
+    def __init__(self, position: int) -> None:
+        self.position = position
+
+    def __repr__(self) -> str:  # pragma: no cover - simple display
+        return f"<EmptySlot {self.position}>"
 
-class CharacterAttribute(models.Model):
-    character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name="attributes")
-    name = models.CharField(max_length=80)
-    value = models.CharField(max_length=40)
-    order = models.PositiveIntegerField(default=0)
+
+def slot_layout(capacity: int, stored: Iterable[SlotGeometry]) -> list[SlotGeometry]:
+    """A grade inteira, posição 1 a `capacity`, a partir só das ocupadas."""
+    occupied = {slot.position: slot for slot in stored}
+    return [occupied.get(position) or EmptySlot(position) for position in range(1, capacity + 1)]
+
+
+# ---------------------------------------------------------------------------
+# Ficha: barras, perícias, habilidades, atributos e slots
+#
+# Personagem e NPC têm as mesmas seções na ficha, então cada seção é uma
+# tabela só, com dois donos possíveis (`character` ou `npc`, exatamente um) e
+# a campanha do dono copiada na linha: as barras de uma campanha inteira saem
+# de uma consulta, sem UNION. Os nomes antigos (`CharacterBar`, `NPCBar`...)
+# continuam como proxies que só enxergam as linhas do seu tipo de dono.
+# ---------------------------------------------------------------------------
+
+
+class SheetEntry(models.Model):
+    """Linha da ficha de um personagem ou de um NPC.
+
+    Os FKs não levam índice próprio (`db_index=False`): `campaign` abre os
+    índices `(campaign, dono)` abaixo, e `character`/`npc` abrem os
+    `(dono, order, name)` de `OrderedSheetEntry` e os únicos `(dono,
+    position)` de `SheetSlot`. Um índice de uma coluna só seria escrita a
+    mais a cada barra salva.
+    """
+
+    campaign = models.ForeignKey(
+        Campaign, on_delete=models.CASCADE, null=True, blank=True, related_name="+", db_index=False
+    )
 
     class Meta:
-        ordering = ["order", "name"]
+        abstract = True
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(character__isnull=False, npc__isnull=True)
+                | models.Q(character__isnull=True, npc__isnull=False),
+                name="%(class)s_one_owner",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["campaign", "character"], name="%(class)s_campaign_char"),
+            models.Index(fields=["campaign", "npc"], name="%(class)s_campaign_npc"),
+        ]
 
-    def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.character.name}: {self.name} = {self.value}"
+    @property
+    def owner_kind(self) -> str:
+        return "character" if self.character_id is not None else "npc"
+
+    @property
+    def owner(self) -> Character | NPC:
+        return self.character if self.character_id is not None else self.npc
+
+    def save(self, *args, **kwargs):  # type: ignore[override]
+        # A campanha vem do dono; quem cria pelo dono já carregado não paga consulta.
+        if self._state.adding and self.campaign_id is None:
+            self.campaign_id = self.owner.campaign_id
+        return super().save(*args, **kwargs)
+
+
+class OrderedSheetEntry(SheetEntry):
+    """Seção listada na ordem do mestre: `order`, depois `name`, dono a dono."""
+
+    class Meta(SheetEntry.Meta):
+        abstract = True
+        ordering = ["order", "name"]
+        indexes = [
+            *SheetEntry.Meta.indexes,
+            # A ficha lê a seção de um dono já ordenada, sem ordenar em memória.
+            models.Index(fields=["character", "order", "name"], name="%(class)s_char_order"),
+            models.Index(fields=["npc", "order", "name"], name="%(class)s_npc_order"),
+        ]
 
 
-class NPCSkill(models.Model):
-    npc = models.ForeignKey(NPC, on_delete=models.CASCADE, related_name="skills")
+class SheetSkill(OrderedSheetEntry):
+    character = models.ForeignKey(
+        Character, on_delete=models.CASCADE, null=True, blank=True, related_name="skills", db_index=False
+    )
+    npc = models.ForeignKey(
+        NPC, on_delete=models.CASCADE, null=True, blank=True, related_name="skills", db_index=False
+    )
     name = models.CharField(max_length=80)
     value = models.CharField(max_length=40, blank=True)
     order = models.PositiveIntegerField(default=0)
 
-    class Meta:
-        ordering = ["order", "name"]
-
     def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.npc.name}: {self.name}"
+        return f"{self.owner.name}: {self.name}"
 
 
-class NPCAbility(models.Model):
-    npc = models.ForeignKey(NPC, on_delete=models.CASCADE, related_name="abilities")
+class SheetAbility(OrderedSheetEntry):
+    character = models.ForeignKey(
+        Character, on_delete=models.CASCADE, null=True, blank=True, related_name="abilities", db_index=False
+    )
+    npc = models.ForeignKey(
+        NPC, on_delete=models.CASCADE, null=True, blank=True, related_name="abilities", db_index=False
+    )
     name = models.CharField(max_length=80)
     order = models.PositiveIntegerField(default=0)
 
-    class Meta:
-        ordering = ["order", "name"]
-
     def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.npc.name}: {self.name}"
+        return f"{self.owner.name}: {self.name}"
 
 
-class NPCBar(models.Model):
-    npc = models.ForeignKey(NPC, on_delete=models.CASCADE, related_name="bars")
+class SheetBar(OrderedSheetEntry):
+    character = models.ForeignKey(
+        Character, on_delete=models.CASCADE, null=True, blank=True, related_name="bars", db_index=False
+    )
+    npc = models.ForeignKey(
+        NPC, on_delete=models.CASCADE, null=True, blank=True, related_name="bars", db_index=False
+    )
     name = models.CharField(max_length=80)
     current = models.IntegerField(default=0)
     max_value = models.IntegerField(default=100)
     color = models.CharField(max_length=20, default="#ff4444")
     order = models.PositiveIntegerField(default=0)
 
-    class Meta:
-        ordering = ["order", "name"]
-
     def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.npc.name}: {self.name}"
+        return f"{self.owner.name}: {self.name}"
 
 
-class NPCAttribute(models.Model):
-    npc = models.ForeignKey(NPC, on_delete=models.CASCADE, related_name="attributes")
+class SheetAttribute(OrderedSheetEntry):
+    character = models.ForeignKey(
+        Character, on_delete=models.CASCADE, null=True, blank=True, related_name="attributes", db_index=False
+    )
+    npc = models.ForeignKey(
+        NPC, on_delete=models.CASCADE, null=True, blank=True, related_name="attributes", db_index=False
+    )
     name = models.CharField(max_length=80)
     value = models.CharField(max_length=40)
     order = models.PositiveIntegerField(default=0)
 
-    class Meta:
-        ordering = ["order", "name"]
-
     def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.npc.name}: {self.name} = {self.value}"
+        return f"{self.owner.name}: {self.name} = {self.value}"
 
 
-class Item(models.Model):
-    campaign = models.ForeignKey(
-        Campaign,
-        on_delete=models.CASCADE,
-        related_name="items",
-        null=True,
-        blank=True,
+class SheetSlot(SlotGeometry, SheetEntry):
+    """Uma posição ocupada do inventário.
+
+    O armazenamento é esparso: posição vazia não tem linha, e apagar o item
+    apaga a linha junto (o slot volta a ser vazio). A grade completa sai de
+    `Character.inventory()` / `NPC.inventory()`.
+    """
+
+    character = models.ForeignKey(
+        Character, on_delete=models.CASCADE, null=True, blank=True, related_name="slots", db_index=False
     )
-    name = models.CharField(max_length=120)
-    image = models.ImageField(upload_to="items/", null=True, blank=True)
-    description = models.TextField(blank=True)
-    created_by = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.SET_NULL,
-        related_name="items",
-        null=True,
-        blank=True,
+    npc = models.ForeignKey(
+        NPC, on_delete=models.CASCADE, null=True, blank=True, related_name="slots", db_index=False
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    position = models.PositiveIntegerField()
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="slots")
 
-    class Meta:
-        ordering = ["name"]
+    class Meta(SheetEntry.Meta):
+        ordering = ["position"]
+        unique_together = [("character", "position"), ("npc", "position")]
 
     def __str__(self) -> str:  # pragma: no cover - simple display
-        return self.name
+        return f"{self.owner.name} slot {self.position}"
 
 
-class InventorySlot(models.Model):
-    character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name="slots")
-    position = models.PositiveIntegerField()
-    item = models.ForeignKey(Item, null=True, blank=True, on_delete=models.SET_NULL, related_name="slots")
+class OwnerKindManager(models.Manager):
+    """Só as linhas de um tipo de dono — o que as tabelas antigas continham."""
+
+    def __init__(self, owner_field: str) -> None:
+        super().__init__()
+        self.owner_field = owner_field
+
+    def get_queryset(self) -> models.QuerySet:
+        return super().get_queryset().filter(**{f"{self.owner_field}__isnull": False})
+
+
+class CharacterSkill(SheetSkill):
+    objects = OwnerKindManager("character")
 
     class Meta:
-        ordering = ["position"]
-        unique_together = ("character", "position")
+        proxy = True
 
-    def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.character.name} slot {self.position}"
 
-    @property
-    def label(self) -> str:
-        return f"Slot {self.position}"
+class NPCSkill(SheetSkill):
+    objects = OwnerKindManager("npc")
 
-    @property
-    def row(self) -> int:
-        return (self.position - 1) // INVENTORY_COLUMNS
+    class Meta:
+        proxy = True
 
-    @property
-    def col(self) -> int:
-        return (self.position - 1) % INVENTORY_COLUMNS
 
+class CharacterAbility(SheetAbility):
+    objects = OwnerKindManager("character")
 
-class NPCInventorySlot(models.Model):
-    npc = models.ForeignKey(NPC, on_delete=models.CASCADE, related_name="slots")
-    position = models.PositiveIntegerField()
-    item = models.ForeignKey(Item, null=True, blank=True, on_delete=models.SET_NULL, related_name="npc_slots")
+    class Meta:
+        proxy = True
+
+
+class NPCAbility(SheetAbility):
+    objects = OwnerKindManager("npc")
 
     class Meta:
-        ordering = ["position"]
-        unique_together = ("npc", "position")
+        proxy = True
 
-    def __str__(self) -> str:  # pragma: no cover - simple display
-        return f"{self.npc.name} slot {self.position}"
 
-    @property
-    def label(self) -> str:
-        return f"Slot {self.position}"
+class CharacterBar(SheetBar):
+    objects = OwnerKindManager("character")
 
-    @property
-    def row(self) -> int:
-        return (self.position - 1) // INVENTORY_COLUMNS
+    class Meta:
+        proxy = True
 
-    @property
-    def col(self) -> int:
-        return (self.position - 1) % INVENTORY_COLUMNS
 
+class NPCBar(SheetBar):
+    objects = OwnerKindManager("npc")
 
-@receiver(post_save, sender=get_user_model())
-def create_user_profile(sender, instance, created, **kwargs):  # noqa: ANN001
-    if created:
-        UserProfile.objects.create(user=instance)
+    class Meta:
+        proxy = True
 
 
-@receiver(post_save, sender=Character)
-def create_character_slots(sender, instance: Character, created: bool, **kwargs):  # noqa: ANN001
-    if created:
-        instance.ensure_slots()
+class CharacterAttribute(SheetAttribute):
+    objects = OwnerKindManager("character")
+
+    class Meta:
+        proxy = True
+
+
+class NPCAttribute(SheetAttribute):
+    objects = OwnerKindManager("npc")
+
+    class Meta:
+        proxy = True
+
+
+class InventorySlot(SheetSlot):
+    objects = OwnerKindManager("character")
 
+    class Meta:
+        proxy = True
+
+
+class NPCInventorySlot(SheetSlot):
+    objects = OwnerKindManager("npc")
+
+    class Meta:
+        proxy = True
+
+
+SHEET_TABLES = (SheetSkill, SheetAbility, SheetBar, SheetAttribute, SheetSlot)
+
+# Os signals chegam com a classe da instância: a tabela (relação reversa,
+# cascata) ou um dos proxies. Receivers da ficha ouvem a família inteira.
+BAR_SENDERS = (SheetBar, CharacterBar, NPCBar)
+SLOT_SENDERS = (SheetSlot, InventorySlot, NPCInventorySlot)
+SHEET_SENDERS = (
+    SheetSkill, CharacterSkill, NPCSkill,
+    SheetAbility, CharacterAbility, NPCAbility,
+    *BAR_SENDERS,
+    SheetAttribute, CharacterAttribute, NPCAttribute,
+    *SLOT_SENDERS,
+)
+
+
+def receiver_for(signals, senders):  # noqa: ANN001, ANN201
+    """`@receiver` para vários senders de uma vez."""
+
+    def decorator(func):  # noqa: ANN001, ANN202
+        for sender in senders:
+            receiver(signals, sender=sender)(func)
+        return func
+
+    return decorator
+
+
+def move_sheet(owner: Character | NPC) -> None:
+    """Dono trocou de campanha: as linhas da ficha vão junto."""
+    field = "npc" if isinstance(owner, NPC) else "character"
+    for table in SHEET_TABLES:
+        table.objects.filter(**{field: owner}).update(campaign=owner.campaign_id)
 
-@receiver(post_save, sender=NPC)
-def create_npc_slots(sender, instance: NPC, created: bool, **kwargs):  # noqa: ANN001
+
+@receiver(post_save, sender=get_user_model())
+def create_user_profile(sender, instance, created, **kwargs):  # noqa: ANN001
     if created:
-        instance.ensure_slots()
+        UserProfile.objects.create(user=instance)
 
 
 class PasswordResetToken(models.Model):
@@ -394,6 +635,48 @@ class PasswordResetToken(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # O link acha o token pelo índice único de `token`; este atende a
+            # limpeza dos vencidos, que hoje varre a tabela inteira.
+            models.Index(fields=["expires_at"], name="reset_token_expiry"),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"Reset token for {self.user.username}"
+
+
+class Job(models.Model):
+    """Tarefa em segundo plano, executada pelo `manage.py run_worker` (hud/jobs.py)."""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, "Na fila"),
+        (STATUS_RUNNING, "Rodando"),
+        (STATUS_DONE, "Concluída"),
+        (STATUS_FAILED, "Falhou"),
+    )
+
+    task = models.CharField(max_length=80)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=80, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["run_at", "id"]
+        indexes = [
+            # O worker só procura as da fila que já venceram, na ordem de execução.
+            models.Index(fields=["status", "run_at"], name="job_due"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - simple display
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,257 @@
+"""
+Instrumentação por request: SQL, render de template e tempo de view.
+
+`RequestProfilingMiddleware` mede cada request e:
+
+- devolve o resumo no header `Server-Timing` (só para staff, por padrão), que o
+  DevTools do navegador mostra na aba de rede;
+- grava uma linha de log JSON no logger `hud.profiling` — INFO normalmente,
+  WARNING quando o request é lento ou repete a mesma consulta várias vezes
+  (cara de N+1);
+- guarda uma amostra dos requests num buffer circular em memória, que o staff
+  vê em `/admin/profiling/` agrupado por view. Request lento entra sempre.
+
+As consultas repetidas são agrupadas por *fingerprint*: o SQL com espaços
+normalizados, números trocados por `?` e listas de `IN (...)` colapsadas, de
+modo que `campaign.players.all()` rodado para cada personagem aparece como uma
+linha só com a contagem ao lado.
+
+Os tempos se sobrepõem: `view` inclui o SQL e o render feitos dentro da view,
+e consulta preguiçosa disparada pelo template conta em `db` e em `tpl`.
+
+O buffer é por processo: com vários workers, cada um tem a sua amostra.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import math
+import random
+import re
+import threading
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger("hud.profiling")
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_BUFFER_SIZE = 200
+DEFAULT_SLOW_MS = 500
+# A partir de quantas execuções da mesma consulta o log sobe para WARNING.
+DUPLICATE_WARNING = 5
+# Quantas consultas repetidas cada amostra guarda.
+DUPLICATES_KEPT = 5
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACES = re.compile(r"\s+")
+
+_current: ContextVar[RequestProfile | None] = ContextVar("hud_request_profile", default=None)
+
+
+def fingerprint(sql: str) -> str:
+    sql = _SPACES.sub(" ", sql).strip()
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _NUMBER.sub("?", sql)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil com interpolação linear entre os vizinhos (o mesmo do numpy)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class RequestProfile:
+    """Acumula o que um request gastou; é também o `execute_wrapper` das conexões."""
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.render_depth = 0
+        self.view_start: float | None = None
+        self.fingerprints: Counter[str] = Counter()
+
+    def __call__(self, execute, sql, params, many, context):  # noqa: ANN001
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self) -> list[tuple[str, int]]:
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > 1]
+
+
+class RingBuffer:
+    """As últimas N amostras, seguro entre threads."""
+
+    def __init__(self, size: int) -> None:
+        self._entries: deque[dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """Mais recentes primeiro."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+buffer = RingBuffer(getattr(settings, "PROFILING_BUFFER_SIZE", DEFAULT_BUFFER_SIZE))
+
+
+def _install_render_timer() -> None:
+    """Cronometra o `render()` dos templates do backend Django (o que `render()` e
+    `render_to_string()` chamam); `{% include %}` fica dentro do tempo do pai."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "_hud_timed", False):
+        return
+    original = Template.render
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):  # noqa: ANN001
+        profile = _current.get()
+        if profile is None:
+            return original(self, context, request)
+        profile.render_depth += 1
+        start = perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            profile.render_depth -= 1
+            if profile.render_depth == 0:
+                profile.render_time += perf_counter() - start
+
+    render._hud_timed = True
+    Template.render = render
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _shows_server_timing(request) -> bool:  # noqa: ANN001
+    mode = getattr(settings, "PROFILING_SERVER_TIMING", "staff")
+    if mode == "all":
+        return True
+    if mode != "staff":
+        return False
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def server_timing(entry: dict[str, Any]) -> str:
+    metrics = [
+        f"total;dur={entry['total_ms']}",
+        f"view;dur={entry['view_ms']}",
+        f'db;dur={entry["sql_ms"]};desc="{entry["queries"]} queries"',
+        f"tpl;dur={entry['render_ms']}",
+    ]
+    if entry["duplicates"]:
+        repeated = sum(count for _, count in entry["duplicates"])
+        metrics.append(f'dup;desc="{repeated} repeated"')
+    return ", ".join(metrics)
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response) -> None:  # noqa: ANN001
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _install_render_timer()
+
+    def __call__(self, request):  # noqa: ANN001
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        end = perf_counter()
+
+        match = getattr(request, "resolver_match", None)
+        entry = {
+            "at": timezone.now().isoformat(),
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else "",
+            "status": response.status_code,
+            "total_ms": _ms(end - start),
+            "view_ms": _ms(end - profile.view_start) if profile.view_start else 0.0,
+            "sql_ms": _ms(profile.sql_time),
+            "render_ms": _ms(profile.render_time),
+            "queries": profile.queries,
+            "duplicates": profile.duplicates()[:DUPLICATES_KEPT],
+        }
+
+        slow = entry["total_ms"] >= getattr(settings, "PROFILING_SLOW_MS", DEFAULT_SLOW_MS)
+        repeated = max((count for _, count in entry["duplicates"]), default=0) >= DUPLICATE_WARNING
+        logger.log(logging.WARNING if slow or repeated else logging.INFO, json.dumps(entry, ensure_ascii=False))
+
+        if slow or random.random() < getattr(settings, "PROFILING_SAMPLE_RATE", DEFAULT_SAMPLE_RATE):
+            buffer.add(entry)
+
+        if _shows_server_timing(request):
+            existing = response.headers.get("Server-Timing")
+            timing = server_timing(entry)
+            response.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):  # noqa: ANN001
+        profile = _current.get()
+        if profile is not None:
+            profile.view_start = perf_counter()
+
+
+def summarize_by_view(entries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Amostras agrupadas por view, das mais lentas (p95) para as mais rápidas."""
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for entry in entries:
+        groups.setdefault(entry["view"] or entry["path"], []).append(entry)
+
+    rows = []
+    for view, group in groups.items():
+        totals = [entry["total_ms"] for entry in group]
+        rows.append(
+            {
+                "view": view,
+                "count": len(group),
+                "p50_ms": round(percentile(totals, 50), 2),
+                "p95_ms": round(percentile(totals, 95), 2),
+                "avg_queries": round(sum(entry["queries"] for entry in group) / len(group), 1),
+                "avg_sql_ms": round(sum(entry["sql_ms"] for entry in group) / len(group), 2),
+                "avg_render_ms": round(sum(entry["render_ms"] for entry in group) / len(group), 2),
+                "max_repeated": max(
+                    (count for entry in group for _, count in entry["duplicates"]), default=0
+                ),
+            }
+        )
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
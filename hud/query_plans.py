@@ -0,0 +1,269 @@
+"""
+Planos de execução das consultas quentes, antes e depois dos índices compostos.
+
+Semeia um banco grande (100 mil linhas por padrão) com a forma do painel —
+campanhas com personagens, NPCs, barras, perícias e tokens de reset — e, para
+cada consulta de `QUERIES` (as mesmas que as views e o `roster.py` fazem):
+
+1. volta o app para a migração anterior à dos índices (`INDEX_MIGRATION`),
+   roda `ANALYZE` e mede: `EXPLAIN` e latência de N execuções;
+2. migra de novo até o fim, roda `ANALYZE` e mede outra vez.
+
+O relatório é JSON, como o de `hud/benchmark.py`. Quem cuida do banco
+descartável e da saída é o comando `manage.py explain_indexes`.
+"""
+
+from __future__ import annotations
+
+import platform
+import time
+from datetime import timedelta
+from typing import Any, Callable
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations import AddIndex
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .benchmark import git_commit
+from .models import NPC, Campaign, Character, PasswordResetToken, SheetBar, SheetSkill
+from .profiling import percentile
+
+User = get_user_model()
+
+INDEX_MIGRATION = "0018_query_indexes"
+DEFAULT_ROWS = 100_000
+BATCH_SIZE = 1000
+
+# Linhas semeadas por campanha; o número de campanhas sai do total pedido.
+PER_CAMPAIGN = {
+    "players": 10,
+    "characters": 50,
+    "npcs": 50,
+    "bars": 2,  # por personagem/NPC
+    "skills": 1,  # por personagem/NPC
+    "tokens": 100,
+}
+ROWS_PER_CAMPAIGN = (
+    PER_CAMPAIGN["players"]
+    + PER_CAMPAIGN["characters"]
+    + PER_CAMPAIGN["npcs"]
+    + (PER_CAMPAIGN["bars"] + PER_CAMPAIGN["skills"]) * (PER_CAMPAIGN["characters"] + PER_CAMPAIGN["npcs"])
+    + PER_CAMPAIGN["tokens"]
+)
+
+
+# --- Dados sintéticos ---
+
+
+def seed(rows: int = DEFAULT_ROWS, prefix: str = "plan") -> tuple[list[dict[str, Any]], dict[str, int]]:
+    """Cria ~`rows` linhas e devolve os ids que as consultas usam e a contagem por tabela.
+
+    Tudo por `bulk_create`: sem perfil, sem resumo de campanha e sem eventos ao
+    vivo, que as consultas medidas não leem.
+    """
+    now = timezone.now()
+    seeded = []
+    for c in range(max(1, rows // ROWS_PER_CAMPAIGN)):
+        master = User.objects.create(username=f"{prefix}-m{c}")
+        campaign = Campaign.objects.create(name=f"Campanha {prefix} {c}", master=master)
+        players = User.objects.bulk_create(
+            User(username=f"{prefix}-p{c}-{n}") for n in range(PER_CAMPAIGN["players"])
+        )
+        characters = Character.objects.bulk_create(
+            (
+                Character(
+                    campaign=campaign,
+                    name=f"Personagem {n}",
+                    created_by=master,
+                    assigned_to=players[n % len(players)],
+                    visible=n % 4 != 0,
+                )
+                for n in range(PER_CAMPAIGN["characters"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        npcs = NPC.objects.bulk_create(
+            (
+                NPC(
+                    campaign=campaign,
+                    name=f"NPC {n}",
+                    created_by=master,
+                    assigned_to_character=characters[n % len(characters)] if n % 2 else None,
+                    visible=n % 3 == 0,
+                )
+                for n in range(PER_CAMPAIGN["npcs"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        owners = [{"character": character} for character in characters] + [{"npc": npc} for npc in npcs]
+        SheetBar.objects.bulk_create(
+            (
+                SheetBar(campaign=campaign, name=f"Barra {b}", current=50, order=b, **owner)
+                for owner in owners
+                for b in range(PER_CAMPAIGN["bars"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        SheetSkill.objects.bulk_create(
+            (
+                SheetSkill(campaign=campaign, name=f"Perícia {s}", order=s, **owner)
+                for owner in owners
+                for s in range(PER_CAMPAIGN["skills"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        # Um em cada 50 tokens já venceu: a limpeza acha poucos entre muitos.
+        tokens = PasswordResetToken.objects.bulk_create(
+            (
+                PasswordResetToken(
+                    user=players[n % len(players)],
+                    token=f"{prefix}-{c}-{n}",
+                    expires_at=now + (timedelta(hours=-1) if n % 50 == 0 else timedelta(hours=24)),
+                    used=n % 7 == 0,
+                )
+                for n in range(PER_CAMPAIGN["tokens"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        seeded.append(
+            {
+                "campaign": campaign.pk,
+                "players": [player.pk for player in players],
+                "characters": [character.pk for character in characters],
+                "npcs": [npc.pk for npc in npcs],
+                "tokens": [token.token for token in tokens],
+            }
+        )
+    counts = {
+        model._meta.db_table: model._base_manager.count()
+        for model in (User, Campaign, Character, NPC, SheetBar, SheetSkill, PasswordResetToken)
+    }
+    return seeded, counts
+
+
+# --- Consultas medidas ---
+
+
+def _pick(values: list, i: int):
+    return values[i % len(values)]
+
+
+# Cada consulta recebe uma campanha semeada e o número da execução, e devolve
+# o queryset com a mesma forma do que o painel faz.
+QUERIES: dict[str, Callable[[dict[str, Any], int], QuerySet]] = {
+    # campaign_detail para jogador: personagens visíveis, em ordem de nome.
+    "campaign_characters": lambda data, i: Character.objects.filter(
+        campaign_id=data["campaign"], visible=True
+    ).select_related("assigned_to__profile"),
+    # character_detail e sheet.json: NPCs visíveis vinculados ao personagem.
+    "linked_npcs": lambda data, i: NPC.objects.filter(
+        campaign_id=data["campaign"], assigned_to_character_id=_pick(data["characters"], i), visible=True
+    ),
+    # roster.detach_players (leave_campaign, remoção pelo mestre).
+    "player_characters": lambda data, i: Character.objects.filter(
+        campaign_id=data["campaign"], assigned_to_id=_pick(data["players"], i)
+    ).values_list("pk", flat=True),
+    # Seções da ficha, na ordem da ficha.
+    "character_bars": lambda data, i: SheetBar.objects.filter(character_id=_pick(data["characters"], i)),
+    "npc_skills": lambda data, i: SheetSkill.objects.filter(npc_id=_pick(data["npcs"], i)),
+    # reset_password e a limpeza dos tokens vencidos.
+    "reset_token": lambda data, i: PasswordResetToken.objects.filter(token=_pick(data["tokens"], i)),
+    # A limpeza apaga sem ordenar.
+    "expired_tokens": lambda data, i: PasswordResetToken.objects.filter(expires_at__lt=timezone.now())
+    .order_by()
+    .values_list("pk", flat=True),
+}
+
+
+def measure(
+    seeded: list[dict[str, Any]], queries: tuple[str, ...] = tuple(QUERIES), iterations: int = 200
+) -> dict[str, Any]:
+    """`EXPLAIN` da primeira execução e latência de `iterations` execuções de cada consulta.
+
+    Cronometra só o SQL no cursor (execute + fetchall), sem montar instâncias:
+    o que os índices mudam é o trabalho do banco, e o ORM por cima seria ruído.
+    """
+    results = {}
+    for name in queries:
+        build = QUERIES[name]
+        first = build(seeded[0], 0)
+        statements = [build(seeded[i % len(seeded)], i).query.sql_with_params() for i in range(-1, iterations)]
+        latencies = []
+        with connection.cursor() as cursor:
+            for i, (sql, params) in enumerate(statements):
+                start = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                if i:  # a primeira só aquece o cache de páginas
+                    latencies.append(time.perf_counter() - start)
+        results[name] = {
+            "sql": str(first.query),
+            "plan": first.explain().splitlines(),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        }
+    return results
+
+
+# --- Antes e depois ---
+
+
+def index_migration(name: str = INDEX_MIGRATION) -> tuple[str, str, list[str]]:
+    """(nome completo, migração anterior do app, índices criados) da migração dos índices."""
+    loader = MigrationLoader(connection, ignore_no_migrations=True)
+    migration = loader.get_migration_by_prefix("hud", name)
+    previous = next(dep for app, dep in migration.dependencies if app == "hud")
+    indexes = [op.index.name for op in migration.operations if isinstance(op, AddIndex)]
+    return migration.name, previous, indexes
+
+
+def analyze() -> None:
+    """Estatísticas frescas para o planejador, nas duas rodadas igual."""
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def run(rows: int = DEFAULT_ROWS, queries: tuple[str, ...] = tuple(QUERIES), iterations: int = 200) -> dict[str, Any]:
+    """Semeia, mede sem e com os índices e devolve o relatório completo.
+
+    Precisa de um banco descartável e fora de transação: migrar o app para trás
+    apaga os índices (e o que vier depois deles).
+    """
+    migration, previous, indexes = index_migration()
+    seeded, counts = seed(rows)
+    call_command("migrate", "hud", previous, verbosity=0)
+    analyze()
+    before = measure(seeded, queries, iterations)
+    call_command("migrate", "hud", verbosity=0)
+    analyze()
+    after = measure(seeded, queries, iterations)
+
+    report: dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "migration": migration,
+            "indexes": indexes,
+            "rows": counts,
+            "iterations": iterations,
+        },
+        "queries": {},
+    }
+    for name in queries:
+        old, new = before[name]["p50_ms"], after[name]["p50_ms"]
+        report["queries"][name] = {
+            "sql": after[name]["sql"],
+            "before": {key: value for key, value in before[name].items() if key != "sql"},
+            "after": {key: value for key, value in after[name].items() if key != "sql"},
+            "p50_change_pct": round((new - old) / old * 100, 1) if old else None,
+        }
+    return report
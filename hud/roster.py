@@ -0,0 +1,164 @@
+"""
+Gestão em lote dos jogadores de uma campanha.
+
+`apply_changes()` adiciona e remove vários jogadores, ou troca a lista
+inteira, direto na tabela `through` do M2M `Campaign.players`. É uma consulta
+para ler os membros atuais, um `bulk_create` para as entradas, um `DELETE`
+para as saídas, tudo numa transação. O `m2m_changed` sai uma vez por direção
+com o `pk_set` inteiro, como faria o `players.add(*ids)` do Django, então os
+receivers (resumo, GET condicional, cache de fragmentos) rodam uma vez por
+lote, não uma por jogador.
+
+Quem sai leva junto o vínculo com os personagens dele (ver `remove_members`).
+O mestre nunca entra pela lista (já é dono) nem sai dela por um `replace`.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+from django.utils import timezone
+
+from . import fragments, live, thumbnails
+from .models import NPC, Campaign, Character
+
+User = get_user_model()
+Membership = Campaign.players.through
+
+# Um lote maior que isso é engano (ou abuso); o formulário manda poucos.
+MAX_USERS = 500
+
+
+class RosterError(ValueError):
+    """Lote inválido; a mensagem vai para o cliente."""
+
+
+def _ids(raw: Any, key: str) -> set[int]:
+    if raw is None:
+        return set()
+    if not isinstance(raw, list) or len(raw) > MAX_USERS:
+        raise RosterError(f"`{key}` deve ser uma lista de até {MAX_USERS} ids.")
+    try:
+        return {int(value) for value in raw}
+    except (TypeError, ValueError):
+        raise RosterError(f"`{key}` deve ser uma lista de ids.") from None
+
+
+def parse(payload: Any) -> tuple[set[int], set[int], set[int] | None]:
+    """`{"add": [...], "remove": [...]}` ou `{"replace": [...]}` → (add, remove, replace)."""
+    if not isinstance(payload, dict):
+        raise RosterError("JSON inválido")
+    if "replace" in payload:
+        if "add" in payload or "remove" in payload:
+            raise RosterError("Use `replace` sozinho, ou `add`/`remove`.")
+        return set(), set(), _ids(payload["replace"], "replace")
+    add, remove = _ids(payload.get("add"), "add"), _ids(payload.get("remove"), "remove")
+    if add & remove:
+        raise RosterError("O mesmo jogador não pode entrar e sair no mesmo lote.")
+    return add, remove, None
+
+
+def _existing_users(campaign: Campaign, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    found = set(User.objects.filter(pk__in=ids).values_list("pk", flat=True))
+    if ids - found:
+        raise RosterError("Usuário inexistente.")
+    return found - {campaign.master_id}
+
+
+def _send(campaign: Campaign, action: str, pk_set: set[int], using: str) -> None:
+    m2m_changed.send(
+        sender=Membership, instance=campaign, action=action, reverse=False, model=User, pk_set=pk_set, using=using
+    )
+
+
+def add_members(campaign: Campaign, user_ids: set[int]) -> None:
+    """Insere as entradas de uma vez; quem já é membro é ignorado pelo banco."""
+    if not user_ids:
+        return
+    using = router.db_for_write(Membership, instance=campaign)
+    _send(campaign, "pre_add", user_ids, using)
+    Membership.objects.using(using).bulk_create(
+        [Membership(campaign_id=campaign.pk, user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+    )
+    _send(campaign, "post_add", user_ids, using)
+
+
+def remove_members(campaign: Campaign, user_ids: set[int]) -> None:
+    """Tira os jogadores da campanha, junto com o que dependia deles, numa transação.
+
+    Os personagens deles na campanha ficam sem dono e os NPCs vinculados a esses
+    personagens ficam sem vínculo — um `UPDATE` para cada, não um `save()` por linha.
+    Os deltas ao vivo saem à mão depois do commit, como em `stats.apply_mutations`.
+    É o mesmo caminho para quem sai (`leave_campaign`) e para quem é removido
+    pelo mestre.
+    """
+    if not user_ids:
+        return
+    using = router.db_for_write(Membership, instance=campaign)
+    with transaction.atomic(using=using):
+        character_ids = list(
+            Character.objects.using(using)
+            .filter(campaign_id=campaign.pk, assigned_to_id__in=user_ids)
+            .values_list("pk", flat=True)
+        )
+        if character_ids:
+            now = timezone.now()
+            npcs = NPC.objects.using(using).filter(campaign_id=campaign.pk, assigned_to_character_id__in=character_ids)
+            npc_ids = list(npcs.values_list("pk", flat=True))
+            if npc_ids:
+                NPC.objects.using(using).filter(pk__in=npc_ids).update(assigned_to_character=None, updated_at=now)
+            Character.objects.using(using).filter(pk__in=character_ids).update(assigned_to=None, updated_at=now)
+            # `update()` não dispara post_save: os cards em cache trocam de versão
+            # e os eventos ao vivo saem daqui, com as linhas relidas.
+            for character in Character.objects.using(using).filter(pk__in=character_ids):
+                fragments.bump("character", character.pk)
+                live.publish(campaign.pk, live.character_event(character))
+            for npc in NPC.objects.using(using).filter(pk__in=npc_ids):
+                fragments.bump("npc", npc.pk)
+                live.publish(campaign.pk, live.npc_event(npc))
+
+        _send(campaign, "pre_remove", user_ids, using)
+        Membership.objects.using(using).filter(campaign_id=campaign.pk, user_id__in=user_ids).delete()
+        _send(campaign, "post_remove", user_ids, using)
+
+
+def apply_changes(
+    campaign: Campaign,
+    add: Iterable[int] = (),
+    remove: Iterable[int] = (),
+    replace: Iterable[int] | None = None,
+) -> None:
+    """Aplica o lote inteiro numa transação, mexendo só em quem realmente muda."""
+    with transaction.atomic():
+        current = set(Membership.objects.filter(campaign_id=campaign.pk).values_list("user_id", flat=True))
+        if replace is not None:
+            wanted = _existing_users(campaign, set(replace))
+            to_add = wanted - current
+            to_remove = current - wanted - {campaign.master_id}
+        else:
+            to_add = _existing_users(campaign, set(add)) - current
+            to_remove = set(remove) & current
+        remove_members(campaign, to_remove)
+        add_members(campaign, to_add)
+
+
+def roster(campaign: Campaign) -> list[dict[str, Any]]:
+    """Os jogadores como o painel mostra: id, nome de exibição, usuário e avatar."""
+    players = campaign.players.select_related("profile").order_by("username")
+    result = []
+    for user in players:
+        profile = getattr(user, "profile", None)
+        result.append(
+            {
+                "id": user.pk,
+                "name": (profile and profile.display_name) or user.get_full_name() or user.username,
+                "username": user.username,
+                "avatar": thumbnails.thumbnail_url(profile.avatar, "mini") if profile else "",
+            }
+        )
+    return result
@@ -0,0 +1,194 @@
+"""
+Busca de jogadores para convidar à campanha.
+
+A busca antiga fazia três `icontains` (usuário, apelido, nome) — LIKE com
+curinga na frente, sem índice, varrendo `UserProfile` inteira a cada tecla.
+Aqui cada usuário tem um documento normalizado em `PlayerSearchEntry`
+(minúsculo, sem acento, só letras e dígitos) e a consulta casa cada termo
+digitado como *prefixo* de alguma palavra do documento:
+
+- no SQLite com FTS5, pela tabela virtual `hud_playersearch_fts`, mantida por
+  triggers sobre `hud_playersearchentry` (criados na migração 0014);
+- nos outros bancos, ou num SQLite compilado sem FTS5, pelos trigramas de
+  prefixo em `PlayerSearchTrigram`, que são indexados em qualquer banco.
+
+Quem já está na campanha e o próprio mestre saem no SQL, e o resultado tem
+teto fixo (SEARCH_LIMIT).
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Any
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import thumbnails
+from .models import Campaign, PlayerSearchEntry, PlayerSearchTrigram, UserProfile
+
+User = get_user_model()
+
+SEARCH_LIMIT = 20
+# Termos além disso só estreitam o que já está estreito.
+MAX_TERMS = 5
+FTS_TABLE = "hud_playersearch_fts"
+AVATAR_CACHE_SECONDS = 60 * 60
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_fts_enabled: dict[str, bool] = {}
+
+
+def normalize(text: str) -> str:
+    """'Ána_Lúcia-92' -> 'ana lucia 92'."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    return " ".join(_NON_WORD.sub(" ", folded).split())
+
+
+def prefix_trigrams(word: str) -> list[str]:
+    # Dois espaços marcam o começo da palavra: 'ana' -> '  a', ' an', 'ana'.
+    # Um termo digitado casa como prefixo se todos os trigramas dele existem.
+    padded = f"  {word}"
+    return [padded[i:i + 3] for i in range(len(word))]
+
+
+def document_for(username: str, nickname: str = "", display_name: str = "") -> str:
+    # Espaço na frente: `document LIKE '% termo%'` confere prefixo de palavra.
+    return " " + normalize(" ".join(filter(None, (username, nickname, display_name))))
+
+
+def fts_enabled(using: str = "default") -> bool:
+    if using not in _fts_enabled:
+        connection = connections[using]
+        _fts_enabled[using] = (
+            connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_enabled[using]
+
+
+# --- Índice ---
+
+
+def index_user(user_id: int) -> None:
+    """Regrava documento e trigramas do usuário, se o texto mudou."""
+    row = (
+        User.objects.filter(pk=user_id)
+        .values_list("username", "profile__nickname", "profile__display_name")
+        .first()
+    )
+    if row is None:
+        return
+    document = document_for(*row)
+    with transaction.atomic():
+        entry, created = PlayerSearchEntry.objects.get_or_create(user_id=user_id, defaults={"document": document})
+        if not created:
+            if entry.document == document:
+                return
+            entry.document = document
+            entry.save(update_fields=["document"])
+        grams = {gram for word in document.split() for gram in prefix_trigrams(word)}
+        PlayerSearchTrigram.objects.filter(user_id=user_id).exclude(gram__in=grams).delete()
+        PlayerSearchTrigram.objects.bulk_create(
+            [PlayerSearchTrigram(user_id=user_id, gram=gram) for gram in grams],
+            ignore_conflicts=True,
+        )
+
+
+@receiver(post_save, sender=User)
+def index_user_on_save(sender, instance, update_fields=None, **kwargs):  # noqa: ANN001
+    # O login grava só `last_login`; não há o que reindexar.
+    if update_fields is not None and "username" not in update_fields:
+        return
+    index_user(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_profile_on_save(sender, instance, update_fields=None, **kwargs):  # noqa: ANN001
+    if update_fields is not None and not {"nickname", "display_name"} & set(update_fields):
+        return
+    index_user(instance.user_id)
+
+
+# --- Consulta ---
+
+
+def _matching_user_ids(terms: list[str]):
+    if fts_enabled():
+        # Termos já normalizados: só [a-z0-9], nada a escapar.
+        match = " ".join(f'"{term}"*' for term in terms)
+        return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+
+    grams = {gram for term in terms for gram in prefix_trigrams(term)}
+    candidates = (
+        PlayerSearchTrigram.objects.filter(gram__in=grams)
+        .values("user_id")
+        .annotate(hits=Count("gram"))
+        .filter(hits=len(grams))
+        .values("user_id")
+    )
+    # Os trigramas podem vir de palavras diferentes; a conferência final é
+    # barata porque só roda sobre os candidatos.
+    entries = PlayerSearchEntry.objects.filter(user_id__in=candidates)
+    for term in terms:
+        entries = entries.filter(document__contains=f" {term}")
+    return entries.values("user_id")
+
+
+def _avatar_key(name: str) -> str:
+    return f"hud:avatar:{name}"
+
+
+@receiver(thumbnails.thumbnail_ready, sender=UserProfile)
+def forget_avatar_on_thumbnail(sender, name, **kwargs):  # noqa: ANN001
+    # Até a miniatura ficar pronta, a URL guardada é a do original.
+    cache.delete(_avatar_key(name))
+
+
+def _avatar_urls(profiles: list[UserProfile]) -> dict[int, str]:
+    keys = {p.user_id: _avatar_key(p.avatar.name) for p in profiles if p.avatar}
+    cached = cache.get_many(keys.values())
+    urls, fresh = {}, {}
+    for profile in profiles:
+        key = keys.get(profile.user_id)
+        if key is None:
+            urls[profile.user_id] = ""
+        elif key in cached:
+            urls[profile.user_id] = cached[key]
+        else:
+            urls[profile.user_id] = fresh[key] = thumbnails.thumbnail_url(profile.avatar, "mini")
+    if fresh:
+        cache.set_many(fresh, AVATAR_CACHE_SECONDS)
+    return urls
+
+
+def matching_profiles(campaign: Campaign, query: str, limit: int = SEARCH_LIMIT) -> list[UserProfile]:
+    """Perfis cujo usuário/apelido/nome começa com cada termo de `query`, fora da campanha."""
+    terms = normalize(query).split()[:MAX_TERMS]
+    if not terms:
+        return []
+
+    membership = Campaign.players.through.objects.filter(campaign_id=campaign.pk, user_id=OuterRef("user_id"))
+    return list(
+        UserProfile.objects.select_related("user")
+        .filter(user_id__in=_matching_user_ids(terms))
+        .exclude(user_id=campaign.master_id)
+        .exclude(Exists(membership))
+        .order_by("user__username")[:limit]
+    )
+
+
+def search_players(campaign: Campaign, query: str, limit: int = SEARCH_LIMIT) -> list[dict[str, Any]]:
+    """Resposta JSON do `search_players`: id, usuário e URL do avatar em miniatura."""
+    profiles = matching_profiles(campaign, query, limit)
+    avatars = _avatar_urls(profiles)
+    return [
+        {"id": p.user_id, "name": p.user.username, "avatar": avatars[p.user_id]}
+        for p in profiles
+    ]
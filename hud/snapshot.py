@@ -0,0 +1,207 @@
+"""
+A ficha inteira de um personagem em JSON, para overlays de stream e widgets.
+
+`GET /characters/<pk>/sheet.json` devolve o que a página do personagem mostra,
+em seções:
+
+- `character`: nome, imagem, HP/SP, visibilidade, dono e campanha;
+- `bars`, `skills`, `abilities`, `attributes`: listas na ordem da ficha;
+- `inventory`: todos os slots, com o item de cada um;
+- `roster`: os personagens da campanha (jogador só vê os visíveis);
+- `npcs`: os NPCs visíveis vinculados ao personagem (só para jogador, como
+  na página).
+
+`?fields=bars,inventory` escolhe as seções. Cada lista pedida custa uma
+consulta, e só ela; `character` não custa nenhuma, porque o personagem (com
+campanha e dono) já vem da view. O total não depende do tamanho da ficha.
+
+A versão da resposta (ETag) sai do `updated_at` do personagem e da campanha
+e, quando `roster` ou `npcs` são pedidos, do maior `updated_at` daquelas
+linhas (`version_timestamps`, uma consulta por seção): o HP de outro
+personagem muda por `update()` em hud/stats.py, que só toca o dono.
+
+`GET /campaigns/<pk>/bars.json` (`campaign_bars`) devolve as barras da
+campanha inteira — personagens e NPCs — numa consulta, para overlays de mesa.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable
+
+from datetime import datetime
+
+from django.db.models import Max, Q
+
+from . import thumbnails
+
+from .models import NPC, Campaign, Character, CharacterAbility, CharacterAttribute, CharacterBar, CharacterSkill, SheetBar
+
+
+class SnapshotError(ValueError):
+    """`fields=` com seção desconhecida; a mensagem vai para o cliente."""
+
+
+def _character(character: Character, is_master: bool) -> dict[str, Any]:
+    campaign = character.campaign
+    return {
+        "id": character.pk,
+        "name": character.name,
+        "image": thumbnails.thumbnail_url(character.image, "card"),
+        "hp": [character.hp_current, character.hp_max],
+        "sp": [character.sp_current, character.sp_max],
+        "visible": character.visible,
+        "inventoryCapacity": character.inventory_capacity,
+        "player": character.assigned_to.username if character.assigned_to else None,
+        "campaign": {"id": campaign.pk, "name": campaign.name} if campaign else None,
+        "updatedAt": character.updated_at.isoformat(),
+    }
+
+
+def _bars(character: Character, is_master: bool) -> list[dict[str, Any]]:
+    return [
+        {"id": bar.pk, "name": bar.name, "current": bar.current, "max": bar.max_value, "color": bar.color}
+        for bar in CharacterBar.objects.filter(character=character)
+    ]
+
+
+def _skills(character: Character, is_master: bool) -> list[dict[str, Any]]:
+    return list(CharacterSkill.objects.filter(character=character).values("id", "name", "value"))
+
+
+def _abilities(character: Character, is_master: bool) -> list[dict[str, Any]]:
+    return list(CharacterAbility.objects.filter(character=character).values("id", "name"))
+
+
+def _attributes(character: Character, is_master: bool) -> list[dict[str, Any]]:
+    return list(CharacterAttribute.objects.filter(character=character).values("id", "name", "value"))
+
+
+def _inventory(character: Character, is_master: bool) -> list[dict[str, Any]]:
+    # A grade inteira, como na ficha: posição vazia sai com `id` e `item` nulos.
+    slots = character.inventory()
+    return [
+        {
+            "id": slot.pk,
+            "position": slot.position,
+            "item": {
+                "id": slot.item.pk,
+                "name": slot.item.name,
+                "image": thumbnails.thumbnail_url(slot.item.image, "card"),
+            }
+            if slot.item
+            else None,
+        }
+        for slot in slots
+    ]
+
+
+def _roster(character: Character, is_master: bool) -> list[dict[str, Any]]:
+    if character.campaign_id is None:
+        return []
+    characters = _roster_queryset(character)
+    if not is_master:
+        characters = characters.filter(visible=True)
+    return [
+        {
+            "id": other.pk,
+            "name": other.name,
+            "image": thumbnails.thumbnail_url(other.image, "mini"),
+            "hp": [other.hp_current, other.hp_max],
+            "sp": [other.sp_current, other.sp_max],
+        }
+        for other in characters.only("name", "image", "hp_current", "hp_max", "sp_current", "sp_max")
+    ]
+
+
+def _npcs(character: Character, is_master: bool) -> list[dict[str, Any]]:
+    # Mesma regra da página: a barra de NPCs é do jogador.
+    if character.campaign_id is None or is_master:
+        return []
+    npcs = _npcs_queryset(character).filter(visible=True)
+    return [
+        {
+            "id": npc.pk,
+            "name": npc.name,
+            "image": thumbnails.thumbnail_url(npc.image, "mini"),
+            "hp": [npc.hp_current, npc.hp_max],
+            "sp": [npc.sp_current, npc.sp_max],
+        }
+        for npc in npcs.only("name", "image", "hp_current", "hp_max", "sp_current", "sp_max")
+    ]
+
+
+SECTIONS: dict[str, Callable[[Character, bool], Any]] = {
+    "character": _character,
+    "bars": _bars,
+    "skills": _skills,
+    "abilities": _abilities,
+    "attributes": _attributes,
+    "inventory": _inventory,
+    "roster": _roster,
+    "npcs": _npcs,
+}
+
+
+def parse_fields(raw: str | None) -> list[str]:
+    """`"bars, inventory"` → `["bars", "inventory"]`; vazio ou ausente → todas as seções."""
+    names = [name.strip() for name in (raw or "").split(",") if name.strip()]
+    if not names:
+        return list(SECTIONS)
+    unknown = sorted(set(names) - SECTIONS.keys())
+    if unknown:
+        raise SnapshotError(f"Seção desconhecida: {', '.join(unknown)}. Use: {', '.join(SECTIONS)}.")
+    return list(dict.fromkeys(names))
+
+
+def _roster_queryset(character: Character):
+    return Character.objects.filter(campaign_id=character.campaign_id)
+
+
+def _npcs_queryset(character: Character):
+    return NPC.objects.filter(campaign_id=character.campaign_id, assigned_to_character=character)
+
+
+# Seções que mostram outros personagens/NPCs -> linhas cujo `updated_at` entra na versão.
+VERSIONED: dict[str, Callable[[Character], Any]] = {"roster": _roster_queryset, "npcs": _npcs_queryset}
+
+
+def version_timestamps(character: Character, fields: Iterable[str]) -> list[datetime | None]:
+    """Os `updated_at` além do personagem e da campanha de que as seções pedidas dependem."""
+    if character.campaign_id is None:
+        return []
+    return [
+        VERSIONED[name](character).aggregate(last=Max("updated_at"))["last"] for name in fields if name in VERSIONED
+    ]
+
+
+def character_snapshot(character: Character, fields: Iterable[str], is_master: bool) -> dict[str, Any]:
+    """A ficha nas seções pedidas. `character` precisa vir com `campaign` e `assigned_to` carregados."""
+    return {name: SECTIONS[name](character, is_master) for name in fields}
+
+
+def campaign_bars(campaign: Campaign, is_master: bool, user_id: int | None = None) -> list[dict[str, Any]]:
+    """As barras de todos os personagens e NPCs da campanha, numa consulta só.
+
+    Mesmo formato do evento `bar` do ao vivo (hud/live.py), para o overlay
+    montar o estado inicial e depois só aplicar os deltas. Jogador (`user_id`)
+    vê o mesmo que o ao vivo lhe manda: personagens visíveis e NPCs visíveis
+    vinculados a um personagem dele.
+    """
+    bars = SheetBar.objects.filter(campaign=campaign).order_by("character_id", "npc_id", "order", "name")
+    if not is_master:
+        bars = bars.filter(
+            Q(character__visible=True) | Q(npc__visible=True, npc__assigned_to_character__assigned_to_id=user_id)
+        )
+    return [
+        {
+            "type": "bar",
+            "owner": "character" if bar["character_id"] is not None else "npc",
+            "owner_id": bar["character_id"] or bar["npc_id"],
+            "id": bar["id"],
+            "name": bar["name"],
+            "current": bar["current"],
+            "max_value": bar["max_value"],
+            "color": bar["color"],
+        }
+        for bar in bars.values("id", "character_id", "npc_id", "name", "current", "max_value", "color")
+    ]
@@ -1,14 +1,28 @@
 (() => {
     const csrfToken = window.hudConfig?.csrfToken;
     const itemPool = document.getElementById('item-pool');
-    const display = document.getElementById('selected-display');
+    const grid = document.getElementById('inventory-grid');
 
-    if (!itemPool || !csrfToken) {
+    if (!grid || !csrfToken) {
         return;
     }
 
-    itemPool.querySelectorAll('.item-chip').forEach((chip) => {
-        chip.setAttribute('draggable', 'true');
+    // Com campanha, as operações vão em lote para /campaigns/<id>/inventory/batch/.
+    // Sem campanha (ficha legada) cai no POST por slot de sempre.
+    const batchUrl = grid.dataset.batchUrl;
+    const owner = grid.dataset.owner || 'character';
+    const ownerId = Number(grid.dataset.characterId);
+    // Drops em sequência rápida dentro desta janela viram um POST só.
+    const FLUSH_DELAY_MS = 150;
+    const MAX_PENDING = 50;
+    const SLOT_TYPE = 'application/x-hud-slot';
+
+    let pending = [];
+    let flushTimer = null;
+
+    if (itemPool) {
+        itemPool.querySelectorAll('.item-chip').forEach((chip) => {
+            chip.setAttribute('draggable', 'true');
             chip.addEventListener('dragstart', (event) => {
                 event.dataTransfer?.setData('text/plain', chip.dataset.itemId || '');
                 if (chip.dataset.itemImage) {
@@ -16,10 +30,25 @@
                 }
                 chip.classList.add('dragging');
             });
-        chip.addEventListener('dragend', () => chip.classList.remove('dragging'));
-    });
+            chip.addEventListener('dragend', () => chip.classList.remove('dragging'));
+        });
+    }
+
+    grid.querySelectorAll('.inventory-slot').forEach((slot) => {
+        if (batchUrl) {
+            // Slot com item pode ser arrastado para outro slot (troca).
+            slot.setAttribute('draggable', 'true');
+            slot.addEventListener('dragstart', (event) => {
+                if (!hasItem(slot)) {
+                    event.preventDefault();
+                    return;
+                }
+                event.dataTransfer?.setData(SLOT_TYPE, slot.dataset.position || '');
+                slot.classList.add('dragging');
+            });
+            slot.addEventListener('dragend', () => slot.classList.remove('dragging'));
+        }
 
-    document.querySelectorAll('.inventory-slot').forEach((slot) => {
         slot.addEventListener('dragover', (event) => {
             event.preventDefault();
             slot.classList.add('drag-over');
@@ -32,17 +61,78 @@
         slot.addEventListener('drop', (event) => {
             event.preventDefault();
             slot.classList.remove('drag-over');
+            const fromPosition = event.dataTransfer?.getData(SLOT_TYPE);
+            if (fromPosition) {
+                if (fromPosition !== slot.dataset.position) {
+                    queue({ op: 'swap', a: ref(fromPosition), b: ref(slot.dataset.position) });
+                }
+                return;
+            }
             const itemId = event.dataTransfer?.getData('text/plain');
             if (!itemId) return;
-            assignSlot(slot, itemId);
+            if (batchUrl) {
+                queue({ op: 'assign', slot: ref(slot.dataset.position), item_id: Number(itemId) });
+            } else {
+                assignSlot(slot, itemId);
+            }
         });
 
         slot.addEventListener('contextmenu', (event) => {
             event.preventDefault();
-            assignSlot(slot, '');
+            if (batchUrl) {
+                queue({ op: 'clear', slot: ref(slot.dataset.position) });
+            } else {
+                assignSlot(slot, '');
+            }
         });
     });
 
+    function ref(position) {
+        return { owner, id: ownerId, position: Number(position) };
+    }
+
+    function hasItem(slot) {
+        return !!slot.dataset.itemImage || (slot.dataset.itemName && slot.dataset.itemName !== 'Vazio');
+    }
+
+    function queue(operation) {
+        pending.push(operation);
+        clearTimeout(flushTimer);
+        if (pending.length >= MAX_PENDING) {
+            flush();
+        } else {
+            flushTimer = setTimeout(flush, FLUSH_DELAY_MS);
+        }
+    }
+
+    function flush() {
+        if (!pending.length) return;
+        const ops = pending;
+        pending = [];
+
+        fetch(batchUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            body: JSON.stringify({ ops }),
+        })
+            .then((response) => response.json())
+            .then((data) => {
+                if (!data.success) return;
+                data.slots.forEach((state) => {
+                    if (state.owner !== owner || state.ownerId !== ownerId) return;
+                    const slot = grid.querySelector(`.inventory-slot[data-position="${state.position}"]`);
+                    if (slot) renderSlot(slot, state);
+                });
+            })
+            .catch(() => {
+                // Intentionally silent to keep UI minimal; consider surface message if needed.
+            });
+    }
+
     function assignSlot(slot, itemId) {
         const url = slot.dataset.assignUrl;
         if (!url) return;
@@ -61,38 +151,40 @@
             body: payload,
         })
             .then((response) => response.json())
-            .then((data) => {
-                    slot.dataset.itemName = data.itemName;
-                    slot.dataset.itemImage = data.itemImage || '';
-
-                    const figure = slot.querySelector('.slot-figure');
-                    if (figure) {
-                        if (data.itemImage) {
-                            figure.classList.remove('empty');
-                            figure.style.backgroundImage = `url('${data.itemImage}')`;
-                        } else {
-                            figure.classList.add('empty');
-                            figure.style.backgroundImage = '';
-                        }
-                    }
-
-                    const selectedFigure = document.getElementById('selected-figure');
-                    const selectedName = document.getElementById('selected-name');
-                    if (selectedName) {
-                        selectedName.textContent = data.itemName;
-                    }
-                    if (selectedFigure) {
-                        if (data.itemImage) {
-                            selectedFigure.classList.remove('empty');
-                            selectedFigure.style.backgroundImage = `url('${data.itemImage}')`;
-                        } else {
-                            selectedFigure.classList.add('empty');
-                            selectedFigure.style.backgroundImage = '';
-                        }
-                    }
-            })
+            .then((data) => renderSlot(slot, data))
             .catch(() => {
                 // Intentionally silent to keep UI minimal; consider surface message if needed.
             });
     }
+
+    function renderSlot(slot, data) {
+        slot.dataset.itemName = data.itemName;
+        slot.dataset.itemImage = data.itemImage || '';
+
+        const figure = slot.querySelector('.slot-figure');
+        if (figure) {
+            if (data.itemImage) {
+                figure.classList.remove('empty');
+                figure.style.backgroundImage = `url('${data.itemImage}')`;
+            } else {
+                figure.classList.add('empty');
+                figure.style.backgroundImage = '';
+            }
+        }
+
+        const selectedFigure = document.getElementById('selected-figure');
+        const selectedName = document.getElementById('selected-name');
+        if (selectedName) {
+            selectedName.textContent = data.itemName;
+        }
+        if (selectedFigure) {
+            if (data.itemImage) {
+                selectedFigure.classList.remove('empty');
+                selectedFigure.style.backgroundImage = `url('${data.itemImage}')`;
+            } else {
+                selectedFigure.classList.add('empty');
+                selectedFigure.style.backgroundImage = '';
+            }
+        }
+    }
 })();
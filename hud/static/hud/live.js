@@ -0,0 +1,160 @@
+(() => {
+    // Recebe os deltas da campanha e remenda a página no lugar.
+    // Prefere a sessão de mesa por WebSocket (data-table-url), que junta os
+    // eventos em quadros de 50ms; sem ela (servidor WSGI, navegador antigo),
+    // cai no stream SSE de data-stream-url.
+    const script = document.currentScript;
+    const streamUrl = script?.dataset.streamUrl;
+    const tableUrl = script?.dataset.tableUrl;
+
+    const handlers = {
+        bar(data) {
+            const row = findBar(data);
+            if (!row) return;
+            const display = row.querySelector('.bar-display');
+            const fill = row.querySelector('.bar-fill');
+            if (display) {
+                display.textContent = `${data.current} / ${data.max_value}`;
+                display.dataset.current = data.current;
+                display.dataset.max = data.max_value;
+            }
+            if (fill) {
+                const percentage = data.max_value > 0 ? (data.current / data.max_value) * 100 : 0;
+                fill.style.width = `${percentage}%`;
+            }
+        },
+
+        bar_deleted(data) {
+            const row = findBar(data);
+            if (row) row.remove();
+        },
+
+        character(data) {
+            updateVisibility(`[data-character-id="${data.id}"]`, data.visible, 'personagem');
+            // Personagem que acabou de aparecer para o jogador ainda não tem card.
+            const grid = document.querySelector('[data-live-characters]');
+            if (data.visible && grid && !grid.querySelector(`[data-character-id="${data.id}"]`)) {
+                window.location.reload();
+            }
+        },
+
+        npc(data) {
+            updateVisibility(`[data-npc-id="${data.id}"]`, data.visible, 'NPC');
+            // NPC recém-revelado para o personagem desta página: a barra de
+            // navegação ainda não tem o link, então recarrega uma vez.
+            const nav = document.querySelector('.character-navbar');
+            if (data.visible && nav && String(data.character_id) === nav.dataset.characterId
+                && !nav.querySelector(`[data-npc-id="${data.id}"]`)) {
+                window.location.reload();
+            }
+        },
+
+        slot(data) {
+            const grid = document.querySelector(
+                `[data-slot-owner="${data.owner}"][data-slot-owner-id="${data.owner_id}"]`
+            );
+            const slot = grid?.querySelector(`.inventory-slot[data-position="${data.position}"]`);
+            if (!slot) return;
+            slot.dataset.itemName = data.item_name;
+            slot.dataset.itemImage = data.item_image;
+            const figure = slot.querySelector('.slot-figure');
+            if (figure) {
+                figure.classList.toggle('empty', !data.item_image);
+                figure.style.backgroundImage = data.item_image ? `url('${data.item_image}')` : '';
+            }
+            const name = slot.querySelector('.slot-item-name');
+            if (name) name.textContent = data.item_name;
+        },
+    };
+
+    function dispatch(event) {
+        const handler = handlers[event.type];
+        if (handler) handler(event);
+    }
+
+    function findBar(data) {
+        const container = document.querySelector(
+            `[data-bar-owner="${data.owner}"][data-bar-owner-id="${data.owner_id}"]`
+        );
+        return container ? container.querySelector(`[data-bar-id="${data.id}"]`) : null;
+    }
+
+    function updateVisibility(selector, visible, label) {
+        document.querySelectorAll(selector).forEach((el) => {
+            const toggle = el.querySelector('[data-visibility-toggle]');
+            if (toggle) {
+                // Mestre: só troca o ícone do botão.
+                toggle.textContent = visible ? '👁️' : '🚫';
+                toggle.title = visible ? `Ocultar ${label}` : `Mostrar ${label}`;
+            } else if (!visible) {
+                el.remove();
+            }
+        });
+    }
+
+    function openStream() {
+        if (!streamUrl || !window.EventSource) return;
+        const source = new EventSource(streamUrl);
+        Object.keys(handlers).forEach((type) => {
+            source.addEventListener(type, (event) => dispatch(JSON.parse(event.data)));
+        });
+    }
+
+    // Sessão de mesa. `window.hudTable.send(action, payload)` devolve uma
+    // Promise com o `result` da resposta (comandos do mestre).
+    const pending = new Map();
+    let socket = null;
+    let nextId = 1;
+    let retryDelay = 1000;
+
+    function openTable() {
+        const url = new URL(tableUrl, window.location.href);
+        url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+        let opened = false;
+        socket = new WebSocket(url);
+        socket.addEventListener('open', () => {
+            opened = true;
+            retryDelay = 1000;
+        });
+        socket.addEventListener('message', (message) => {
+            const data = JSON.parse(message.data);
+            if (data.type === 'frame') {
+                data.events.forEach(dispatch);
+            } else if (data.type === 'reply' && pending.has(data.id)) {
+                const { resolve, reject } = pending.get(data.id);
+                pending.delete(data.id);
+                if (data.ok) resolve(data.result);
+                else reject(new Error(data.error));
+            }
+        });
+        socket.addEventListener('close', () => {
+            socket = null;
+            pending.forEach(({ reject }) => reject(new Error('Conexão perdida')));
+            pending.clear();
+            if (!opened) {
+                // Nunca abriu: servidor sem WebSocket. Fica no SSE.
+                openStream();
+                return;
+            }
+            setTimeout(openTable, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 30000);
+        });
+    }
+
+    window.hudTable = {
+        send(action, payload = {}) {
+            if (!socket || socket.readyState !== WebSocket.OPEN) {
+                return Promise.reject(new Error('Sessão de mesa desconectada'));
+            }
+            const id = nextId++;
+            socket.send(JSON.stringify({ ...payload, id, action }));
+            return new Promise((resolve, reject) => pending.set(id, { resolve, reject }));
+        },
+    };
+
+    if (tableUrl && window.WebSocket) {
+        openTable();
+    } else {
+        openStream();
+    }
+})();
@@ -0,0 +1,93 @@
+(() => {
+    // Cliques de +/− nas barras vão em lote para /stats/: a tela atualiza na
+    // hora e, depois de FLUSH_DELAY_MS sem clique, sai um POST só com tudo.
+    // A URL vem do próprio <script data-stats-url="...">.
+    const script = document.currentScript;
+    const url = script?.dataset.statsUrl;
+    const FLUSH_DELAY_MS = 250;
+
+    let queue = [];
+    let timer = null;
+
+    function csrfToken() {
+        return window.hudConfig?.csrfToken
+            || document.querySelector('[name=csrfmiddlewaretoken]')?.value
+            || '';
+    }
+
+    function barRow(owner, ownerId, barId) {
+        const container = document.querySelector(
+            `[data-bar-owner="${owner}"][data-bar-owner-id="${ownerId}"]`
+        );
+        return container ? container.querySelector(`[data-bar-id="${barId}"]`) : null;
+    }
+
+    function render(row, current, max) {
+        const display = row.querySelector('.bar-display');
+        const fill = row.querySelector('.bar-fill');
+        if (display) {
+            display.textContent = `${current} / ${max}`;
+            display.dataset.current = current;
+            display.dataset.max = max;
+        }
+        if (fill) {
+            fill.style.width = `${max > 0 ? (current / max) * 100 : 0}%`;
+        }
+    }
+
+    function bumpBar(owner, ownerId, barId, delta) {
+        if (!url) return;
+        const row = barRow(owner, ownerId, barId);
+        const display = row?.querySelector('.bar-display');
+        if (display) {
+            const max = Number(display.dataset.max);
+            const current = Math.max(0, Math.min(Number(display.dataset.current) + delta, max));
+            render(row, current, max);
+        }
+
+        // Deltas seguidos no mesmo sentido somam sem mudar o resultado do
+        // clamp; troca de sentido vira outra mutação, aplicada em ordem.
+        const last = queue[queue.length - 1];
+        if (last && last.owner === owner && last.id === ownerId && last.bar === barId
+            && Math.sign(last.delta) === Math.sign(delta)) {
+            last.delta += delta;
+        } else {
+            queue.push({ owner, id: ownerId, stat: 'bar', bar: barId, delta });
+        }
+        clearTimeout(timer);
+        timer = setTimeout(flush, FLUSH_DELAY_MS);
+    }
+
+    function flush() {
+        if (!queue.length) return;
+        const mutations = queue;
+        queue = [];
+
+        fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken(),
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            body: JSON.stringify({ mutations }),
+        })
+            .then((response) => response.json())
+            .then((data) => {
+                if (!data.success) {
+                    alert(data.error || 'Erro ao modificar');
+                    return;
+                }
+                // Enquanto há cliques na fila, a prévia local vale mais.
+                if (queue.length) return;
+                data.results.forEach((result) => {
+                    if (result.stat !== 'bar') return;
+                    const row = barRow(result.owner, result.id, result.bar);
+                    if (row) render(row, result.current, result.max);
+                });
+            })
+            .catch((error) => console.error('Erro:', error));
+    }
+
+    window.hudStats = { bumpBar };
+})();
@@ -0,0 +1,186 @@
+"""
+Mutação de status (HP, SP e barras) de personagens e NPCs.
+
+Os endpoints antigos mudavam ±1 por request com ler → `min`/`max` em Python →
+`save()` de todas as colunas: dois cliques juntos se atropelavam e 15 de dano
+custavam 15 round trips. Aqui cada mutação vira um UPDATE só, com o clamp no
+próprio SQL (`GREATEST(LEAST(...), 0)`), então cliques concorrentes somam em
+vez de se sobrescrever, e um lote inteiro roda numa transação.
+
+Uma mutação:
+`{"owner": "character" | "npc", "id": <pk>, "stat": "hp" | "sp" | "bar",
+  "bar": <pk da barra, só com stat=bar>, "delta": <int> | "value": <int>}`
+— `delta` soma ao valor atual, `value` define o valor absoluto; os dois são
+limitados a [0, máximo].
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from django.db import transaction
+from django.db.models import F, IntegerField, Model, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from . import live
+from .models import NPC, Character, CharacterBar, NPCBar
+
+MAX_MUTATIONS = 50
+# Nenhum status chega perto disso; só impede estourar o inteiro do banco.
+MAX_MAGNITUDE = 1_000_000
+
+OWNER_MODELS = {
+    "character": (Character, CharacterBar, "character_id"),
+    "npc": (NPC, NPCBar, "npc_id"),
+}
+# stat -> (coluna do valor atual, coluna do máximo)
+OWNER_STATS = {
+    "hp": ("hp_current", "hp_max"),
+    "sp": ("sp_current", "sp_max"),
+}
+
+
+class StatError(ValueError):
+    """Lote inválido: nada dele é aplicado."""
+
+
+class StatPermissionError(StatError):
+    """O usuário não pode mexer em algum dos donos do lote."""
+
+
+def _int(value: Any, label: str) -> int:
+    if isinstance(value, bool):
+        raise StatError(f"{label} inválido.")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise StatError(f"{label} inválido.") from None
+    if abs(number) > MAX_MAGNITUDE:
+        raise StatError(f"{label} fora do limite.")
+    return number
+
+
+def _parse(mutations: Any) -> list[dict[str, Any]]:
+    if not isinstance(mutations, list) or not mutations:
+        raise StatError("Nenhuma mutação enviada.")
+    if len(mutations) > MAX_MUTATIONS:
+        raise StatError(f"No máximo {MAX_MUTATIONS} mutações por lote.")
+
+    parsed = []
+    for mutation in mutations:
+        if not isinstance(mutation, dict):
+            raise StatError("Mutação inválida.")
+        owner = mutation.get("owner")
+        if owner not in OWNER_MODELS:
+            raise StatError("Dono inválido.")
+        stat = mutation.get("stat")
+        if stat not in ("hp", "sp", "bar"):
+            raise StatError("Status inválido.")
+        if ("delta" in mutation) == ("value" in mutation):
+            raise StatError("Envie `delta` ou `value`.")
+        parsed.append(
+            {
+                "owner": owner,
+                "id": _int(mutation.get("id"), "Dono"),
+                "stat": stat,
+                "bar": _int(mutation.get("bar"), "Barra") if stat == "bar" else None,
+                "delta": _int(mutation["delta"], "Delta") if "delta" in mutation else None,
+                "value": _int(mutation["value"], "Valor") if "value" in mutation else None,
+            }
+        )
+    return parsed
+
+
+def _clamped(current: str, maximum: str, delta: int | None, value: int | None):
+    target = F(current) + delta if delta is not None else Value(value)
+    return Greatest(Least(target, F(maximum), output_field=IntegerField()), Value(0), output_field=IntegerField())
+
+
+def _target_key(mutation: dict[str, Any]) -> tuple[str, int, str, int | None]:
+    return mutation["owner"], mutation["id"], mutation["stat"], mutation["bar"]
+
+
+def apply_mutations(
+    mutations: Any, can_edit: Callable[[str, Model], bool]
+) -> list[dict[str, Any]]:
+    """Aplica o lote inteiro ou nada e devolve os valores finais de cada status tocado.
+
+    `can_edit(owner, obj)` decide a permissão sobre cada personagem/NPC do lote.
+    """
+    parsed = _parse(mutations)
+
+    owners: dict[str, dict[int, Model]] = {}
+    bars: dict[str, dict[int, Model]] = {}
+    for kind, (owner_model, bar_model, owner_field) in OWNER_MODELS.items():
+        ids = {m["id"] for m in parsed if m["owner"] == kind}
+        bar_ids = {m["bar"] for m in parsed if m["owner"] == kind and m["stat"] == "bar"}
+        owners[kind] = owner_model.objects.select_related("campaign").in_bulk(ids) if ids else {}
+        if ids - owners[kind].keys():
+            raise StatError("Personagem ou NPC inexistente.")
+        bars[kind] = bar_model.objects.in_bulk(bar_ids) if bar_ids else {}
+        for m in parsed:
+            if m["owner"] == kind and m["stat"] == "bar":
+                bar = bars[kind].get(m["bar"])
+                if bar is None or getattr(bar, owner_field) != m["id"]:
+                    raise StatError("Barra inexistente.")
+    for kind, objects in owners.items():
+        for obj in objects.values():
+            if not can_edit(kind, obj):
+                raise StatPermissionError("Sem permissão")
+
+    with transaction.atomic():
+        now = timezone.now()
+        for m in parsed:
+            owner_model, bar_model, _ = OWNER_MODELS[m["owner"]]
+            if m["stat"] == "bar":
+                bar_model.objects.filter(pk=m["bar"]).update(
+                    current=_clamped("current", "max_value", m["delta"], m["value"])
+                )
+            else:
+                current, maximum = OWNER_STATS[m["stat"]]
+                owner_model.objects.filter(pk=m["id"]).update(
+                    **{current: _clamped(current, maximum, m["delta"], m["value"])},
+                    updated_at=now,
+                )
+
+        # Barra mudou a ficha do dono: a versão da página dele (hud/conditional.py)
+        # sai do `updated_at`, que o UPDATE da barra não toca.
+        for kind, (owner_model, _, _) in OWNER_MODELS.items():
+            bar_owners = {m["id"] for m in parsed if m["owner"] == kind and m["stat"] == "bar"}
+            if bar_owners:
+                owner_model.objects.filter(pk__in=bar_owners).update(updated_at=now)
+
+        # Valores finais, relidos depois de todos os UPDATEs.
+        stat_owners = {(m["owner"], m["id"]) for m in parsed if m["stat"] != "bar"}
+        for kind, (owner_model, bar_model, owner_field) in OWNER_MODELS.items():
+            stat_ids = {pk for owner_kind, pk in stat_owners if owner_kind == kind}
+            if stat_ids:
+                for pk, obj in owner_model.objects.in_bulk(stat_ids).items():
+                    obj.campaign = owners[kind][pk].campaign
+                    owners[kind][pk] = obj
+            if bars[kind]:
+                bars[kind] = bar_model.objects.in_bulk(bars[kind].keys())
+
+            # `update()` não dispara post_save: os eventos ao vivo saem daqui.
+            event = live.character_event if kind == "character" else live.npc_event
+            for pk in stat_ids:
+                obj = owners[kind][pk]
+                live.publish(obj.campaign_id, event(obj))
+            for bar in bars[kind].values():
+                owner = owners[kind][getattr(bar, owner_field)]
+                live.publish(owner.campaign_id, live.bar_event(bar, owner))
+
+    results = []
+    touched = sorted({_target_key(m) for m in parsed}, key=lambda key: (*key[:3], key[3] or 0))
+    for owner_kind, pk, stat, bar_id in touched:
+        if stat == "bar":
+            bar = bars[owner_kind][bar_id]
+            current, maximum = bar.current, bar.max_value
+        else:
+            obj = owners[owner_kind][pk]
+            current, maximum = (getattr(obj, column) for column in OWNER_STATS[stat])
+        results.append(
+            {"owner": owner_kind, "id": pk, "stat": stat, "bar": bar_id, "current": current, "max": maximum}
+        )
+    return results
@@ -0,0 +1,127 @@
+"""
+Resumo materializado de cada campanha (`CampaignSummary`) para os dashboards.
+
+Os dashboards mostram, por campanha, quantos jogadores, personagens, NPCs e
+itens ela tem e quando foi mexida por último. Contar isso na hora seria uma
+consulta por campanha; em vez disso cada campanha tem uma linha de resumo,
+lida no mesmo SELECT da lista (`select_related("summary")`).
+
+Os receivers abaixo mantêm a linha em dia. Cada mudança recalcula só a
+contagem afetada, da campanha afetada, num `UPDATE ... SET x = (SELECT
+COUNT(*) ...)` — uma consulta, sem ler a linha antes e sem deriva se dois
+requests mexem ao mesmo tempo. Personagem, NPC ou item que troca de campanha
+(pelo admin) é recontado nas duas; um save comum só marca a atividade.
+
+Campanha criada sem signal (`bulk_create`, fixtures) fica sem resumo até a
+primeira visita ao dashboard, que o cria com `ensure()`.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import NPC, Campaign, CampaignSummary, Character, Item
+
+Membership = Campaign.players.through
+
+# Contagem -> (modelo, coluna que aponta para a campanha)
+COUNTS = {
+    "player_count": (Membership, "campaign_id"),
+    "character_count": (Character, "campaign_id"),
+    "npc_count": (NPC, "campaign_id"),
+    "item_count": (Item, "campaign_id"),
+}
+
+
+def _count(field: str):
+    model, column = COUNTS[field]
+    rows = (
+        model.objects.filter(**{column: OuterRef("campaign_id")})
+        .order_by()
+        .values(column)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows), Value(0), output_field=IntegerField())
+
+
+def refresh(campaign_ids: Iterable[int | None], *fields: str) -> None:
+    """Recalcula `fields` (todas, se nenhuma) das campanhas dadas e marca a atividade."""
+    ids = {pk for pk in campaign_ids if pk is not None}
+    if not ids:
+        return
+    values = {field: _count(field) for field in fields or COUNTS}
+    CampaignSummary.objects.filter(campaign_id__in=ids).update(**values, last_activity_at=timezone.now())
+
+
+def ensure(campaigns: Iterable[Campaign]) -> None:
+    """Cria o resumo que faltar e o pendura na campanha, sem mexer nas que já têm.
+
+    As campanhas precisam vir com `select_related("summary")`.
+    """
+    missing = [campaign for campaign in campaigns if getattr(campaign, "summary", None) is None]
+    if not missing:
+        return
+    CampaignSummary.objects.bulk_create(
+        [CampaignSummary(campaign=campaign, last_activity_at=campaign.updated_at) for campaign in missing],
+        ignore_conflicts=True,
+    )
+    ids = [campaign.pk for campaign in missing]
+    CampaignSummary.objects.filter(campaign_id__in=ids).update(**{field: _count(field) for field in COUNTS})
+    summaries = CampaignSummary.objects.in_bulk(ids)
+    for campaign in missing:
+        campaign.summary = summaries[campaign.pk]
+
+
+# --- Receivers ---
+
+
+@receiver(post_save, sender=Campaign)
+def create_summary(sender, instance, created, **kwargs):  # noqa: ANN001
+    if created:
+        CampaignSummary.objects.create(campaign=instance, last_activity_at=instance.created_at)
+
+
+FIELD_BY_MODEL = {Character: "character_count", NPC: "npc_count", Item: "item_count"}
+
+
+@receiver(post_save, sender=Character)
+@receiver(post_save, sender=NPC)
+@receiver(post_save, sender=Item)
+def refresh_on_save(sender, instance, created, **kwargs):  # noqa: ANN001
+    field = FIELD_BY_MODEL[sender]
+    previous = getattr(instance, "_saved_campaign_id", None)
+    if created or previous != instance.campaign_id:
+        refresh([instance.campaign_id, previous], field)
+    else:
+        # Só atividade: a contagem não mudou.
+        CampaignSummary.objects.filter(campaign_id=instance.campaign_id).update(last_activity_at=timezone.now())
+    instance._saved_campaign_id = instance.campaign_id
+
+
+@receiver(post_delete, sender=Character)
+@receiver(post_delete, sender=NPC)
+@receiver(post_delete, sender=Item)
+def refresh_on_delete(sender, instance, **kwargs):  # noqa: ANN001
+    refresh([instance.campaign_id], FIELD_BY_MODEL[sender])
+
+
+@receiver(m2m_changed, sender=Membership)
+def refresh_on_membership(sender, instance, action, reverse, pk_set, **kwargs):  # noqa: ANN001
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh([instance.pk], "player_count")
+        return
+    # Pelo lado do usuário (user.campaigns_as_player.add/remove/clear).
+    if action == "pre_clear":
+        instance._summary_cleared = list(instance.campaigns_as_player.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        refresh(pk_set, "player_count")
+    elif action == "post_clear":
+        refresh(getattr(instance, "_summary_cleared", []), "player_count")
@@ -0,0 +1,275 @@
+"""
+Sessão de mesa por WebSocket: `/campaigns/<id>/table/`.
+
+É o canal do mestre com a mesa. Cada cliente conectado (mestre ou jogador)
+recebe os mesmos deltas do ao vivo (hud/live.py) — barras, vida/SP,
+visibilidade e slots de inventário —, com o filtro de `live.for_viewer`. E o
+mestre pode mandar comandos pelo próprio socket, que viram um lote só:
+
+- `{"id": 1, "action": "reveal", "targets": [{"owner": "npc", "id": 7, "visible": true}, ...]}`
+- `{"id": 2, "action": "stats", "mutations": [...]}` (formato de hud/stats.py)
+- `{"id": 3, "action": "inventory", "operations": [...]}` (formato de hud/inventory.py)
+
+A resposta vem como `{"type": "reply", "id": 1, "ok": true, "result": ...}`
+(ou `"ok": false, "error": "..."`), e o efeito chega a todos como eventos.
+
+O acesso é conferido de novo a cada `live.ACCESS_CHECK_SECONDS`, como no SSE:
+jogador removido da campanha (ou que saiu dela) tem o socket fechado com
+`CLOSE_FORBIDDEN`. A mesma conferência recarrega os personagens do jogador
+(`live.Viewer`).
+
+Os eventos não saem um a um: o primeiro abre uma janela de `TICK_SECONDS`
+(50ms), tudo que chega nela é juntado por alvo — a última versão de cada
+barra, slot, personagem ou NPC ganha — e sai num quadro só,
+`{"type": "frame", "events": [...]}`. Uma rajada de cliques vira um quadro
+por cliente.
+
+O protocolo é ASGI puro (o Django não fala WebSocket): `rpg_panel/asgi.py`
+manda para `application` as conexões `websocket`. A sessão e o usuário saem
+do cookie de sessão, como numa página; `Origin` de outro host é recusado.
+Sob WSGI a rota HTTP responde `426` e o `live.js` cai no SSE.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from contextlib import suppress
+from importlib import import_module
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import transaction
+from django.http import parse_cookie
+
+from . import inventory, live, stats
+from .access import CampaignAccess
+from .models import NPC, Campaign, Character
+
+TABLE_PATH = re.compile(r"^/campaigns/(?P<pk>\d+)/table/$")
+TICK_SECONDS = 0.05
+# Comando maior que isso não é de uma mesa de RPG.
+MAX_MESSAGE_BYTES = 64 * 1024
+MAX_REVEALS = 100
+# Códigos de fechamento (4000–4999 são da aplicação).
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+REVEAL_MODELS = {"character": Character, "npc": NPC}
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class TableError(ValueError):
+    """Comando inválido; a mensagem vai para quem mandou."""
+
+
+class Coalescer:
+    """Junta os eventos de um tick, uma entrada por alvo, a mais nova ganha."""
+
+    def __init__(self) -> None:
+        self._pending: dict[tuple[Any, ...], dict[str, Any]] = {}
+
+    @staticmethod
+    def key(event: dict[str, Any]) -> tuple[Any, ...]:
+        kind = event["type"]
+        if kind in ("bar", "bar_deleted"):
+            return ("bar", event["owner"], event["id"])
+        if kind == "slot":
+            return ("slot", event["owner"], event["owner_id"], event["position"])
+        return (kind, event["id"])
+
+    def add(self, event: dict[str, Any]) -> None:
+        key = self.key(event)
+        # Sai da posição antiga: a ordem do quadro é a da última mudança.
+        self._pending.pop(key, None)
+        self._pending[key] = event
+
+    def drain(self) -> list[dict[str, Any]]:
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+
+def _headers(scope: Scope) -> dict[str, str]:
+    return {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope.get("headers", [])}
+
+
+def _same_origin(headers: dict[str, str]) -> bool:
+    origin = headers.get("origin")
+    if not origin:
+        # Cliente que não é navegador: o cookie de sessão ainda é exigido.
+        return True
+    trusted = getattr(settings, "CSRF_TRUSTED_ORIGINS", [])
+    return urlsplit(origin).netloc == headers.get("host") or origin in trusted
+
+
+def _connect(
+    headers: dict[str, str], query: dict[str, list[str]], campaign_id: int
+) -> tuple[CampaignAccess, live.Viewer] | None:
+    """Quem está do outro lado, pelo cookie de sessão; None se não pode entrar."""
+    cookies = parse_cookie(headers.get("cookie", ""))
+    store = import_module(settings.SESSION_ENGINE).SessionStore(cookies.get(settings.SESSION_COOKIE_NAME))
+    user = get_user(SimpleNamespace(session=store))
+    campaign = Campaign.objects.filter(pk=campaign_id).first()
+    if campaign is None or not user.is_authenticated:
+        return None
+    access = CampaignAccess(campaign, user, preview=query.get("mode") == ["player"])
+    # `allowed` e o `Viewer` resolvem aqui as consultas, fora do loop assíncrono.
+    if not access.allowed:
+        return None
+    return access, live.Viewer.load(access)
+
+
+def reveal(campaign: Campaign, targets: Any) -> list[dict[str, Any]]:
+    """Mostra/esconde vários personagens e NPCs numa transação."""
+    if not isinstance(targets, list) or not targets or len(targets) > MAX_REVEALS:
+        raise TableError(f"`targets` deve ser uma lista de 1 a {MAX_REVEALS} alvos.")
+    parsed = []
+    for target in targets:
+        try:
+            model = REVEAL_MODELS[target["owner"]]
+            parsed.append((target["owner"], model, int(target["id"]), bool(target["visible"])))
+        except (KeyError, TypeError, ValueError):
+            raise TableError("Alvo inválido.") from None
+
+    results = []
+    with transaction.atomic():
+        for owner, model, pk, visible in parsed:
+            obj = model.objects.filter(pk=pk, campaign=campaign).first()
+            if obj is None:
+                raise TableError("Personagem ou NPC inexistente nesta campanha.")
+            if obj.visible != visible:
+                obj.visible = visible
+                # save() e não update(): os receivers (cache, GET condicional, ao vivo) rodam.
+                obj.save(update_fields=["visible", "updated_at"])
+            results.append({"owner": owner, "id": pk, "visible": visible})
+    return results
+
+
+def run_command(access: CampaignAccess, message: dict[str, Any]) -> Any:
+    """Executa um comando do mestre e devolve o `result` da resposta."""
+    if not access.is_master:
+        raise TableError("Sem permissão")
+    campaign = access.campaign
+    action = message.get("action")
+    if action == "reveal":
+        return reveal(campaign, message.get("targets"))
+    if action == "stats":
+        return stats.apply_mutations(message.get("mutations"), lambda owner, obj: obj.campaign_id == campaign.pk)
+    if action == "inventory":
+        return inventory.apply_operations(campaign, message.get("operations"))
+    raise TableError("Ação desconhecida.")
+
+
+class TableSession:
+    """Uma conexão aceita: escreve quadros e lê comandos até o cliente sair."""
+
+    def __init__(self, access: CampaignAccess, viewer: live.Viewer, send: Send) -> None:
+        self.access = access
+        self.viewer = viewer
+        self._send = send
+        self._send_lock = asyncio.Lock()
+
+    async def send_json(self, payload: dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self._send({"type": "websocket.send", "text": json.dumps(payload, separators=(",", ":"))})
+
+    async def run(self, receive: Receive) -> None:
+        subscription = live.broker.subscribe(self.access.campaign.pk)
+        writer = asyncio.create_task(self._write(subscription))
+        watcher = asyncio.create_task(self._watch_access(writer))
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message["type"] == "websocket.receive" and not writer.done():
+                    await self._handle(message.get("text") or message.get("bytes") or "")
+        finally:
+            for task in (watcher, writer):
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+            live.broker.unsubscribe(subscription)
+
+    async def _watch_access(self, writer: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(live.ACCESS_CHECK_SECONDS)
+            viewer = await live.database(live.Viewer.recheck)(self.access)
+            if viewer is None:
+                # Saiu da campanha: nem mais um quadro. O servidor responde com o disconnect.
+                writer.cancel()
+                async with self._send_lock:
+                    await self._send({"type": "websocket.close", "code": CLOSE_FORBIDDEN})
+                return
+            self.viewer.characters = viewer.characters
+
+    async def _write(self, subscription: live.Subscription) -> None:
+        coalescer = Coalescer()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), live.HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await self.send_json({"type": "ping"})
+                continue
+            coalescer.add(event)
+            # O primeiro evento abre o tick; o resto da rajada entra no mesmo quadro.
+            await asyncio.sleep(TICK_SECONDS)
+            while not subscription.queue.empty():
+                coalescer.add(subscription.queue.get_nowait())
+            events = [
+                payload
+                for payload in (live.for_viewer(event, self.viewer) for event in coalescer.drain())
+                if payload is not None
+            ]
+            if events:
+                await self.send_json({"type": "frame", "events": events})
+
+    async def _handle(self, raw: str | bytes) -> None:
+        if len(raw) > MAX_MESSAGE_BYTES:
+            await self.send_json({"type": "reply", "id": None, "ok": False, "error": "Mensagem grande demais."})
+            return
+        try:
+            message = json.loads(raw)
+            if not isinstance(message, dict):
+                raise ValueError
+        except ValueError:
+            await self.send_json({"type": "reply", "id": None, "ok": False, "error": "JSON inválido"})
+            return
+        reply: dict[str, Any] = {"type": "reply", "id": message.get("id")}
+        try:
+            result = await live.database(run_command)(self.access, message)
+        except (TableError, stats.StatError, inventory.InventoryError) as exc:
+            reply.update(ok=False, error=str(exc))
+        else:
+            reply.update(ok=True, result=result)
+        await self.send_json(reply)
+
+
+async def application(scope: Scope, receive: Receive, send: Send) -> None:
+    """App ASGI das conexões `websocket`."""
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    match = TABLE_PATH.match(scope["path"])
+    if match is None:
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+        return
+    headers = _headers(scope)
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    connected = None
+    if _same_origin(headers):
+        connected = await live.database(_connect)(headers, query, int(match["pk"]))
+    if connected is None:
+        # Fechar antes de aceitar vira um 403 no handshake.
+        await send({"type": "websocket.close", "code": CLOSE_FORBIDDEN})
+        return
+    await send({"type": "websocket.accept"})
+    await TableSession(*connected, send).run(receive)
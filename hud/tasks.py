@@ -0,0 +1,72 @@
+"""
+Tarefas que o `run_worker` executa (hud/jobs.py).
+
+- `send_password_reset`: o e-mail de `forgot_password`. O SMTP do Gmail pode
+  levar segundos para responder; o request só agenda.
+- `generate_thumbnails`: os derivados WebP de um upload (hud/thumbnails.py).
+- `purge_expired_tokens` e `purge_finished_jobs`: limpeza periódica, agendada
+  pelo próprio worker.
+
+Todas são idempotentes: uma tarefa pode rodar de novo se o worker morrer no
+meio dela.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import send_mail
+from django.urls import reverse
+from django.utils import timezone
+
+from . import jobs, thumbnails
+from .models import Job, PasswordResetToken
+
+# Token vencido fica este tempo como trilha de auditoria antes de sair.
+TOKEN_RETENTION = timedelta(days=7)
+# Tarefa concluída ou que falhou de vez fica este tempo para consulta no admin.
+JOB_RETENTION = timedelta(days=7)
+
+
+@jobs.task("send_password_reset", max_attempts=5, backoff=timedelta(seconds=30))
+def send_password_reset(token_id: int) -> None:
+    # O payload fica no banco (e no admin) por JOB_RETENTION: nada de token nele.
+    reset = PasswordResetToken.objects.select_related("user").filter(pk=token_id).first()
+    # Token que já foi usado ou venceu enquanto esperava não vale mais e-mail.
+    if reset is None or reset.used or reset.expires_at < timezone.now():
+        return
+    reset_url = settings.SITE_URL + reverse("reset_password", args=[reset.token])
+    send_mail(
+        subject="Recuperar sua senha - Painel RPG HUD",
+        message=(
+            f"Olá {reset.user.username},\n\nClique no link abaixo para resetar sua senha:\n\n"
+            f"{reset_url}\n\nEste link expira em 24 horas."
+        ),
+        from_email="noreply@rpg-panel.com",
+        recipient_list=[reset.user.email],
+    )
+
+
+@jobs.task("generate_thumbnails", max_attempts=3)
+def generate_thumbnails(model: str, name: str, sizes: list[str] | None = None) -> None:
+    """Gera os derivados de `name`, um arquivo do campo de imagem de `model` ("hud.item")."""
+    model_class = apps.get_model(model)
+    field, default_sizes = thumbnails.FIELDS[model_class]
+    storage = model_class._meta.get_field(field).storage
+    # Arquivo ilegível devolve None e fica sem miniatura: repetir não ajuda.
+    created = [size for size in sizes or default_sizes if thumbnails.generate(storage, name, size)]
+    if created:
+        thumbnails.thumbnail_ready.send(sender=model_class, name=name)
+
+
+@jobs.task("purge_expired_tokens", every=timedelta(hours=1))
+def purge_expired_tokens() -> None:
+    PasswordResetToken.objects.filter(expires_at__lt=timezone.now() - TOKEN_RETENTION).delete()
+
+
+@jobs.task("purge_finished_jobs", every=timedelta(hours=6))
+def purge_finished_jobs() -> None:
+    Job.objects.filter(
+        status__in=[Job.STATUS_DONE, Job.STATUS_FAILED], finished_at__lt=timezone.now() - JOB_RETENTION
+    ).delete()
@@ -1,5 +1,7 @@
 from django import template
 
+from hud import thumbnails
+
 register = template.Library()
 
 
@@ -19,3 +21,9 @@ def mul(value, arg):
         return float(value) * float(arg)
     except (ValueError, TypeError):
         return 0
+
+
+@register.filter
+def thumb(image, size="mini"):
+    """URL da miniatura WebP de um ImageField: {{ item.image|thumb:"card" }}"""
+    return thumbnails.thumbnail_url(image, size)
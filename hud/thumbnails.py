@@ -0,0 +1,163 @@
+"""
+Miniaturas WebP das imagens enviadas.
+
+Os templates usam as imagens como fundo CSS de avatares de 28–48px, cards e
+retratos; servir o upload original ali faz uma página com 100 personagens
+baixar 100 fotos inteiras. Aqui cada upload ganha derivados WebP em tamanhos
+fixos, gravados no mesmo storage em
+`thumbs/<tamanho>-<lado>q<qualidade>v<versão>/<caminho original>.webp`. O
+original nunca é tocado. Lado, qualidade e `RENDER_VERSION` no diretório fazem
+de cada derivado diferente uma URL nova: o cache imutável do navegador
+(hud/media.py) nunca guarda uma miniatura velha com o nome de uma nova.
+
+Os derivados nascem numa tarefa do worker agendada no upload (receivers
+abaixo, hud/tasks.py); nenhuma imagem é decodificada dentro de um request. O
+filtro `thumb` só lê: se o derivado falta — worker atrasado, upload antigo,
+arquivo copiado à mão —, devolve a URL original, sem agendar nada. Quem
+preenche o que falta é o `manage.py backfill_thumbnails` (ou `--enqueue`,
+pelo worker). Quando um derivado fica pronto, `thumbnail_ready` avisa os
+receivers de hud/conditional.py e hud/fragments.py, que trocam a versão das
+páginas e cards que mostravam o original.
+Arquivo que o Pillow não abre (formato sem suporte, upload corrompido) fica
+sem miniatura e o filtro devolve a URL original. A falha fica no cache por
+`FAILURE_CACHE_SECONDS`: nesse tempo ninguém reabre o arquivo nem loga de novo.
+"""
+
+from __future__ import annotations
+
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import Storage
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import Signal
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import jobs
+from .models import NPC, Campaign, Character, Item, UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Lado maior, em pixels. Cobrem o dobro do tamanho exibido (telas 2x):
+#   mini   — avatares e ícones de 28–48px (mini-thumb, nav, item-thumb);
+#   card   — cards, slots do inventário e retratos de até ~300px;
+#   banner — banner da campanha, usado como fundo da página.
+SIZES = {
+    "mini": 96,
+    "card": 640,
+    "banner": 1920,
+}
+QUALITY = 80
+PREFIX = "thumbs"
+# Suba quando `render()` passar a produzir outra imagem (filtro, formato).
+RENDER_VERSION = 1
+# Quanto tempo um original ilegível fica sem nova tentativa.
+FAILURE_CACHE_SECONDS = 10 * 60
+
+# Enviado com `sender=<modelo>` e `name=<arquivo>` quando um derivado é gerado.
+thumbnail_ready = Signal()
+
+# Campo de imagem de cada modelo e os tamanhos gerados no upload.
+FIELDS = {
+    Character: ("image", ("mini", "card")),
+    NPC: ("image", ("mini", "card")),
+    Item: ("image", ("mini", "card")),
+    UserProfile: ("avatar", ("mini",)),
+    Campaign: ("banner", ("banner",)),
+}
+
+
+def thumbnail_name(name: str, size: str) -> str:
+    # A extensão fica: `foto.png` e `foto.jpg` não podem dividir o derivado.
+    return posixpath.join(PREFIX, f"{size}-{SIZES[size]}q{QUALITY}v{RENDER_VERSION}", f"{name}.webp")
+
+
+def _failure_key(name: str, size: str) -> str:
+    return f"hud:thumb-failed:{size}:{name}"
+
+
+def render(source: File, size: str) -> bytes:
+    """Reduz a imagem para caber em SIZES[size] e devolve os bytes em WebP."""
+    edge = SIZES[size]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        # thumbnail() nunca amplia: imagem menor que o tamanho só é recodificada.
+        image.thumbnail((edge, edge))
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        buffer = BytesIO()
+        image.save(buffer, "WEBP", quality=QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def generate(storage: Storage, name: str, size: str, force: bool = False) -> str | None:
+    """Garante o derivado de `name` em `size` e devolve o nome dele.
+
+    Devolve None se o original não existe ou não é uma imagem legível.
+    """
+    failure_key = _failure_key(name, size)
+    if not force and cache.get(failure_key):
+        return None
+    target = thumbnail_name(name, size)
+    if not force and storage.exists(target):
+        return target
+    try:
+        with storage.open(name, "rb") as source:
+            data = render(source, size)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError, ValueError):
+        logger.warning("Sem miniatura para %s (%s)", name, size, exc_info=True)
+        cache.set(failure_key, True, FAILURE_CACHE_SECONDS)
+        return None
+    if force and storage.exists(target):
+        storage.delete(target)
+    # Dois processos gerando o mesmo derivado: o segundo ganha um nome
+    # alternativo, que fica órfão mas inofensivo.
+    storage.save(target, ContentFile(data))
+    cache.delete(failure_key)
+    return target
+
+
+def thumbnail_url(fieldfile, size: str) -> str:
+    """URL do derivado em `size`; se ele ainda não existe, a do original.
+
+    Só lê (renderizar uma página não grava nada): gerar o que falta é do
+    upload e do `backfill_thumbnails`.
+    """
+    if not fieldfile:
+        return ""
+    if size not in SIZES:
+        raise ValueError(f"Tamanho de miniatura desconhecido: {size!r}")
+    name, storage = fieldfile.name, fieldfile.storage
+    if cache.get(_failure_key(name, size)):
+        return fieldfile.url
+    target = thumbnail_name(name, size)
+    return storage.url(target) if storage.exists(target) else fieldfile.url
+
+
+# --- Geração no upload ---
+
+
+def _mark_new_upload(sender, instance, **kwargs) -> None:
+    # Antes do save o FieldFile recém-enviado ainda não foi gravado
+    # (`_committed` falso); é o único jeito barato de saber que houve upload.
+    field, _ = FIELDS[sender]
+    fieldfile = getattr(instance, field)
+    instance._thumbnail_pending = bool(fieldfile) and not fieldfile._committed
+
+
+def _generate_after_upload(sender, instance, **kwargs) -> None:
+    if not getattr(instance, "_thumbnail_pending", False):
+        return
+    instance._thumbnail_pending = False
+    field, _ = FIELDS[sender]
+    # O request só agenda; a tarefa entra na mesma transação do upload.
+    jobs.enqueue("generate_thumbnails", model=sender._meta.label_lower, name=getattr(instance, field).name)
+
+
+for _model in FIELDS:
+    pre_save.connect(_mark_new_upload, sender=_model, dispatch_uid=f"thumbnails_mark_{_model.__name__}")
+    post_save.connect(_generate_after_upload, sender=_model, dispatch_uid=f"thumbnails_generate_{_model.__name__}")
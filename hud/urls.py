@@ -7,16 +7,23 @@ urlpatterns = [
     path("master/", views.master_dashboard, name="master_dashboard"),
     path("player/", views.player_dashboard, name="player_dashboard"),
     path("campaigns/<int:pk>/", views.campaign_detail, name="campaign_detail"),
+    path("campaigns/<int:pk>/events/", views.campaign_events, name="campaign_events"),
+    path("campaigns/<int:pk>/table/", views.campaign_table, name="campaign_table"),
+    path("campaigns/<int:pk>/bars.json", views.campaign_bars, name="campaign_bars"),
     path("campaigns/<int:pk>/search_players/", views.search_players, name="search_players"),
+    path("campaigns/<int:pk>/roster/", views.campaign_roster, name="campaign_roster"),
     path("campaigns/<int:pk>/leave/", views.leave_campaign, name="leave_campaign"),
+    path("campaigns/<int:pk>/export/", views.campaign_export, name="campaign_export"),
     path("characters/", views.character_list, name="character_list"),
     path("characters/<int:pk>/", views.character_detail, name="character_detail"),
+    path("characters/<int:pk>/sheet.json", views.character_sheet, name="character_sheet"),
     path("npcs/<int:pk>/", views.npc_detail, name="npc_detail"),
     path(
-        "characters/<int:character_id>/slots/<int:slot_id>/assign/",
+        "characters/<int:character_id>/slots/<int:position>/assign/",
         views.assign_slot,
         name="assign_slot",
     ),
+    path("campaigns/<int:pk>/inventory/batch/", views.inventory_batch, name="inventory_batch"),
     path("register/", views.register, name="register"),
     path("me/", views.user_page, name="user_page"),
     path("items/<int:pk>/delete/", views.delete_item, name="delete_item"),
@@ -24,6 +31,7 @@ urlpatterns = [
     path("characters/<int:pk>/delete/", views.delete_character, name="delete_character"),
     path("forgot-password/", views.forgot_password, name="forgot_password"),
     path("reset-password/<str:token>/", views.reset_password, name="reset_password"),
+    path("stats/", views.modify_stats, name="modify_stats"),
     path("characters/<int:character_id>/modify-hp/", views.modify_hp, name="modify_hp"),
     path("characters/<int:character_id>/modify-sp/", views.modify_sp, name="modify_sp"),
     path("characters/<int:character_id>/toggle-visibility/", views.toggle_character_visibility, name="toggle_character_visibility"),
@@ -1,18 +1,21 @@
 from __future__ import annotations
 
 from typing import Any
+import json
 import secrets
 from datetime import timedelta
 
-from django.contrib import messages
+from django.contrib import admin, messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
-from django.http import HttpRequest, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from django.views.decorators.http import require_POST
-from django.db.models import Q
+from django.views.decorators.http import require_GET, require_POST, require_safe
+from . import archive, conditional, fragments, inventory, jobs, live, media, profiling, roster, search, snapshot, stats, summaries, thumbnails
+from .access import campaign_access
 from .forms import RegistrationForm, ProfileEditForm, ForgotPasswordForm, ResetPasswordForm
 from .models import UserProfile, PasswordResetToken
 
@@ -42,7 +45,7 @@ from .forms import (
     NPCAttributeForm,
     NPCSkillForm,
 )
-from .models import Campaign, Character, CharacterAttribute, InventorySlot, Item, NPC, NPCAbility, NPCAttribute, NPCBar, NPCInventorySlot, NPCSkill, UserProfile, CharacterBar
+from .models import Campaign, Character, CharacterAttribute, InventorySlot, Item, NPC, NPCAbility, NPCAttribute, NPCBar, NPCSkill, UserProfile, CharacterBar
 
 
 def forgot_password(request: HttpRequest) -> HttpResponse:
@@ -59,20 +62,15 @@ def forgot_password(request: HttpRequest) -> HttpResponse:
                 expires_at = timezone.now() + timedelta(hours=24)
                 
                 # Cria registro do token
-                PasswordResetToken.objects.create(
+                reset_token = PasswordResetToken.objects.create(
                     user=user,
                     token=token,
                     expires_at=expires_at
                 )
                 
-                # Envia email
-                reset_url = request.build_absolute_uri(f"/reset-password/{token}/")
-                send_mail(
-                    subject="Recuperar sua senha - Painel RPG HUD",
-                    message=f"Olá {user.username},\n\nClique no link abaixo para resetar sua senha:\n\n{reset_url}\n\nEste link expira em 24 horas.",
-                    from_email="noreply@rpg-panel.com",
-                    recipient_list=[user.email],
-                )
+                # O e-mail sai pelo worker (hud/tasks.py): o SMTP não segura o request.
+                # Só o id vai para a fila; o link com o token é montado na tarefa.
+                jobs.enqueue("send_password_reset", token_id=reset_token.pk)
                 
                 # Mostra email mascarado
                 masked_email = _mask_email(user.email)
@@ -137,8 +135,10 @@ def home(request: HttpRequest) -> HttpResponse:
 
 @login_required
 def master_dashboard(request: HttpRequest) -> HttpResponse:
-    campaigns = Campaign.objects.filter(master=request.user)
-    campaigns_as_player = request.user.campaigns_as_player.all()
+    # Contagens e última atividade vêm do resumo, no mesmo SELECT (hud/summaries.py).
+    campaigns = list(Campaign.objects.filter(master=request.user).select_related("summary"))
+    campaigns_as_player = list(request.user.campaigns_as_player.select_related("master", "summary"))
+    summaries.ensure([*campaigns, *campaigns_as_player])
     campaign_form = CampaignForm()
 
     if request.method == "POST":
@@ -166,7 +166,8 @@ def master_dashboard(request: HttpRequest) -> HttpResponse:
 @login_required
 def player_dashboard(request: HttpRequest) -> HttpResponse:
     # Show all campaigns the player is part of
-    campaigns_as_player = request.user.campaigns_as_player.all()
+    campaigns_as_player = list(request.user.campaigns_as_player.select_related("master", "summary"))
+    summaries.ensure(campaigns_as_player)
     
     # Player mode: força modo de visualização
     player_mode = request.GET.get("mode") == "player"
@@ -185,17 +186,18 @@ def player_dashboard(request: HttpRequest) -> HttpResponse:
 def campaign_detail(request: HttpRequest, pk: int) -> HttpResponse:
     campaign = get_object_or_404(Campaign, pk=pk)
 
-    # Verificar acesso: mestre ou player vinculado
-    is_master = campaign.master == request.user
-    is_player = request.user in campaign.players.all()
+    # Verificar acesso: mestre ou player vinculado (mode=player já desliga o mestre)
+    access = campaign_access(request, campaign)
+    is_master = access.is_master
 
-    # Se mode=player, força modo player (sem edição)
-    if request.GET.get("mode") == "player":
-        is_master = False
-
-    if not is_master and not is_player:
+    if not access.allowed:
         return HttpResponseForbidden("Você não tem acesso a esta campanha.")
 
+    # Nada mudou desde a última visita: 304 antes de montar forms e listas.
+    page = conditional.PageVersion(request, campaign.updated_at, role="master" if is_master else "player")
+    if (not_modified := page.not_modified()) is not None:
+        return not_modified
+
     campaign_form = CampaignForm(instance=campaign, prefix="campaign")
     character_form = CharacterForm(prefix="character")
     # Filter assigned_to to show only players in this campaign
@@ -204,16 +206,12 @@ def campaign_detail(request: HttpRequest, pk: int) -> HttpResponse:
     npc_form = NPCForm(prefix="npc") if is_master else None
     if is_master and npc_form:
         npc_form.fields["assigned_to_character"].queryset = campaign.characters.all()
-    players = campaign.players.select_related("profile").all()
     search_results = []
     if is_master:
         q = request.GET.get("player_q", "").strip()
         if q:
-            # Busca por apelido (nickname), case-insensitive
-            profiles = UserProfile.objects.select_related("user").filter(nickname__icontains=q)
-            # Excluir mestre e os já adicionados
-            profiles = [p for p in profiles if p.user != campaign.master and p.user not in players]
-            search_results = profiles
+            # Mesmo índice do search_players: sem o mestre e os já adicionados
+            search_results = search.matching_profiles(campaign, q)
 
     if request.method == "POST" and is_master:
         form_type = request.POST.get("form_type")
@@ -267,47 +265,38 @@ def campaign_detail(request: HttpRequest, pk: int) -> HttpResponse:
                 item.save(update_fields=["description"])
                 messages.success(request, "Descrição do item atualizada.")
             return redirect("campaign_detail", pk=campaign.pk)
-        elif form_type == "add_player":
-            user_id = request.POST.get("user_id")
-            if user_id:
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-                user = get_object_or_404(User, pk=user_id)
-                if user != campaign.master:
-                    campaign.players.add(user)
-                    messages.success(request, "Jogador adicionado à campanha.")
-                return redirect("campaign_detail", pk=campaign.pk)
-        elif form_type == "remove_player":
-            user_id = request.POST.get("user_id")
-            if user_id:
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-                user = get_object_or_404(User, pk=user_id)
-                if user in campaign.players.all():
-                    campaign.players.remove(user)
-                    messages.success(request, "Jogador removido da campanha.")
-                return redirect("campaign_detail", pk=campaign.pk)
-        elif form_type == "add_players_bulk":
-            user_ids = request.POST.getlist("user_ids")
+        elif form_type in ("add_player", "remove_player", "add_players_bulk"):
+            # Formulários sem JavaScript; o painel usa o campaign_roster.
+            user_ids = request.POST.getlist("user_ids") or request.POST.getlist("user_id")
             if user_ids:
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-                users = User.objects.filter(pk__in=user_ids).exclude(pk=campaign.master_id)
-                for u in users:
-                    campaign.players.add(u)
-                messages.success(request, "Jogadores adicionados à campanha.")
+                try:
+                    if form_type == "remove_player":
+                        roster.apply_changes(campaign, remove=roster.parse({"remove": user_ids})[1])
+                        messages.success(request, "Jogador removido da campanha.")
+                    else:
+                        roster.apply_changes(campaign, add=roster.parse({"add": user_ids})[0])
+                        messages.success(request, "Jogadores adicionados à campanha.")
+                except roster.RosterError as exc:
+                    messages.error(request, str(exc))
             return redirect("campaign_detail", pk=campaign.pk)
 
-    characters = campaign.characters.all()
+    # Plano de consultas da página: cada lista sai em uma consulta só, com o
+    # que o template lê por linha (dono, avatar do dono, personagem vinculado)
+    # já junto. O número de consultas não cresce com o tamanho da campanha.
+    characters = campaign.characters.select_related("assigned_to__profile")
     
     # Se não for mestre, mostra apenas personagens visíveis
     if not is_master:
         characters = characters.filter(visible=True)
     
-    items = campaign.items.all()
-    npcs = campaign.npcs.all()
-
-    return render(
+    characters = list(characters)
+    items = list(campaign.items.all()) if is_master else []
+    npcs = list(campaign.npcs.select_related("assigned_to_character")) if is_master else []
+    players = list(campaign.players.select_related("profile"))
+    # Versões dos cards em cache (hud/fragments.py), numa ida ao cache só.
+    fragments.stamp(characters=characters, npcs=npcs, items=items, players=players)
+
+    return page.stamp(render(
         request,
         "hud/campaign_detail.html",
         {
@@ -323,37 +312,58 @@ def campaign_detail(request: HttpRequest, pk: int) -> HttpResponse:
             "players": players,
             "search_results": search_results,
         },
+    ))
+
+
+@login_required
+def campaign_events(request: HttpRequest, pk: int) -> HttpResponse:
+    """Stream SSE com os deltas ao vivo da campanha (barras, vida, visibilidade)."""
+    campaign = get_object_or_404(Campaign, pk=pk)
+    access = campaign_access(request, campaign)
+    if not access.allowed:
+        return HttpResponseForbidden("Você não tem acesso a esta campanha.")
+
+    # Sob WSGI o stream prenderia um worker para sempre. 204 faz o EventSource
+    # desistir de reconectar, e a página segue funcionando sem ao vivo.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        live.event_stream(access, live.Viewer.load(access)),
+        content_type="text/event-stream",
     )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+@require_GET
+def campaign_bars(request: HttpRequest, pk: int) -> JsonResponse:
+    """As barras de todos os personagens e NPCs da campanha, para overlays."""
+    campaign = get_object_or_404(Campaign, pk=pk)
+    access = campaign_access(request, campaign)
+    if not access.allowed:
+        return JsonResponse({"error": "Sem permissão"}, status=403)
+    bars = snapshot.campaign_bars(campaign, access.is_master, request.user.pk)
+    return JsonResponse({"bars": bars}, json_dumps_params={"separators": (",", ":")})
+
+
+def campaign_table(request: HttpRequest, pk: int) -> HttpResponse:
+    """Sessão de mesa (hud/table.py): só existe como WebSocket, servido pelo ASGI."""
+    response = HttpResponse("Use um WebSocket nesta URL.", status=426, content_type="text/plain; charset=utf-8")
+    response["Upgrade"] = "websocket"
+    response["Connection"] = "Upgrade"
+    return response
 
 
 @login_required
 def search_players(request: HttpRequest, pk: int) -> JsonResponse:
     campaign = get_object_or_404(Campaign, pk=pk)
-    if campaign.master != request.user:
+    if not campaign_access(request, campaign).owns:
         return JsonResponse({"error": "Sem permissão"}, status=403)
     q = (request.GET.get("q", "") or "").strip()
-    results = []
-    if q:
-        profiles = (
-            UserProfile.objects.select_related("user")
-            .filter(
-                Q(nickname__icontains=q)
-                | Q(display_name__icontains=q)
-                | Q(user__username__icontains=q)
-            )
-            .exclude(user=campaign.master)
-        )
-        current_ids = set(campaign.players.values_list("id", flat=True))
-        for p in profiles:
-            if p.user_id in current_ids:
-                continue
-            results.append(
-                {
-                    "id": p.user_id,
-                    "name": p.user.username,
-                    "avatar": p.avatar.url if p.avatar else "",
-                }
-            )
+    results = search.search_players(campaign, q)
     return JsonResponse(results, safe=False)
 
 
@@ -361,7 +371,7 @@ def search_players(request: HttpRequest, pk: int) -> JsonResponse:
 @require_POST
 def delete_npc(request: HttpRequest, pk: int) -> HttpResponse:
     npc = get_object_or_404(NPC, pk=pk)
-    if not npc.campaign or npc.campaign.master != request.user:
+    if not npc.campaign or not campaign_access(request, npc.campaign).owns:
         return HttpResponseForbidden("Sem permissão")
     campaign_id = npc.campaign_id
     npc.delete()
@@ -369,6 +379,40 @@ def delete_npc(request: HttpRequest, pk: int) -> HttpResponse:
     return redirect("campaign_detail", pk=campaign_id)
 
 
+@login_required
+@require_POST
+def campaign_roster(request: HttpRequest, pk: int) -> JsonResponse:
+    """Adiciona/remove jogadores em lote (ou troca a lista) e devolve a lista nova."""
+    campaign = get_object_or_404(Campaign, pk=pk)
+    if not campaign_access(request, campaign).owns:
+        return JsonResponse({"error": "Sem permissão"}, status=403)
+
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+
+    try:
+        add, remove, replace = roster.parse(payload)
+        roster.apply_changes(campaign, add=add, remove=remove, replace=replace)
+    except roster.RosterError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"success": True, "players": roster.roster(campaign)})
+
+
+@login_required
+@require_GET
+def campaign_export(request: HttpRequest, pk: int) -> HttpResponse:
+    """Baixa a campanha inteira (fichas, itens, NPCs e imagens) num .zip, em streaming."""
+    campaign = get_object_or_404(Campaign.objects.select_related("master"), pk=pk)
+    if not campaign_access(request, campaign).owns:
+        return HttpResponseForbidden("Sem permissão")
+    response = StreamingHttpResponse(archive.iter_archive(campaign), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{archive.archive_filename(campaign)}"'
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
 @login_required
 @require_POST
 def leave_campaign(request: HttpRequest, pk: int) -> HttpResponse:
@@ -376,17 +420,11 @@ def leave_campaign(request: HttpRequest, pk: int) -> HttpResponse:
     campaign = get_object_or_404(Campaign, pk=pk)
     
     # Verificar se o usuário está na campanha
-    if request.user not in campaign.players.all():
+    if not campaign_access(request, campaign).is_player:
         return HttpResponseForbidden("Você não está nesta campanha.")
     
-    # Desvincula todos os personagens do jogador
-    characters = Character.objects.filter(campaign=campaign, assigned_to=request.user)
-    for char in characters:
-        char.assigned_to = None
-        char.save()
-    
-    # Remove o jogador da campanha
-    campaign.players.remove(request.user)
+    # Desvincula personagens e NPCs e remove o jogador, tudo numa transação
+    roster.remove_members(campaign, {request.user.pk})
     messages.success(request, f"Você saiu da campanha '{campaign.name}'.")
     return redirect("player_dashboard")
 
@@ -395,7 +433,7 @@ def leave_campaign(request: HttpRequest, pk: int) -> HttpResponse:
 @require_POST
 def delete_item(request: HttpRequest, pk: int) -> HttpResponse:
     item = get_object_or_404(Item, pk=pk)
-    if not item.campaign or item.campaign.master != request.user:
+    if not item.campaign or not campaign_access(request, item.campaign).owns:
         return HttpResponseForbidden("Sem permissão")
     campaign_id = item.campaign_id
     item.delete()
@@ -407,7 +445,7 @@ def delete_item(request: HttpRequest, pk: int) -> HttpResponse:
 @require_POST
 def delete_character(request: HttpRequest, pk: int) -> HttpResponse:
     character = get_object_or_404(Character, pk=pk)
-    if not character.campaign or character.campaign.master != request.user:
+    if not character.campaign or not campaign_access(request, character.campaign).owns:
         return HttpResponseForbidden("Sem permissão")
     campaign_id = character.campaign_id
     character.delete()
@@ -438,32 +476,43 @@ def register(request: HttpRequest) -> HttpResponse:
     return render(request, "registration/register.html", {"form": form})
 
 
-@login_required
-def character_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    character = get_object_or_404(Character, pk=pk)
+def _character_roles(request: HttpRequest, character: Character) -> tuple[bool, bool]:
+    """(is_master, is_player) de quem abre a ficha; os dois falsos = sem acesso."""
     campaign = character.campaign
-
-    # Verificar acesso e permissões
-    is_master = False
-    is_player = False
-    
     if campaign:
         # Se há campanha, só mestre da campanha consegue editar
-        is_master = campaign.master == request.user
+        access = campaign_access(request, campaign)
+        is_master = access.owns
         # Jogador vê se está vinculado ao personagem OU na campanha
-        is_player = request.user in campaign.players.all() or character.assigned_to == request.user
+        is_player = character.assigned_to_id == request.user.pk or access.is_player
     else:
         # Fallback para modo legado (sem campanha)
-        is_master = character.created_by == request.user
-        is_player = character.assigned_to == request.user
+        is_master = character.created_by_id == request.user.pk
+        is_player = character.assigned_to_id == request.user.pk
 
     # Se acessar com ?mode=player, força modo leitura mesmo sendo mestre
     if request.GET.get("mode") == "player":
         is_master = False
+    return is_master, is_player
+
 
+@login_required
+def character_detail(request: HttpRequest, pk: int) -> HttpResponse:
+    character = get_object_or_404(Character, pk=pk)
+    campaign = character.campaign
+
+    # Verificar acesso e permissões
+    is_master, is_player = _character_roles(request, character)
     if not is_master and not is_player:
         return HttpResponseForbidden("Você não tem acesso a este personagem.")
 
+    page = conditional.PageVersion(
+        request, character.updated_at, campaign.updated_at if campaign else None,
+        role="master" if is_master else "player",
+    )
+    if (not_modified := page.not_modified()) is not None:
+        return not_modified
+
     skill_form = CharacterSkillForm(prefix="skill")
     ability_form = CharacterAbilityForm(prefix="ability")
     character_form = CharacterForm(instance=character, prefix="character")
@@ -473,8 +522,7 @@ def character_detail(request: HttpRequest, pk: int) -> HttpResponse:
         if form_type == "character":
             character_form = CharacterForm(request.POST, request.FILES, instance=character, prefix="character")
             if character_form.is_valid():
-                character_form.save()
-                character.ensure_slots()  # Ajusta slots após mudança de capacidade
+                character_form.save()  # save() ajusta os slots se a capacidade mudou
                 messages.success(request, "Personagem atualizado.")
                 return redirect("character_detail", pk=character.pk)
         elif form_type == "skill":
@@ -516,7 +564,7 @@ def character_detail(request: HttpRequest, pk: int) -> HttpResponse:
                 User = get_user_model()
                 try:
                     new_player = User.objects.get(pk=assigned_to_id)
-                    if character.campaign and new_player in character.campaign.players.all():
+                    if character.campaign and character.campaign.players.filter(pk=new_player.pk).exists():
                         character.assigned_to = new_player
                         character.save()
                         messages.success(request, "Jogador reatribuído.")
@@ -524,21 +572,24 @@ def character_detail(request: HttpRequest, pk: int) -> HttpResponse:
                     messages.error(request, "Jogador não encontrado.")
                 return redirect("character_detail", pk=character.pk)
 
-    character.ensure_slots()
-    slots_list = list(InventorySlot.objects.filter(character=character).order_by("position"))
+    # Leitura pura: uma consulta pelas posições ocupadas, as vazias saem da capacidade.
+    slots_list = character.inventory()
     items = Item.objects.filter(campaign=character.campaign) if character.campaign else Item.objects.none()
-    campaign_characters = character.campaign.characters.all() if character.campaign else []
+    campaign_characters = list(character.campaign.characters.all()) if character.campaign else []
     
     # Buscar NPCs visíveis vinculados ao personagem do jogador
-    visible_npcs = NPC.objects.none()
+    visible_npcs = []
     if character.campaign and is_player:
-        visible_npcs = NPC.objects.filter(
+        visible_npcs = list(NPC.objects.filter(
             campaign=character.campaign,
             assigned_to_character=character,
             visible=True
-        )
+        ))
+    # A barra de navegação sai do cache enquanto nenhum desses objetos mudar.
+    fragments.stamp(characters=campaign_characters, npcs=visible_npcs)
+    nav_version = fragments.combined_version([*campaign_characters, *visible_npcs])
     
-    return render(
+    return page.stamp(render(
         request,
         "hud/character_detail.html",
         {
@@ -553,38 +604,90 @@ def character_detail(request: HttpRequest, pk: int) -> HttpResponse:
             "campaign": character.campaign,
             "campaign_characters": campaign_characters,
             "visible_npcs": visible_npcs,
+            "nav_version": nav_version,
         },
+    ))
+
+
+@login_required
+@require_GET
+def character_sheet(request: HttpRequest, pk: int) -> JsonResponse:
+    """A ficha em JSON (`?fields=` escolhe as seções), para overlays e widgets."""
+    character = get_object_or_404(Character.objects.select_related("campaign", "assigned_to"), pk=pk)
+    campaign = character.campaign
+    is_master, is_player = _character_roles(request, character)
+    if not is_master and not is_player:
+        return JsonResponse({"error": "Sem permissão"}, status=403)
+
+    try:
+        fields = snapshot.parse_fields(request.GET.get("fields"))
+    except snapshot.SnapshotError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    # Overlay que pergunta a cada segundo recebe 304 enquanto nada muda — nem
+    # na ficha, nem no elenco e NPCs que ela mostra.
+    page = conditional.PageVersion(
+        request, character.updated_at, campaign.updated_at if campaign else None,
+        *snapshot.version_timestamps(character, fields),
+        role="master" if is_master else "player", csrf=False,
     )
+    if (not_modified := page.not_modified()) is not None:
+        return not_modified
+    data = snapshot.character_snapshot(character, fields, is_master=is_master)
+    return page.stamp(JsonResponse(data, json_dumps_params={"separators": (",", ":")}))
 
 
 @login_required
 @require_POST
-def assign_slot(request: HttpRequest, character_id: int, slot_id: int) -> JsonResponse:
+def assign_slot(request: HttpRequest, character_id: int, position: int) -> JsonResponse:
     character = get_object_or_404(Character, pk=character_id)
     # Permite mestre da campanha ou criador do personagem
     if character.campaign:
-        if character.campaign.master != request.user:
+        if not campaign_access(request, character.campaign).owns:
             return JsonResponse({"error": "Sem permissão"}, status=403)
     elif character.created_by != request.user:
         return JsonResponse({"error": "Sem permissão"}, status=403)
 
-    slot = get_object_or_404(InventorySlot, pk=slot_id, character=character)
+    if not 1 <= position <= character.inventory_capacity:
+        raise Http404("Slot inexistente")
     item_id = request.POST.get("item_id")
 
     if item_id:
         item = get_object_or_404(Item, pk=item_id)
-        slot.item = item
-        slot.save()
+        # Posição vazia não tem linha: pôr um item cria, trocar atualiza.
+        InventorySlot.objects.update_or_create(character=character, position=position, defaults={"item": item})
         return JsonResponse(
-            {"success": True, "itemName": item.name, "itemImage": item.image.url if item.image else ""}
+            {"success": True, "itemName": item.name, "itemImage": thumbnails.thumbnail_url(item.image, "card")}
         )
 
-    # Sem item_id: remove item do slot
-    slot.item = None
-    slot.save()
+    # Sem item_id: remove item do slot. delete() por instância, para os receivers rodarem.
+    for slot in InventorySlot.objects.filter(character=character, position=position):
+        slot.delete()
     return JsonResponse({"success": True, "itemName": "Vazio", "itemImage": ""})
 
 
+@login_required
+@require_POST
+def inventory_batch(request: HttpRequest, pk: int) -> JsonResponse:
+    """Aplica um lote de operações de slot (assign/clear/move/swap) numa transação."""
+    campaign = get_object_or_404(Campaign, pk=pk)
+    if not campaign_access(request, campaign).owns:
+        return JsonResponse({"error": "Sem permissão"}, status=403)
+
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+
+    try:
+        slots = inventory.apply_operations(campaign, payload.get("ops"))
+    except inventory.InventoryError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"success": True, "slots": slots})
+
+
 @login_required
 def character_list(request: HttpRequest) -> HttpResponse:
     """Legado: redireciona para master_dashboard"""
@@ -593,62 +696,71 @@ def character_list(request: HttpRequest) -> HttpResponse:
     return redirect("master_dashboard")
 
 
+def _can_edit_stats(request: HttpRequest, owner: str, obj: Any) -> bool:
+    """Personagem: mestre da campanha ou dono; sem campanha, dono ou criador. NPC: só o mestre."""
+    if owner == "npc":
+        return bool(obj.campaign) and campaign_access(request, obj.campaign).owns
+    if obj.campaign:
+        return campaign_access(request, obj.campaign).owns or obj.assigned_to_id == request.user.pk
+    return request.user.pk in (obj.assigned_to_id, obj.created_by_id)
+
+
+_ACTION_DELTAS = {"increase": 1, "decrease": -1}
+
+
+def _single_stat(request: HttpRequest, mutation: dict[str, Any], key: str) -> JsonResponse:
+    """Resposta no formato dos endpoints de ±1 para uma mutação só."""
+    try:
+        (result,) = stats.apply_mutations([mutation], lambda owner, obj: _can_edit_stats(request, owner, obj))
+    except stats.StatPermissionError:
+        return JsonResponse({"error": "Sem permissão"}, status=403)
+    except stats.StatError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"success": True, key: result["current"]})
+
+
+@login_required
+@require_POST
+def modify_stats(request: HttpRequest) -> JsonResponse:
+    """Aplica um lote de mutações de HP/SP/barras (delta ou absoluto) numa transação."""
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+
+    try:
+        results = stats.apply_mutations(
+            payload.get("mutations"), lambda owner, obj: _can_edit_stats(request, owner, obj)
+        )
+    except stats.StatPermissionError:
+        return JsonResponse({"error": "Sem permissão"}, status=403)
+    except stats.StatError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"success": True, "results": results})
+
+
 @login_required
 @require_POST
 def modify_hp(request: HttpRequest, character_id: int) -> JsonResponse:
-    """Modifica HP atual do personagem (+1 ou -1)"""
-    character = get_object_or_404(Character, pk=character_id)
-    
-    # Verifica permissão: mestre da campanha OU dono do personagem
-    if character.campaign:
-        is_master = character.campaign.master == request.user
-        is_owner = character.assigned_to == request.user
-        if not (is_master or is_owner):
-            return JsonResponse({"error": "Sem permissão"}, status=403)
-    else:
-        if character.assigned_to != request.user and character.created_by != request.user:
-            return JsonResponse({"error": "Sem permissão"}, status=403)
-    
-    action = request.POST.get("action")  # "increase" ou "decrease"
-    
-    if action == "increase":
-        character.hp_current = min(character.hp_current + 1, character.hp_max)
-    elif action == "decrease":
-        character.hp_current = max(character.hp_current - 1, 0)
-    else:
+    """Modifica HP atual do personagem (+1 ou -1). Atalho de `modify_stats`."""
+    get_object_or_404(Character, pk=character_id)
+    delta = _ACTION_DELTAS.get(request.POST.get("action"))  # "increase" ou "decrease"
+    if delta is None:
         return JsonResponse({"error": "Ação inválida"}, status=400)
-    
-    character.save()
-    return JsonResponse({"success": True, "hp_current": character.hp_current})
+    return _single_stat(request, {"owner": "character", "id": character_id, "stat": "hp", "delta": delta}, "hp_current")
 
 
 @login_required
 @require_POST
 def modify_sp(request: HttpRequest, character_id: int) -> JsonResponse:
-    """Modifica SP atual do personagem (+1 ou -1)"""
-    character = get_object_or_404(Character, pk=character_id)
-    
-    # Verifica permissão: mestre da campanha OU dono do personagem
-    if character.campaign:
-        is_master = character.campaign.master == request.user
-        is_owner = character.assigned_to == request.user
-        if not (is_master or is_owner):
-            return JsonResponse({"error": "Sem permissão"}, status=403)
-    else:
-        if character.assigned_to != request.user and character.created_by != request.user:
-            return JsonResponse({"error": "Sem permissão"}, status=403)
-    
-    action = request.POST.get("action")  # "increase" ou "decrease"
-    
-    if action == "increase":
-        character.sp_current = min(character.sp_current + 1, character.sp_max)
-    elif action == "decrease":
-        character.sp_current = max(character.sp_current - 1, 0)
-    else:
+    """Modifica SP atual do personagem (+1 ou -1). Atalho de `modify_stats`."""
+    get_object_or_404(Character, pk=character_id)
+    delta = _ACTION_DELTAS.get(request.POST.get("action"))  # "increase" ou "decrease"
+    if delta is None:
         return JsonResponse({"error": "Ação inválida"}, status=400)
-    
-    character.save()
-    return JsonResponse({"success": True, "sp_current": character.sp_current})
+    return _single_stat(request, {"owner": "character", "id": character_id, "stat": "sp", "delta": delta}, "sp_current")
 
 
 @login_required
@@ -658,7 +770,7 @@ def toggle_character_visibility(request: HttpRequest, character_id: int) -> Json
     character = get_object_or_404(Character, pk=character_id)
     
     # Apenas mestre da campanha pode alterar
-    if not character.campaign or character.campaign.master != request.user:
+    if not character.campaign or not campaign_access(request, character.campaign).owns:
         return JsonResponse({"error": "Sem permissão"}, status=403)
     
     character.visible = not character.visible
@@ -674,7 +786,7 @@ def toggle_npc_visibility(request: HttpRequest, npc_id: int) -> JsonResponse:
     npc = get_object_or_404(NPC, pk=npc_id)
     
     # Apenas mestre da campanha pode alterar
-    if not npc.campaign or npc.campaign.master != request.user:
+    if not npc.campaign or not campaign_access(request, npc.campaign).owns:
         return JsonResponse({"error": "Sem permissão"}, status=403)
     
     npc.visible = not npc.visible
@@ -691,7 +803,7 @@ def add_character_bar(request: HttpRequest, character_id: int) -> JsonResponse:
     
     # Verifica permissão: apenas mestre
     if character.campaign:
-        if character.campaign.master != request.user:
+        if not campaign_access(request, character.campaign).owns:
             return JsonResponse({"error": "Sem permissão"}, status=403)
     elif character.created_by != request.user:
         return JsonResponse({"error": "Sem permissão"}, status=403)
@@ -724,31 +836,13 @@ def add_character_bar(request: HttpRequest, character_id: int) -> JsonResponse:
 @login_required
 @require_POST
 def modify_bar(request: HttpRequest, bar_id: int) -> JsonResponse:
-    """Modifica valor de uma barra (+1 ou -1)"""
+    """Modifica valor de uma barra (+1 ou -1). Atalho de `modify_stats`."""
     bar = get_object_or_404(CharacterBar, pk=bar_id)
-    character = bar.character
-    
-    # Verifica permissão: mestre ou dono
-    if character.campaign:
-        is_master = character.campaign.master == request.user
-        is_owner = character.assigned_to == request.user
-        if not (is_master or is_owner):
-            return JsonResponse({"error": "Sem permissão"}, status=403)
-    else:
-        if character.assigned_to != request.user and character.created_by != request.user:
-            return JsonResponse({"error": "Sem permissão"}, status=403)
-    
-    action = request.POST.get("action")
-    
-    if action == "increase":
-        bar.current = min(bar.current + 1, bar.max_value)
-    elif action == "decrease":
-        bar.current = max(bar.current - 1, 0)
-    else:
+    delta = _ACTION_DELTAS.get(request.POST.get("action"))
+    if delta is None:
         return JsonResponse({"error": "Ação inválida"}, status=400)
-    
-    bar.save()
-    return JsonResponse({"success": True, "current": bar.current})
+    mutation = {"owner": "character", "id": bar.character_id, "stat": "bar", "bar": bar.pk, "delta": delta}
+    return _single_stat(request, mutation, "current")
 
 
 @login_required
@@ -760,7 +854,7 @@ def delete_bar(request: HttpRequest, bar_id: int) -> JsonResponse:
     
     # Apenas mestre pode deletar
     if character.campaign:
-        if character.campaign.master != request.user:
+        if not campaign_access(request, character.campaign).owns:
             return JsonResponse({"error": "Sem permissão"}, status=403)
     elif character.created_by != request.user:
         return JsonResponse({"error": "Sem permissão"}, status=403)
@@ -780,9 +874,11 @@ def npc_detail(request: HttpRequest, pk: int) -> HttpResponse:
     
     if campaign:
         # Mestre da campanha tem acesso total
-        is_master = campaign.master == request.user
+        access = campaign_access(request, campaign)
+        is_master = access.owns
         # Jogador só vê se o NPC está vinculado a um de seus personagens
-        is_player = request.user in campaign.players.all() and npc.assigned_to_character and npc.assigned_to_character.assigned_to == request.user
+        linked = npc.assigned_to_character
+        is_player = bool(linked and linked.assigned_to_id == request.user.pk and access.is_player)
     
     # Se mode=player, força modo leitura mesmo sendo mestre
     if request.GET.get("mode") == "player":
@@ -792,6 +888,12 @@ def npc_detail(request: HttpRequest, pk: int) -> HttpResponse:
     if not campaign or (not is_master and not is_player):
         return HttpResponseForbidden("Você não tem acesso a este NPC.")
 
+    page = conditional.PageVersion(
+        request, npc.updated_at, campaign.updated_at, role="master" if is_master else "player"
+    )
+    if (not_modified := page.not_modified()) is not None:
+        return not_modified
+
     skill_form = NPCSkillForm(prefix="skill")
     ability_form = NPCAbilityForm(prefix="ability")
     npc_form = NPCForm(instance=npc, prefix="npc")
@@ -802,8 +904,7 @@ def npc_detail(request: HttpRequest, pk: int) -> HttpResponse:
         if form_type == "npc":
             npc_form = NPCForm(request.POST, request.FILES, instance=npc, prefix="npc")
             if npc_form.is_valid():
-                npc_form.save()
-                npc.ensure_slots()
+                npc_form.save()  # save() ajusta os slots se a capacidade mudou
                 messages.success(request, "NPC atualizado.")
                 return redirect("npc_detail", pk=npc.pk)
         elif form_type == "skill":
@@ -836,11 +937,11 @@ def npc_detail(request: HttpRequest, pk: int) -> HttpResponse:
             else:
                 messages.error(request, "Nome e valor do atributo são obrigatórios.")
 
-    npc.ensure_slots()
-    slots_list = list(NPCInventorySlot.objects.filter(npc=npc).order_by("position"))
+    # Leitura pura: uma consulta pelas posições ocupadas, as vazias saem da capacidade.
+    slots_list = npc.inventory()
     items = Item.objects.filter(campaign=campaign) if campaign else Item.objects.none()
 
-    return render(
+    return page.stamp(render(
         request,
         "hud/npc_detail.html",
         {
@@ -854,7 +955,7 @@ def npc_detail(request: HttpRequest, pk: int) -> HttpResponse:
             "items": items,
             "campaign": campaign,
         },
-    )
+    ))
 
 
 @login_required
@@ -863,7 +964,7 @@ def add_npc_bar(request: HttpRequest, pk: int) -> JsonResponse:
     npc = get_object_or_404(NPC, pk=pk)
     campaign = npc.campaign
 
-    if not campaign or campaign.master != request.user:
+    if not campaign or not campaign_access(request, campaign).owns:
         return JsonResponse({"success": False, "error": "Não autorizado"}, status=403)
 
     if request.method == "POST":
@@ -895,22 +996,18 @@ def add_npc_bar(request: HttpRequest, pk: int) -> JsonResponse:
 
 @login_required
 def modify_npc_bar(request: HttpRequest, npc_pk: int, bar_id: int) -> JsonResponse:
-    """Modifica o valor atual de uma barra do NPC."""
+    """Modifica o valor atual de uma barra do NPC. Atalho de `modify_stats`."""
     npc = get_object_or_404(NPC, pk=npc_pk)
-    campaign = npc.campaign
     bar = get_object_or_404(NPCBar, id=bar_id, npc=npc)
 
-    if not campaign or campaign.master != request.user:
+    if not npc.campaign or not campaign_access(request, npc.campaign).owns:
         return JsonResponse({"success": False, "error": "Não autorizado"}, status=403)
 
     if request.method == "POST":
-        action = request.POST.get("action", "increase")
-        if action == "increase":
-            bar.current = min(bar.current + 1, bar.max_value)
-        elif action == "decrease":
-            bar.current = max(bar.current - 1, 0)
-        bar.save()
-        return JsonResponse({"success": True, "current": bar.current})
+        # Ação desconhecida não muda nada, como sempre foi.
+        delta = _ACTION_DELTAS.get(request.POST.get("action", "increase"), 0)
+        mutation = {"owner": "npc", "id": npc.pk, "stat": "bar", "bar": bar.pk, "delta": delta}
+        return _single_stat(request, mutation, "current")
 
     return JsonResponse({"success": False, "error": "Método não permitido"}, status=405)
 
@@ -922,7 +1019,7 @@ def delete_npc_bar(request: HttpRequest, npc_pk: int, bar_id: int) -> JsonRespon
     campaign = npc.campaign
     bar = get_object_or_404(NPCBar, id=bar_id, npc=npc)
 
-    if not campaign or campaign.master != request.user:
+    if not campaign or not campaign_access(request, campaign).owns:
         return JsonResponse({"success": False, "error": "Não autorizado"}, status=403)
 
     if request.method == "POST":
@@ -930,3 +1027,25 @@ def delete_npc_bar(request: HttpRequest, npc_pk: int, bar_id: int) -> JsonRespon
         return JsonResponse({"success": True})
 
     return JsonResponse({"success": False, "error": "Método não permitido"}, status=405)
+
+
+@staff_member_required
+def profiling_report(request: HttpRequest) -> HttpResponse:
+    """Amostras do RequestProfilingMiddleware deste processo, por view e uma a uma."""
+    if request.method == "POST" and request.POST.get("action") == "clear":
+        profiling.buffer.clear()
+        return redirect("profiling_report")
+    entries = profiling.buffer.snapshot()
+    context = {
+        **admin.site.each_context(request),
+        "title": "Perfil de requests",
+        "entries": entries,
+        "views": profiling.summarize_by_view(entries),
+    }
+    return render(request, "admin/hud/profiling.html", context)
+
+
+@require_safe
+def media_file(request: HttpRequest, path: str) -> HttpResponse:
+    """Upload de `MEDIA_ROOT` com cache imutável, ETag e Range (ver hud/media.py)."""
+    return media.serve(request, path)
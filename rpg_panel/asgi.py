@@ -2,6 +2,9 @@
 ASGI config for rpg_panel project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve through this entry point (not wsgi.py) to get the live campaign event
+stream at ``/campaigns/<id>/events/`` and the table session WebSocket at
+``/campaigns/<id>/table/``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +16,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rpg_panel.settings")
 
-application = get_asgi_application()
+# Primeiro o Django: configura as settings e carrega os apps antes do hud.
+django_application = get_asgi_application()
+
+from hud import table  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # O Django não fala WebSocket; essas conexões vão para a sessão de mesa.
+    if scope["type"] == "websocket":
+        await table.application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
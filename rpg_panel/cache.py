@@ -0,0 +1,51 @@
+"""
+Configuração do cache a partir de variáveis de ambiente.
+
+`CACHE_URL` escolhe o backend:
+
+- `locmem://` (padrão): memória do processo. Rápido, mas cada worker do
+  gunicorn tem o seu, então uma invalidação feita num não chega nos outros;
+- `file:///caminho/absoluto`: arquivos em disco, compartilhados por todos os
+  workers da mesma máquina;
+- `redis://host:6379/0`: Redis (precisa do pacote `redis` instalado),
+  compartilhado entre máquinas.
+
+`CACHE_MAX_ENTRIES` limita locmem e file antes de começarem a descartar
+entradas; o padrão do Django (300) é pouco para os fragmentos de template de
+uma campanha grande.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Mapping
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def cache_config(base_dir: Path, env: Mapping[str, str] | None = None) -> dict[str, Any]:
+    """O `CACHES["default"]` para o ambiente atual."""
+    env = os.environ if env is None else env
+    url = env.get("CACHE_URL", "").strip() or "locmem://"
+    parts = urlsplit(url)
+    options = {"MAX_ENTRIES": int(env.get("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))}
+
+    if parts.scheme == "locmem":
+        return {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": parts.netloc or "rpg-panel",
+            "OPTIONS": options,
+        }
+    if parts.scheme == "file":
+        # file:///var/tmp/rpg_panel; sem caminho, .cache/ ao lado do manage.py.
+        path = unquote(parts.path) or base_dir / ".cache"
+        return {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(path),
+            "OPTIONS": options,
+        }
+    if parts.scheme in ("redis", "rediss"):
+        return {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": url}
+    raise ValueError(f"CACHE_URL com esquema não suportado: {parts.scheme!r}")
@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from pathlib import Path
 
+from .cache import cache_config
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -62,6 +65,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "hud.profiling.RequestProfilingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -95,11 +99,19 @@ WSGI_APPLICATION = "rpg_panel.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite com WAL e PRAGMAs para vários workers, ou PostgreSQL via DATABASE_URL.
+# Detalhes e variáveis em rpg_panel/database.py.
+
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_config(BASE_DIR),
+}
+
+
+# Cache: memória do processo por padrão, ou arquivos/Redis via CACHE_URL.
+# Detalhes em rpg_panel/cache.py.
+
+CACHES = {
+    "default": cache_config(BASE_DIR),
 }
 
 
@@ -140,7 +152,13 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "hud" / "static"]
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# Uploads ganham o hash do conteúdo no nome e são servidos com cache imutável
+# (hud/media.py). `STATICFILES_STORAGE` sozinho é ignorado desde o Django 5.1.
+STORAGES = {
+    "default": {"BACKEND": "hud.media.HashedMediaStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
 
 LOGIN_REDIRECT_URL = "home"
 LOGOUT_REDIRECT_URL = "login"
@@ -148,6 +166,17 @@ LOGIN_URL = "login"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Prefixo de uma `location internal` do nginx apontando para MEDIA_ROOT; com ele
+# a view de mídia só responde os cabeçalhos e o nginx envia o arquivo.
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "")
+
+# Pub/sub dos eventos ao vivo (hud/live.py): `memory://` serve um processo só;
+# com vários workers ASGI, `redis://host:6379/0` (precisa do pacote `redis`).
+LIVE_BROKER_URL = os.getenv("LIVE_BROKER_URL", "memory://")
+
+# Endereço público do painel, para links em e-mails montados fora de um
+# request (o reset de senha sai pelo worker, hud/tasks.py).
+SITE_URL = os.getenv("SITE_URL", "https://galibinja.pythonanywhere.com").rstrip("/")
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"
@@ -157,6 +186,15 @@ EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Instrumentação por request (hud/profiling.py): Server-Timing, log JSON no
+# logger "hud.profiling" e amostras em /admin/profiling/.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "True") == "True"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.1"))
+PROFILING_BUFFER_SIZE = int(os.getenv("PROFILING_BUFFER_SIZE", "200"))
+PROFILING_SLOW_MS = int(os.getenv("PROFILING_SLOW_MS", "500"))
+# "staff" (padrão), "all" ou "off": quem recebe o header Server-Timing.
+PROFILING_SERVER_TIMING = os.getenv("PROFILING_SERVER_TIMING", "staff")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -16,15 +16,19 @@ Including another URLconf
 """
 
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from hud import views as hud_views
 
 urlpatterns = [
+    # Antes do admin: o catch-all do admin engoliria a rota.
+    path("admin/profiling/", hud_views.profiling_report, name="profiling_report"),
     path("admin/", admin.site.urls),
     path("accounts/", include("django.contrib.auth.urls")),
     path("", include("hud.urls")),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Uploads servidos pela aplicação também em produção, com cache longo (hud/media.py).
+if settings.MEDIA_URL.startswith("/"):
+    urlpatterns.insert(0, re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.+)$", hud_views.media_file, name="media"))